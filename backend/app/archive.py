@@ -0,0 +1,124 @@
+"""
+Archive mover: keeps price_reports and product_ratings small.
+
+    price_reports    rejected reports, and reports older than PRICE_REPORT_ACTIVE_DAYS
+                     -> price_reports_archive
+    product_ratings  ratings older than RATING_ACTIVE_DAYS -> product_ratings_archive,
+                     their stars are added to archived_rating_counts
+
+Nothing the hot paths read is moved: the active window is longer than the
+30 days get_best_price / pricing.current_prices look at, and the newest
+RECENT_REPORTS non-rejected reports per product and store stay for the
+plausibility check however old they are. Rating stats and sync summaries add
+archived_rating_counts, so their numbers do not change.
+
+Rows move in batches of ARCHIVE_BATCH_SIZE, each batch one write job
+(INSERT ... SELECT + DELETE in one transaction) on the single writer, so the
+app keeps writing in between. Run it from cron: python backend/archive_reports.py
+"""
+import datetime
+import os
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import String, cast, delete, func, insert, literal, select
+from sqlalchemy.orm import Session
+
+from . import rating_models
+from .database import SessionLocal
+from .db_writer import writer
+from .rating_routes import RECENT_REPORTS
+
+PRICE_REPORT_ACTIVE_DAYS = int(os.getenv('PRICE_REPORT_ACTIVE_DAYS', '60'))
+RATING_ACTIVE_DAYS = int(os.getenv('RATING_ACTIVE_DAYS', '365'))
+ARCHIVE_BATCH_SIZE = int(os.getenv('ARCHIVE_BATCH_SIZE', '1000'))
+
+
+def _copy_columns(archive_model) -> List[str]:
+    return [c.name for c in archive_model.__table__.columns if c.name != 'archived_at']
+
+
+def _move(db: Session, model, archive_model, ids: List[int], now: datetime.datetime) -> int:
+    hot = model.__table__
+    columns = _copy_columns(archive_model)
+    db.execute(insert(archive_model.__table__).from_select(
+        columns + ['archived_at'],
+        select(*[hot.c[name] for name in columns], literal(now)).where(hot.c.id.in_(ids)),
+    ))
+    moved = db.execute(delete(hot).where(hot.c.id.in_(ids))).rowcount
+    # Core statements bypass the flush hook (change_tracking): register the tables by hand
+    db.info.setdefault('changed_tables', set()).update((hot.name, archive_model.__tablename__))
+    return moved
+
+
+def _count_stars(db: Session, ids: List[int]) -> None:
+    R = rating_models.ProductRating
+    C = rating_models.ArchivedRatingCount
+    groups = db.execute(
+        select(R.product_identifier, R.product_id, R.store_name, R.rating, func.count())
+        .where(R.id.in_(ids))
+        .group_by(R.product_identifier, R.product_id, R.store_name, R.rating)
+    ).all()
+    for identifier, pid, store, rating, n in groups:
+        row = db.query(C).filter(
+            C.product_identifier == identifier, C.product_id.is_not_distinct_from(pid),
+            C.store_name.is_not_distinct_from(store), C.rating == rating,
+        ).first()
+        if row:
+            row.count += n
+        else:
+            db.add(C(product_identifier=identifier, product_id=pid, store_name=store, rating=rating, count=n))
+    db.flush()
+
+
+def price_report_candidates(db: Session, now: datetime.datetime) -> List[int]:
+    """Ids of rejected reports and of expired ones that are not among the newest RECENT_REPORTS"""
+    PR = rating_models.PriceReport
+    cutoff = now - datetime.timedelta(days=PRICE_REPORT_ACTIVE_DAYS)
+    rank = func.row_number().over(
+        partition_by=(func.coalesce(cast(PR.product_id, String), PR.product_identifier), PR.store_name),
+        order_by=PR.created_at.desc(),
+    ).label('rank')
+    ranked = select(PR.id, PR.created_at, rank).where(PR.status != 'rejected').subquery()
+    expired = select(ranked.c.id).where(ranked.c.created_at < cutoff, ranked.c.rank > RECENT_REPORTS)
+    rejected = select(PR.id).where(PR.status == 'rejected')
+    return sorted(db.execute(expired.union_all(rejected)).scalars())
+
+
+def rating_candidates(db: Session, now: datetime.datetime) -> List[int]:
+    R = rating_models.ProductRating
+    cutoff = now - datetime.timedelta(days=RATING_ACTIVE_DAYS)
+    return list(db.execute(select(R.id).where(R.created_at < cutoff).order_by(R.id)).scalars())
+
+
+def archive_cold_rows(
+    now: Optional[datetime.datetime] = None,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+    progress: Callable[[str], None] = print,
+) -> Dict[str, int]:
+    """Move everything that is due; returns {table: rows moved}. Safe to run again."""
+    now = now or datetime.datetime.utcnow()
+    db = SessionLocal()
+    try:
+        report_ids = price_report_candidates(db, now)
+        rating_ids = rating_candidates(db, now)
+    finally:
+        db.close()
+
+    def move_reports(db, ids):
+        return _move(db, rating_models.PriceReport, rating_models.PriceReportArchive, ids, now)
+
+    def move_ratings(db, ids):
+        # ids another run already moved are gone from product_ratings and not counted twice
+        _count_stars(db, ids)
+        return _move(db, rating_models.ProductRating, rating_models.ProductRatingArchive, ids, now)
+
+    totals = {}
+    for table, ids, job in (('price_reports', report_ids, move_reports), ('product_ratings', rating_ids, move_ratings)):
+        moved = 0
+        for start in range(0, len(ids), batch_size):
+            batch = ids[start:start + batch_size]
+            moved += writer.run(lambda db: job(db, batch))
+            progress(f"{table}: {moved}/{len(ids)} rows archived")
+        totals[table] = moved
+    return totals
+
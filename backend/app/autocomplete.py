@@ -0,0 +1,239 @@
+"""
+Local autocomplete for product names, so typing does not hit Open Food Facts on every keystroke.
+
+Sources, merged into one entry per display name:
+- product_locations (weight: number of locations + upvotes)
+- OFF products seen by the proxy (search, barcode lookups, autocomplete fallbacks)
+- the search log: queries users actually searched for
+
+Index: a sorted prefix array of folded name suffixes that start at a word
+boundary ("weihenstephan h milch", "h milch", "milch"), so a prefix lookup is
+two bisects. Short prefixes ("mi") span huge ranges, so the most popular
+entries of every block of 64 keys are precomputed and merged. When exact
+prefixes find fewer than `limit` entries, edit-distance-1 variants of the
+query fill up the list.
+
+The index is rebuilt in the background every REFRESH_SECONDS (or sooner when
+product_locations changed); lookups keep using the previous index meanwhile.
+"""
+import asyncio
+import bisect
+import heapq
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func
+from starlette.concurrency import run_in_threadpool
+
+from . import change_tracking, product_models
+from .database import SessionLocal
+from .receipt_parser import tokenize
+
+REFRESH_SECONDS = int(os.getenv('AUTOCOMPLETE_REFRESH_SECONDS', '300'))
+MIN_REFRESH_SECONDS = 15  # at most this often when only local data changed
+BLOCK_SIZE = 64
+BLOCK_TOP = 20  # limits above this fall back to scanning the whole range
+MIN_TYPO_PREFIX = 4
+OFF_SEEN_MAX = 20000
+SEARCH_LOG_MAX = 5000
+ALPHABET = 'abcdefghijklmnopqrstuvwxyz0123456789 '
+
+
+def fold(text: str) -> str:
+    """'Weihenstephan H-Milch' -> 'weihenstephan h milch' (same folding as the other indexes)"""
+    return ' '.join(tokenize(text))
+
+
+class _Entry:
+    __slots__ = ('display', 'barcode', 'image_url', 'popularity', 'source')
+
+    def __init__(self, display, barcode=None, image_url=None, popularity=0.0, source='local'):
+        self.display = display
+        self.barcode = barcode
+        self.image_url = image_url
+        self.popularity = popularity
+        self.source = source
+
+    def as_result(self) -> dict:
+        return {'barcode': self.barcode, 'display': self.display, 'image_url': self.image_url, 'source': self.source}
+
+
+class AutocompleteIndex:
+
+    def __init__(self, entries: Iterable[_Entry]):
+        # entries sorted by popularity once, so "more popular" is simply "smaller rank"
+        self.entries: List[_Entry] = sorted(entries, key=lambda e: (-e.popularity, len(e.display), e.display))
+        keyed: List[Tuple[str, int]] = []
+        for rank, entry in enumerate(self.entries):
+            words = fold(entry.display).split()
+            for start in range(len(words)):
+                keyed.append((' '.join(words[start:]), rank))
+        keyed.sort()
+        self.keys = [k for k, _ in keyed]
+        self.ranks = [r for _, r in keyed]
+        # best ranks per block of keys: a wide prefix range ("mi") is answered by
+        # merging a few short sorted lists instead of scanning thousands of keys
+        self.blocks = [
+            sorted(set(self.ranks[lo:lo + BLOCK_SIZE]))[:BLOCK_TOP]
+            for lo in range(0, len(self.ranks), BLOCK_SIZE)
+        ]
+
+    def _range(self, prefix: str) -> Tuple[int, int]:
+        lo = bisect.bisect_left(self.keys, prefix)
+        if lo == len(self.keys) or not self.keys[lo].startswith(prefix):
+            return lo, lo  # most typo variants end here, after a single bisect
+        hi = bisect.bisect_left(self.keys, prefix + '\uffff', lo)
+        return lo, hi
+
+    def _top(self, prefix: str, limit: int) -> List[int]:
+        """Best `limit` distinct ranks among keys starting with `prefix`, best first"""
+        lo, hi = self._range(prefix)
+        if hi - lo <= 2 * BLOCK_SIZE or limit > BLOCK_TOP:
+            return sorted(set(self.ranks[lo:hi]))[:limit]
+        first, last = -(-lo // BLOCK_SIZE), hi // BLOCK_SIZE
+        runs = [sorted(set(self.ranks[lo:first * BLOCK_SIZE])), sorted(set(self.ranks[last * BLOCK_SIZE:hi]))]
+        runs.extend(self.blocks[first:last])
+        top: List[int] = []
+        for rank in heapq.merge(*runs):
+            if not top or top[-1] != rank:
+                top.append(rank)
+                if len(top) == limit:
+                    break
+        return top
+
+    def _typo_variants(self, q: str) -> set:
+        variants = set()
+        for i in range(len(q)):
+            variants.add(q[:i] + q[i + 1:])
+            if i + 1 < len(q):
+                variants.add(q[:i] + q[i + 1] + q[i] + q[i + 2:])
+            for c in ALPHABET:
+                variants.add(q[:i] + c + q[i + 1:])
+                variants.add(q[:i] + c + q[i:])
+        variants.discard(q)
+        return {v for v in variants if len(v.strip()) >= MIN_TYPO_PREFIX}
+
+    def suggest(self, query: str, limit: int = 10) -> List[dict]:
+        q = fold(query)
+        if len(q) < 2 or limit < 1:
+            return []
+        ranks = self._top(q, limit)
+        if len(ranks) < limit and len(q) >= MIN_TYPO_PREFIX:
+            # edit distance 1 on the typed prefix ("milhc" -> "milch", "joghrt" -> "joghurt"), after the exact hits
+            exact = set(ranks)
+            typo = set()
+            for variant in self._typo_variants(q):
+                typo.update(self._top(variant, limit))
+            ranks += sorted(typo - exact)[:limit - len(ranks)]
+        return [self.entries[r].as_result() for r in ranks]
+
+
+# --- feeds ----------------------------------------------------------------------------------
+
+_feed_lock = threading.Lock()
+_off_seen: 'OrderedDict[str, dict]' = OrderedDict()
+_search_log: Counter = Counter()
+
+
+def remember_off_products(products: Iterable[dict]) -> None:
+    """Feed OFF results ({barcode, display, image_url}) seen by the proxy into the next rebuild"""
+    with _feed_lock:
+        for p in products:
+            display = (p.get('display') or '').strip()
+            if not display:
+                continue
+            key = p.get('barcode') or fold(display)
+            _off_seen[key] = {'barcode': p.get('barcode'), 'display': display, 'image_url': p.get('image_url')}
+            _off_seen.move_to_end(key)
+        while len(_off_seen) > OFF_SEEN_MAX:
+            _off_seen.popitem(last=False)
+
+
+def record_search(query: str) -> None:
+    """Search log: repeated searches become suggestions themselves and boost matching names"""
+    q = ' '.join((query or '').split())
+    if len(q) < 3:
+        return
+    with _feed_lock:
+        _search_log[q.casefold()] += 1
+        if len(_search_log) > SEARCH_LOG_MAX:
+            for rare, _ in _search_log.most_common()[SEARCH_LOG_MAX // 2:]:
+                del _search_log[rare]
+
+
+def build_index() -> AutocompleteIndex:
+    merged: Dict[str, _Entry] = {}
+
+    def add(display, popularity, source, barcode=None, image_url=None):
+        key = fold(display)
+        if not key:
+            return
+        entry = merged.get(key)
+        if entry is None:
+            merged[key] = _Entry(display, barcode, image_url, popularity, source)
+        else:
+            entry.popularity += popularity
+            entry.barcode = entry.barcode or barcode
+            entry.image_url = entry.image_url or image_url
+
+    db = SessionLocal()
+    try:
+        PL = product_models.ProductLocation
+        rows = db.query(
+            PL.product_identifier, func.count(PL.id), func.coalesce(func.sum(PL.upvotes), 0), func.max(PL.photo_url)
+        ).group_by(PL.product_identifier)
+        for identifier, locations, upvotes, photo in rows:
+            add(identifier, 2.0 * locations + upvotes, 'local', image_url=photo)
+    finally:
+        db.close()
+    with _feed_lock:
+        off_products = list(_off_seen.values())
+        searches = dict(_search_log)
+    for p in off_products:
+        add(p['display'], 1.0, 'off', p['barcode'], p['image_url'])
+    for query, count in searches.items():
+        key = fold(query)
+        if key in merged:
+            merged[key].popularity += 3.0 * count
+        elif count >= 2:
+            add(query, 1.0 * count, 'search')
+    return AutocompleteIndex(merged.values())
+
+
+# --- lifecycle ------------------------------------------------------------------------------
+
+_index: Optional[AutocompleteIndex] = None
+_built_at = 0.0
+_built_generation = -1
+_rebuilding: Optional[asyncio.Task] = None
+
+
+def _stale(now: float) -> bool:
+    age = now - _built_at
+    changed = change_tracking.generation('product_locations') != _built_generation
+    return age >= REFRESH_SECONDS or (changed and age >= MIN_REFRESH_SECONDS)
+
+
+async def _rebuild() -> None:
+    global _index, _built_at, _built_generation
+    generation = change_tracking.generation('product_locations')
+    index = await run_in_threadpool(build_index)
+    _index, _built_at, _built_generation = index, time.monotonic(), generation
+
+
+async def get_index() -> AutocompleteIndex:
+    """First call builds synchronously; later refreshes run in the background"""
+    global _rebuilding
+    if _index is None:
+        await _rebuild()
+    elif _stale(time.monotonic()) and (_rebuilding is None or _rebuilding.done()):
+        _rebuilding = asyncio.get_running_loop().create_task(_rebuild())
+    return _index
+
+
+async def suggest(query: str, limit: int = 10) -> List[dict]:
+    index = await get_index()
+    return index.suggest(query, limit)
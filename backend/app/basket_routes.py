@@ -0,0 +1,121 @@
+"""
+Basket optimizer: where is the whole shopping list cheapest?
+"""
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from . import basket_schemas, store_models
+from .database import get_read_db
+from .geocoding import resolve_location, bounding_box, haversine_km
+from .pricing import current_prices
+
+router = APIRouter(prefix="/api/v1/basket", tags=["Basket"])
+
+MISSING = float('inf')
+
+
+def _nearby_stores(db: Session, lat: float, lng: float, radius_km: float, max_stores: int):
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+    candidates = db.query(store_models.Store).filter(
+        store_models.Store.is_active == True,
+        store_models.Store.latitude.between(min_lat, max_lat),
+        store_models.Store.longitude.between(min_lng, max_lng),
+    ).all()
+    nearby = []
+    for store in candidates:
+        d = haversine_km(lat, lng, store.latitude, store.longitude)
+        if d <= radius_km:
+            nearby.append((d, store))
+    nearby.sort(key=lambda x: x[0])
+    return nearby[:max_stores]
+
+
+def _best_split(items, vectors, best_single_total, best_single_coverage):
+    """Try every pair of stores; per item the cheaper store wins.
+    Works on aligned price vectors so each pair is two C-level map() passes."""
+    names = list(vectors)
+    best = None
+    best_key = None
+    for i in range(len(names)):
+        va = vectors[names[i]]
+        for j in range(i + 1, len(names)):
+            vb = vectors[names[j]]
+            combined = list(map(min, va, vb))
+            priced = [p for p in combined if p != MISSING]
+            key = (-len(priced), sum(priced))
+            if best_key is None or key < best_key:
+                best_key = key
+                best = (names[i], names[j], va, vb)
+    if best is None:
+        return None
+    name_a, name_b, va, vb = best
+    covered, total = -best_key[0], best_key[1]
+    # only worth reporting if it beats going to one store
+    if covered < best_single_coverage or (covered == best_single_coverage and total >= best_single_total):
+        return None
+    assignment = {name_a: [], name_b: []}
+    missing = []
+    for item, pa, pb in zip(items, va, vb):
+        if pa == MISSING and pb == MISSING:
+            missing.append(item)
+        elif pa <= pb:
+            assignment[name_a].append(item)
+        else:
+            assignment[name_b].append(item)
+    return basket_schemas.BasketSplit(
+        store_names=[name_a, name_b],
+        total=round(total, 2),
+        items_priced=covered,
+        coverage=round(covered / len(items), 4),
+        assignment=assignment,
+        missing=missing,
+        savings_vs_best_single=round(best_single_total - total, 2) if covered == best_single_coverage else None,
+    )
+
+
+@router.post("/optimize", response_model=basket_schemas.BasketOptimizeResponse)
+def optimize_basket(payload: basket_schemas.BasketOptimizeRequest, db: Session = Depends(get_read_db)):
+    """Basket total, coverage and missing items for every store in the radius, plus the best two-store split"""
+    items = list(dict.fromkeys(p.strip() for p in payload.product_identifiers if p and p.strip()))
+    if not items:
+        raise HTTPException(status_code=400, detail="product_identifiers must not be empty")
+
+    lat, lng = payload.lat, payload.lng
+    if lat is None or lng is None:
+        point = resolve_location(postal_code=payload.postal_code, city=payload.city)
+        if not point:
+            raise HTTPException(status_code=400, detail="lat/lng or a known postal_code/city is required")
+        lat, lng = point.lat, point.lng
+
+    nearby = _nearby_stores(db, lat, lng, payload.radius_km, max(1, min(payload.max_stores, 100)))
+    if not nearby:
+        return basket_schemas.BasketOptimizeResponse(items=len(items), stores=[])
+
+    prices = current_prices(db, items, [s.full_name for _, s in nearby])
+
+    # one aligned price vector per store (MISSING where no price is known)
+    vectors = {store.full_name: [prices.get((item, store.full_name), MISSING) for item in items] for _, store in nearby}
+
+    baskets = []
+    for distance, store in nearby:
+        vec = vectors[store.full_name]
+        priced = {item: p for item, p in zip(items, vec) if p != MISSING}
+        baskets.append(basket_schemas.StoreBasket(
+            store_id=store.id,
+            store_name=store.full_name,
+            chain=store.chain,
+            distance_km=round(distance, 2),
+            total=round(sum(priced.values()), 2),
+            items_priced=len(priced),
+            coverage=round(len(priced) / len(items), 4),
+            missing=[item for item in items if item not in priced],
+            prices=priced,
+        ))
+    baskets.sort(key=lambda b: (-b.items_priced, b.total, b.distance_km))
+
+    split = None
+    if payload.include_split and len(baskets) > 1:
+        priced_vectors = {name: vec for name, vec in vectors.items() if any(p != MISSING for p in vec)}
+        if len(priced_vectors) > 1:
+            split = _best_split(items, priced_vectors, baskets[0].total, baskets[0].items_priced)
+
+    return basket_schemas.BasketOptimizeResponse(items=len(items), stores=baskets, best_split=split)
@@ -0,0 +1,43 @@
+from pydantic import BaseModel
+from typing import Optional, List, Dict
+
+
+class BasketOptimizeRequest(BaseModel):
+    product_identifiers: List[str]
+    # Location: coordinates, or postal_code/city resolved offline
+    lat: Optional[float] = None
+    lng: Optional[float] = None
+    postal_code: Optional[str] = None
+    city: Optional[str] = None
+    radius_km: float = 10
+    max_stores: int = 30
+    include_split: bool = True
+
+
+class StoreBasket(BaseModel):
+    store_id: int
+    store_name: str
+    chain: Optional[str] = None
+    distance_km: float
+    total: float  # sum over priced items only
+    items_priced: int
+    coverage: float  # 0-1 share of requested items with a price
+    missing: List[str]
+    prices: Dict[str, float]
+
+
+class BasketSplit(BaseModel):
+    """Best combination of two stores: each item bought where it is cheaper"""
+    store_names: List[str]
+    total: float
+    items_priced: int
+    coverage: float
+    assignment: Dict[str, List[str]]  # store_name -> product_identifiers
+    missing: List[str]
+    savings_vs_best_single: Optional[float] = None  # only set when coverage equals the best single store
+
+
+class BasketOptimizeResponse(BaseModel):
+    items: int
+    stores: List[StoreBasket]
+    best_split: Optional[BasketSplit] = None
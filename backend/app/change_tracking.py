@@ -0,0 +1,123 @@
+"""
+Per-table change tracking for cheap cache validation.
+
+Every committed ORM write bumps a generation counter for the tables it touched,
+so read endpoints can build ETag/Last-Modified validators and answer 304
+without running a query. Counters live in this process (the default deployment
+runs a single uvicorn worker); BOOT_ID is part of every validator so a restart
+never revalidates a response built by an earlier process.
+
+The same flush hook appends rows to the sync_changes log (delta sync for
+offline clients) inside the writing transaction. Sync tokens are "highest seq
+seen", which only holds if seqs become visible in order: SQLite has a single
+writer anyway, on PostgreSQL the hook takes a transaction-level advisory lock
+before its first log row, so change-log writers commit one after the other.
+
+Writes that bypass the ORM unit of work (Core bulk UPDATE/DELETE, raw SQL)
+must call bump() themselves.
+"""
+import datetime
+import threading
+import uuid
+from typing import Dict, Iterable
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+
+BOOT_ID = uuid.uuid4().hex[:12]
+_STARTED_AT = datetime.datetime.utcnow().replace(microsecond=0)
+
+# pg_advisory_xact_lock key serializing sync_changes writers (any constant unique to this app)
+SYNC_LOG_LOCK_KEY = 0x57_4B_46_53  # "WKFS"
+
+_lock = threading.Lock()
+_generations: Dict[str, int] = {}
+_last_modified: Dict[str, datetime.datetime] = {}
+
+
+def generation(table: str) -> int:
+    return _generations.get(table, 0)
+
+
+def generations(tables: Iterable[str]) -> tuple:
+    return tuple(_generations.get(t, 0) for t in tables)
+
+
+def last_modified(table: str) -> datetime.datetime:
+    """UTC timestamp (second precision, as in HTTP dates) of the last committed write"""
+    return _last_modified.get(table, _STARTED_AT)
+
+
+def bump(*tables: str) -> None:
+    now = datetime.datetime.utcnow().replace(microsecond=0)
+    with _lock:
+        for table in tables:
+            _generations[table] = _generations.get(table, 0) + 1
+            _last_modified[table] = now
+
+
+def _sync_rows(obj, state: str) -> list:
+    """sync_changes rows for one flushed object (state: new, dirty, deleted); empty for untracked models"""
+    from .product_models import ProductLocation
+    from .rating_models import PriceReport, ProductRating
+
+    if isinstance(obj, ProductLocation):
+        rows = [{'entity': 'product_location', 'entity_id': obj.id, 'op': 'delete' if state == 'deleted' else 'upsert'}]
+        # current_price feeds the price entity
+        if state != 'dirty' or get_history(obj, 'current_price').has_changes():
+            rows.append({'entity': 'price', 'product_identifier': obj.product_identifier, 'store_name': obj.store_name, 'op': 'upsert'})
+        return rows
+    if isinstance(obj, PriceReport):
+        return [{'entity': 'price', 'product_identifier': obj.product_identifier, 'store_name': obj.store_name, 'op': 'upsert'}]
+    if isinstance(obj, ProductRating):
+        rows = [{'entity': 'rating_summary', 'product_identifier': obj.product_identifier, 'store_name': '', 'op': 'upsert'}]
+        if obj.store_name:
+            rows.append({'entity': 'rating_summary', 'product_identifier': obj.product_identifier, 'store_name': obj.store_name, 'op': 'upsert'})
+        return rows
+    return []
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changes(session, flush_context):
+    # new/dirty/deleted still describe the flushed objects at this point
+    from .sync_models import SyncChange
+
+    changed = session.info.setdefault('changed_tables', set())
+    sync_rows = []
+    for state, collection in (('new', session.new), ('dirty', session.dirty), ('deleted', session.deleted)):
+        for obj in collection:
+            table = getattr(obj, '__tablename__', None)
+            if table:
+                changed.add(table)
+            if state == 'dirty' and not session.is_modified(obj, include_collections=False):
+                continue
+            sync_rows.extend(_sync_rows(obj, state))
+    if sync_rows:
+        now = datetime.datetime.utcnow()
+        seen = set()
+        unique = []
+        for row in sync_rows:
+            key = (row['entity'], row.get('entity_id'), row.get('product_identifier'), row.get('store_name'))
+            if key not in seen:
+                seen.add(key)
+                unique.append({'entity_id': None, 'product_identifier': None, 'store_name': None, **row, 'changed_at': now})
+        # plain INSERT on the flush connection: same transaction, no extra flush cycle
+        connection = session.connection()
+        if connection.dialect.name == 'postgresql':
+            # held until commit/rollback: a later seq never commits before an earlier one
+            connection.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': SYNC_LOG_LOCK_KEY})
+        connection.execute(SyncChange.__table__.insert(), unique)
+        changed.add(SyncChange.__tablename__)
+
+
+@event.listens_for(Session, 'after_commit')
+def _bump_on_commit(session):
+    changed = session.info.pop('changed_tables', None)
+    if changed:
+        bump(*changed)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_on_rollback(session):
+    session.info.pop('changed_tables', None)
@@ -1,8 +1,10 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 from typing import Optional, List
 import time
-import httpx
 from asyncio import sleep
+from .geocoding import resolve_location
+from . import http_clients, upstream
+from .singleflight import ClientDisconnected, flights
 
 router = APIRouter()
 
@@ -14,9 +16,11 @@ async def http_post_with_retry(url, data, timeout=60.0, retries=3):
     delay = 0.5
     for attempt in range(1, retries + 1):
         try:
-            async with httpx.AsyncClient(timeout=timeout, verify=VERIFY_SSL) as client:
-                resp = await client.post(url, data=data)
-                return resp
+            async with upstream.scheduler.slot(url):
+                resp = await http_clients.request('POST', url, data=data, timeout=timeout, verify=VERIFY_SSL)
+            return resp
+        except upstream.UpstreamDeadlineExceeded:
+            raise
         except Exception as e:
             print(f'Overpass request attempt {attempt} failed: {e}')
             if attempt == retries:
@@ -41,14 +45,15 @@ def build_overpass_query(lat, lng, radius):
 
 
 @router.get('/api/v1/stores')
-async def get_osm_stores(lat: Optional[float] = None, lng: Optional[float] = None, radius_km: Optional[float] = 10, limit: int = 200, q: Optional[str] = None):
-    """Return stores from OpenStreetMap/Overpass. If lat/lng are missing, returns an empty list or limited demo data."""
-    # If no coordinates provided and no query, return empty list (frontend will fallback to product_locations)
+async def get_osm_stores(request: Request, lat: Optional[float] = None, lng: Optional[float] = None, radius_km: Optional[float] = 10, limit: int = 200, q: Optional[str] = None, postal_code: Optional[str] = None, city: Optional[str] = None):
+    """Return stores from OpenStreetMap/Overpass. If lat/lng are missing, postal_code or city are resolved
+    offline to a centroid; without any resolvable location an empty list is returned."""
     if lat is None or lng is None:
-        if not q:
+        point = resolve_location(postal_code=postal_code, city=city) if (postal_code or city) else None
+        if not point:
+            # frontend will fallback to product_locations
             return []
-        lat = 0.0
-        lng = 0.0
+        lat, lng = point.lat, point.lng
     radius = int((radius_km or 10) * 1000)
 
     # Simple in-memory cache
@@ -78,7 +83,8 @@ async def get_osm_stores(lat: Optional[float] = None, lng: Optional[float] = Non
 
     url = "https://overpass-api.de/api/interpreter"
     try:
-        resp = await http_post_with_retry(url, {"data": query}, timeout=60.0, retries=3)
+        # the Overpass query itself is the key: same area and filter -> one upstream call
+        resp = await flights.run(('overpass', query), lambda: http_post_with_retry(url, {"data": query}, timeout=60.0, retries=3), request)
         data = resp.json()
         elements = data.get('elements', [])
         results = []
@@ -118,6 +124,8 @@ async def get_osm_stores(lat: Optional[float] = None, lng: Optional[float] = Non
                 break
         cache[cache_key] = (now, results)
         return results
+    except ClientDisconnected:
+        raise
     except Exception as e:
         print('Overpass API error:', e)
         return []
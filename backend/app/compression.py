@@ -0,0 +1,162 @@
+"""
+Response compression.
+
+Dynamic responses: CompressionMiddleware gzip/brotli-encodes JSON and text bodies of at
+least MIN_BYTES for clients that accept it. Everything else (images, already encoded
+bodies, small responses) passes through untouched.
+
+Static files: precompress_frontend.py writes `.br`/`.gz` siblings next to the frontend
+files once, at deploy time (compose `precompress` service); PrecompressedStaticFiles (and
+nginx `gzip_static`) send those instead of compressing the same file on every request. A
+file served this way carries `Vary: Accept-Encoding`, which is also what tells the
+middleware to leave it alone.
+
+Brotli needs the optional `brotli` package; without it everything falls back to gzip.
+RESPONSE_COMPRESSION=0 turns the middleware off.
+"""
+import gzip
+import mimetypes
+import os
+from typing import List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+ENABLED = os.getenv('RESPONSE_COMPRESSION', '1').lower() not in ('0', 'false', 'no')
+MIN_BYTES = int(os.getenv('COMPRESSION_MIN_BYTES', '1024'))
+# per request: fast levels; ahead of time (precompress_frontend.py): the smallest output
+DYNAMIC_LEVELS = {'br': 4, 'gzip': 5}
+STATIC_LEVELS = {'br': 11, 'gzip': 9}
+SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+COMPRESSIBLE_TYPES = {'application/json', 'application/javascript', 'application/xml',
+                      'application/manifest+json', 'image/svg+xml'}
+
+
+def available_encodings() -> List[str]:
+    """Preferred first"""
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def compressible(content_type: Optional[str]) -> bool:
+    if not content_type:
+        return False
+    media_type = content_type.split(';', 1)[0].strip().lower()
+    if media_type == 'text/event-stream':
+        return False
+    return media_type.startswith('text/') or media_type in COMPRESSIBLE_TYPES or media_type.endswith('+json')
+
+
+def accepted_encodings(accept_encoding: str) -> List[str]:
+    """Encodings from available_encodings() the client accepts (q > 0), preferred first"""
+    accepted = set()
+    for item in accept_encoding.lower().split(','):
+        name, _, params = item.partition(';')
+        q = params.strip()
+        if q.startswith('q='):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name.strip())
+    return [e for e in available_encodings() if e in accepted]
+
+
+def compress(body: bytes, encoding: str, level: Optional[int] = None) -> bytes:
+    level = DYNAMIC_LEVELS[encoding] if level is None else level
+    if encoding == 'br':
+        return brotli.compress(body, quality=level)
+    # mtime=0: equal input, equal bytes
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+class CompressionMiddleware:
+    """Pure ASGI: compresses JSON/text bodies >= minimum_size, buffers only those it may compress"""
+
+    def __init__(self, app, minimum_size: int = MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        encodings = accepted_encodings(Headers(scope=scope).get('accept-encoding', ''))
+        start = {}
+        chunks = []
+        passthrough = False
+
+        async def buffer(message):
+            nonlocal passthrough
+            if passthrough:
+                await send(message)
+            elif message['type'] == 'http.response.start':
+                headers = Headers(raw=message.get('headers', []))
+                if (not compressible(headers.get('content-type')) or 'content-encoding' in headers
+                        or 'accept-encoding' in headers.get('vary', '').lower()):
+                    # not ours to compress, or the response negotiated its encoding itself
+                    passthrough = True
+                    await send(message)
+                else:
+                    start.update(message)
+            elif message['type'] == 'http.response.body':
+                chunks.append(message.get('body', b''))
+                if not message.get('more_body', False):
+                    await self._finish(send, start, b''.join(chunks), encodings)
+
+        await self.app(scope, receive, buffer)
+
+    async def _finish(self, send, start: dict, body: bytes, encodings: List[str]) -> None:
+        if len(body) < self.minimum_size:
+            await send(start)
+            await send({'type': 'http.response.body', 'body': body})
+            return
+        headers = MutableHeaders(raw=list(start.get('headers', [])))
+        headers.add_vary_header('Accept-Encoding')
+        if encodings:
+            body = compress(body, encodings[0])
+            headers['Content-Encoding'] = encodings[0]
+            headers['Content-Length'] = str(len(body))
+            etag = headers.get('etag')
+            if etag and not etag.startswith('W/'):
+                # same content, different bytes: only a weak validator still holds (If-None-Match compares weakly)
+                headers['ETag'] = f'W/{etag}'
+        await send({**start, 'headers': headers.raw})
+        await send({'type': 'http.response.body', 'body': body})
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles that sends the `.br`/`.gz` sibling a client accepts, if it is not older than the file"""
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200) -> Response:
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        media_type = mimetypes.guess_type(str(full_path))[0]
+        if not compressible(media_type):
+            return response
+        response.headers.add_vary_header('Accept-Encoding')
+        if status_code != 200:
+            return response
+        request_headers = Headers(scope=scope)
+        for encoding in accepted_encodings(request_headers.get('accept-encoding', '')):
+            sibling = f'{full_path}{SUFFIXES[encoding]}'
+            try:
+                sibling_stat = os.stat(sibling)
+            except OSError:
+                continue
+            if sibling_stat.st_mtime < stat_result.st_mtime:
+                # the file changed after the last precompress run
+                continue
+            encoded = FileResponse(sibling, stat_result=sibling_stat, media_type=media_type,
+                                   headers={'Content-Encoding': encoding, 'Vary': 'Accept-Encoding'})
+            if self.is_not_modified(encoded.headers, request_headers):
+                return NotModifiedResponse(encoded.headers)
+            return encoded
+        return response
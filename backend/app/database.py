@@ -1,19 +1,109 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
 
+
+def normalize_url(url: str) -> str:
+    # Heroku/compose style postgres:// is not a dialect name SQLAlchemy 2 accepts
+    return 'postgresql://' + url[len('postgres://'):] if url.startswith('postgres://') else url
+
+
 # Use DATABASE_URL env var. Default to sqlite file in repo root for dev.
-DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///./backend.db')
+DATABASE_URL = normalize_url(os.getenv('DATABASE_URL', 'sqlite:///./backend.db'))
+# Optional read replica for heavy reads (sync, rollups, admin lists), see get_read_db
+DATABASE_READ_URL = normalize_url(os.getenv('DATABASE_READ_URL', ''))
 
 # If using sqlite file, ensure check_same_thread option
 connect_args = {"check_same_thread": False} if DATABASE_URL.startswith('sqlite') else {}
 
+
+def is_sqlite_file(url: str) -> bool:
+    u = make_url(url)
+    return u.get_backend_name() == 'sqlite' and u.database not in (None, '', ':memory:') \
+        and 'mode=memory' not in str(u)
+
+
+# SQLite production profile (SQLITE_PROFILE=default turns it off): WAL so readers never wait
+# for the writer, synchronous=NORMAL (durable at checkpoints, no fsync per commit under WAL),
+# a busy timeout instead of immediate "database is locked", and more page cache / mmap.
+# Writes go through app.db_writer, a single writer thread with group commit.
+SQLITE_PRODUCTION = is_sqlite_file(DATABASE_URL) and os.getenv('SQLITE_PROFILE', 'production') == 'production'
+SQLITE_READ_POOL = int(os.getenv('SQLITE_READ_POOL', '4'))
+SQLITE_PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('busy_timeout', int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))),
+    ('cache_size', -1024 * int(os.getenv('SQLITE_CACHE_MB', '32'))),  # negative: KiB
+    ('mmap_size', 1024 * 1024 * int(os.getenv('SQLITE_MMAP_MB', '256'))),
+    ('temp_store', 'MEMORY'),
+)
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS:
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+def apply_sqlite_profile(sync_engine) -> None:
+    """Run the production pragmas on every new connection of `sync_engine`"""
+    event.listen(sync_engine, 'connect', _set_sqlite_pragmas)
+
+
+# Server databases (PostgreSQL): per engine and worker process. Sync endpoints run on
+# AnyIO's 40 threads, so pool + overflow stays below that and a burst waits DB_POOL_TIMEOUT
+# for a connection instead of opening more than the server's max_connections allows.
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '20'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '10'))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))  # below typical proxy/LB idle timeouts
+
+
+def pool_options(url: str) -> dict:
+    if is_sqlite_file(url):
+        return {'pool_size': SQLITE_READ_POOL, 'max_overflow': SQLITE_READ_POOL} if SQLITE_PRODUCTION else {}
+    if make_url(url).get_backend_name() == 'sqlite':
+        return {}  # in-memory: SQLAlchemy's single-connection pool
+    return {
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT,
+        'pool_recycle': DB_POOL_RECYCLE,
+        'pool_use_lifo': True,  # reuse warm connections, let the surplus idle out
+    }
+
+
+def read_only_connect_args(url: str) -> dict:
+    u = make_url(url)
+    if u.get_backend_name() == 'sqlite':
+        return {"check_same_thread": False}
+    if u.get_driver_name() in ('psycopg2', 'psycopg'):
+        # a replica rejects writes anyway; this also catches a read URL pointing at the primary
+        return {'options': '-c default_transaction_read_only=on'}
+    return {}
+
+
 # create engine with pool_pre_ping for reliability with some DB providers
-engine = create_engine(DATABASE_URL, connect_args=connect_args, pool_pre_ping=True)
+pool_args = pool_options(DATABASE_URL)
+engine = create_engine(DATABASE_URL, connect_args=connect_args, pool_pre_ping=True, **pool_args)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+if DATABASE_READ_URL:
+    read_engine = create_engine(
+        DATABASE_READ_URL,
+        connect_args=read_only_connect_args(DATABASE_READ_URL),
+        pool_pre_ping=True,
+        **pool_options(DATABASE_READ_URL),
+    )
+else:
+    read_engine = engine
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
 # Common DB dependency for FastAPI routers
 def get_db():
     db = SessionLocal()
@@ -21,3 +111,41 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# Heavy reads that can tolerate replica lag: the primary unless DATABASE_READ_URL is set.
+# Nothing written through a read session is persisted.
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# Async engine for read-heavy endpoints: they await the database instead of holding
+# one of the AnyIO threadpool slots for the whole request.
+# Same database, async driver: sqlite -> aiosqlite, postgresql -> asyncpg.
+ASYNC_DRIVERS = {'sqlite': 'sqlite+aiosqlite', 'postgresql': 'postgresql+asyncpg', 'postgres': 'postgresql+asyncpg'}
+
+
+def async_url(url: str) -> str:
+    scheme, sep, rest = url.partition('://')
+    driver = ASYNC_DRIVERS.get(scheme.split('+')[0])
+    return f"{driver}{sep}{rest}" if driver else url
+
+
+ASYNC_DATABASE_URL = os.getenv('ASYNC_DATABASE_URL', async_url(DATABASE_URL))
+async_engine = create_async_engine(ASYNC_DATABASE_URL, pool_pre_ping=True, **pool_options(ASYNC_DATABASE_URL))
+if SQLITE_PRODUCTION:
+    apply_sqlite_profile(engine)
+    if is_sqlite_file(ASYNC_DATABASE_URL):
+        apply_sqlite_profile(async_engine.sync_engine)
+    if read_engine is not engine and is_sqlite_file(DATABASE_READ_URL):
+        apply_sqlite_profile(read_engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
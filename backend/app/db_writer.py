@@ -0,0 +1,189 @@
+"""
+Single writer for the SQLite production profile.
+
+    rating = db_writer.writer.run(lambda db: db_writer.added(db, ProductRating(...)))
+    report = await db_writer.writer.submit(write_report)
+
+SQLite allows one writer at a time. Instead of every request thread racing
+for the write lock (and getting "database is locked" when busy_timeout runs
+out), all writes are queued to one thread with its own connection. The
+thread takes whatever is queued (up to MAX_BATCH jobs), runs each job in a
+savepoint and commits them together: one BEGIN IMMEDIATE / COMMIT for the
+whole batch (group commit). A job that raises only rolls back its own
+savepoint; its caller gets the exception, the rest of the batch commits.
+
+A job is `fn(session) -> result`. It runs on the writer thread, so it must
+not await anything; the returned ORM objects are detached but loaded
+(expire_on_commit=False). Without the SQLite profile (PostgreSQL, sqlite
+in-memory, SQLITE_PROFILE=default) jobs run directly in a SessionLocal
+session of the calling thread and commit on their own.
+"""
+import asyncio
+import queue
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, List, Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
+
+from . import database
+
+MAX_BATCH = 64
+
+
+@dataclass
+class _Job:
+    fn: Callable[[Session], Any]
+    future: Future = field(default_factory=Future)
+
+
+def added(db: Session, obj):
+    """Job helper: insert `obj` and return it with its id and defaults filled in"""
+    db.add(obj)
+    db.flush()
+    return obj
+
+
+def _snapshot_info(session: Session) -> dict:
+    # session hooks collect per-transaction state in session.info (changed tables, new product
+    # aliases); a rolled-back savepoint must not leave its entries behind for the batch commit
+    return {k: (v.copy() if hasattr(v, 'copy') else v) for k, v in session.info.items()}
+
+
+class SingleWriter:
+
+    def __init__(self, url: str = database.DATABASE_URL, enabled: bool = database.SQLITE_PRODUCTION):
+        self.url = url
+        self.enabled = enabled
+        self._queue: "queue.Queue[Optional[_Job]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._sessions: Optional[sessionmaker] = None
+        self.stats = {'jobs': 0, 'failed': 0, 'batches': 0, 'max_batch': 0}
+
+    # --- callers ---
+
+    def run(self, fn: Callable[[Session], Any]) -> Any:
+        """Run a write job and wait for its result (sync endpoints, scripts)"""
+        if not self.enabled:
+            return self._run_direct(fn)
+        return self._enqueue(fn).result()
+
+    async def submit(self, fn: Callable[[Session], Any]) -> Any:
+        """Run a write job without blocking the event loop"""
+        if not self.enabled:
+            return await asyncio.get_running_loop().run_in_executor(None, self._run_direct, fn)
+        return await asyncio.wrap_future(self._enqueue(fn))
+
+    def _run_direct(self, fn: Callable[[Session], Any]) -> Any:
+        db = database.SessionLocal(expire_on_commit=False)
+        try:
+            result = fn(db)
+            db.commit()
+            return result
+        finally:
+            db.close()
+
+    def _enqueue(self, fn: Callable[[Session], Any]) -> Future:
+        job = _Job(fn)
+        self._start()
+        self._queue.put(job)
+        return job.future
+
+    # --- writer thread ---
+
+    def _start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            if self._sessions is None:
+                self._sessions = sessionmaker(bind=self._make_engine(), autoflush=False, expire_on_commit=False)
+            self._thread = threading.Thread(target=self._loop, name='sqlite-writer', daemon=True)
+            self._thread.start()
+
+    def _make_engine(self):
+        # one connection, never shared: the writer thread is its only user
+        engine = create_engine(self.url, connect_args={'check_same_thread': False}, pool_size=1, max_overflow=0)
+        database.apply_sqlite_profile(engine)
+
+        @event.listens_for(engine, 'connect')
+        def _manual_transactions(dbapi_connection, connection_record):
+            # let SQLAlchemy emit BEGIN itself, so it can be IMMEDIATE and savepoints work
+            dbapi_connection.isolation_level = None
+
+        @event.listens_for(engine, 'begin')
+        def _begin_immediate(conn):
+            # take the write lock up front instead of upgrading a read lock mid-batch
+            conn.exec_driver_sql('BEGIN IMMEDIATE')
+
+        return engine
+
+    def _loop(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            batch = [job]
+            while len(batch) < MAX_BATCH:
+                try:
+                    job = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if job is None:
+                    self._queue.put(None)  # finish this batch, then stop
+                    break
+                batch.append(job)
+            self._run_batch(batch)
+
+    def _run_batch(self, batch: List[_Job]) -> None:
+        db = self._sessions()
+        done = []
+        try:
+            for job in batch:
+                if not job.future.set_running_or_notify_cancel():
+                    continue
+                info = _snapshot_info(db)
+                savepoint = db.begin_nested()
+                try:
+                    result = job.fn(db)
+                    savepoint.commit()  # flushes: constraint errors belong to this job
+                except BaseException as e:
+                    savepoint.rollback()
+                    db.info.clear()
+                    db.info.update(info)
+                    self.stats['failed'] += 1
+                    job.future.set_exception(e)
+                    continue
+                done.append((job, result))
+            db.commit()
+        except BaseException as e:
+            db.rollback()
+            for job, _ in done:
+                job.future.set_exception(e)
+            self.stats['failed'] += len(done)
+            done = []
+        finally:
+            db.close()
+        for job, result in done:
+            job.future.set_result(result)
+        self.stats['jobs'] += len(batch)
+        self.stats['batches'] += 1
+        self.stats['max_batch'] = max(self.stats['max_batch'], len(batch))
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Finish the queued jobs and stop the thread (a later job starts it again)"""
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        self._queue.put(None)
+        thread.join(timeout)
+
+    def snapshot(self) -> dict:
+        return {**self.stats, 'enabled': self.enabled, 'queued': self._queue.qsize()}
+
+
+writer = SingleWriter()
@@ -0,0 +1,256 @@
+"""
+Offline geocoding for German postal codes and place names.
+
+Resolves a postal code ("21706") or place name ("Drochtersen", "Muenchen",
+"hambrug") to a centroid without any network call, so the store endpoints can
+take the spatial path even when the client sends no coordinates. A place name
+that cannot be resolved with confidence returns None rather than a guess: a
+qualified name ("Frankfurt (Oder)") never falls back to another place of the
+same base name, and typo matching needs a unique closest name.
+
+Data format is the GeoNames postal code dump (tab separated, CC-BY 4.0):
+country, postal code, place name, admin1 name, admin1 code, admin2 name,
+admin2 code, admin3 name, admin3 code, latitude, longitude, accuracy.
+A compact extract (large cities only) ships in backend/data/postal_codes_de.tsv;
+production needs POSTAL_CODES_PATH pointing at the full DE.txt from
+download.geonames.org.
+"""
+import bisect
+import math
+import os
+import unicodedata
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_DATASET = Path(__file__).resolve().parents[1] / 'data' / 'postal_codes_de.tsv'
+
+EARTH_RADIUS_KM = 6371.0
+# typo tolerance: edits allowed for names up to 5 characters / longer names
+MAX_EDITS_SHORT, MAX_EDITS = 1, 2
+
+
+@dataclass(frozen=True)
+class GeoPoint:
+    """Centroid of a postal code or place"""
+    lat: float
+    lng: float
+    postal_code: Optional[str] = None
+    place: Optional[str] = None
+
+
+def normalize_place(name: str) -> str:
+    """Fold a place name for lookups: 'Halle (Saale)' -> 'halle saale', 'München' -> 'muenchen'"""
+    s = (name or '').strip().casefold()
+    s = s.replace('ä', 'ae').replace('ö', 'oe').replace('ü', 'ue').replace('ß', 'ss')
+    s = unicodedata.normalize('NFKD', s)
+    s = ''.join(c for c in s if not unicodedata.combining(c))
+    s = ''.join(c if c.isalnum() else ' ' for c in s)
+    return ' '.join(s.split())
+
+
+def split_qualifier(name: str) -> Tuple[str, Optional[str]]:
+    """'Halle (Saale)' -> ('Halle', 'Saale'); names without a parenthesised qualifier -> (name, None)"""
+    name = (name or '').strip()
+    if name.endswith(')') and '(' in name:
+        base, _, qualifier = name[:-1].rpartition('(')
+        if base.strip():
+            return base.strip(), qualifier.strip() or None
+    return name, None
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance (adjacent swaps count as one edit); anything above `limit` is limit + 1"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev2, prev = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        row = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            row[j] = min(prev[j] + 1, row[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                row[j] = min(row[j], prev2[j - 2] + 1)
+        if min(row) > limit:
+            return limit + 1
+        prev2, prev = prev, row
+    return min(prev[-1], limit + 1)
+
+
+def _trigrams(s: str) -> set:
+    padded = f"  {s} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance in km"""
+    d_lat = math.radians(lat2 - lat1)
+    d_lng = math.radians(lng2 - lng1)
+    a = (math.sin(d_lat / 2) ** 2 +
+         math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) *
+         math.sin(d_lng / 2) ** 2)
+    return EARTH_RADIUS_KM * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def bounding_box(lat: float, lng: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """(min_lat, max_lat, min_lng, max_lng) enclosing the radius; used as an index-friendly SQL prefilter"""
+    d_lat = radius_km / 111.32
+    cos_lat = max(math.cos(math.radians(lat)), 0.01)
+    d_lng = radius_km / (111.32 * cos_lat)
+    return lat - d_lat, lat + d_lat, lng - d_lng, lng + d_lng
+
+
+class PostalIndex:
+    """
+    In-memory index built once per process:
+    - exact postal code -> centroid (dict)
+    - sorted postal codes for prefix lookups ("217" -> all 217xx)
+    - sorted normalized place names for prefix lookups
+    - qualifier-free aliases ("halle" -> "Halle (Saale)") where unambiguous
+    - trigram postings for fuzzy place names (typos, missing umlauts)
+    """
+
+    def __init__(self):
+        self.by_code: Dict[str, GeoPoint] = {}
+        self.codes: List[str] = []
+        self.places: Dict[str, GeoPoint] = {}
+        self.place_names: List[str] = []
+        self.aliases: Dict[str, str] = {}
+        self.trigrams: Dict[str, List[int]] = {}
+        self.trigram_sizes: List[int] = []
+
+    @classmethod
+    def from_file(cls, path: Path) -> 'PostalIndex':
+        index = cls()
+        # place -> [sum_lat, sum_lng, count, display name]
+        place_acc: Dict[str, list] = {}
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                parts = line.rstrip('\n').split('\t')
+                if len(parts) < 11:
+                    continue
+                code, place = parts[1].strip(), parts[2].strip()
+                try:
+                    lat, lng = float(parts[9]), float(parts[10])
+                except ValueError:
+                    continue
+                if code and code not in index.by_code:
+                    index.by_code[code] = GeoPoint(lat, lng, code, place)
+                key = normalize_place(place)
+                if key:
+                    acc = place_acc.setdefault(key, [0.0, 0.0, 0, place])
+                    acc[0] += lat
+                    acc[1] += lng
+                    acc[2] += 1
+        index.codes = sorted(index.by_code)
+        for key, (s_lat, s_lng, n, display) in place_acc.items():
+            index.places[key] = GeoPoint(round(s_lat / n, 5), round(s_lng / n, 5), None, display)
+        index.place_names = sorted(index.places)
+        bases: Dict[str, set] = {}
+        for key, point in index.places.items():
+            base, qualifier = split_qualifier(point.place)
+            if qualifier:
+                bases.setdefault(normalize_place(base), set()).add(key)
+        for base, keys in bases.items():
+            # only if nothing else is called that: "frankfurt" stays a prefix for "Frankfurt am Main"
+            lo = bisect.bisect_left(index.place_names, base)
+            named = [n for n in index.place_names[lo:lo + 3] if n == base or n.startswith(base + ' ')]
+            if len(keys) == 1 and named == list(keys):
+                index.aliases[base] = named[0]
+        for i, name in enumerate(index.place_names):
+            grams = _trigrams(name)
+            index.trigram_sizes.append(len(grams))
+            for tg in grams:
+                index.trigrams.setdefault(tg, []).append(i)
+        return index
+
+    def lookup_postal_code(self, postal_code: str) -> Optional[GeoPoint]:
+        code = (postal_code or '').strip()
+        if not code.isdigit():
+            return None
+        hit = self.by_code.get(code)
+        if hit:
+            return hit
+        # prefix (e.g. "217" or a code missing from a partial dataset): average the matching range
+        lo = bisect.bisect_left(self.codes, code)
+        hi = bisect.bisect_left(self.codes, code + '\uffff')
+        if lo == hi and len(code) == 5:
+            # unknown full code: fall back to its 3-digit area
+            code = code[:3]
+            lo = bisect.bisect_left(self.codes, code)
+            hi = bisect.bisect_left(self.codes, code + '\uffff')
+        if lo == hi:
+            return None
+        points = [self.by_code[c] for c in self.codes[lo:hi]]
+        return GeoPoint(
+            round(sum(p.lat for p in points) / len(points), 5),
+            round(sum(p.lng for p in points) / len(points), 5),
+            code,
+            points[0].place if len({p.place for p in points}) == 1 else None,
+        )
+
+    def lookup_place(self, city: str) -> Optional[GeoPoint]:
+        key = normalize_place(city)
+        if not key:
+            return None
+        hit = self.places.get(key) or self.places.get(self.aliases.get(key, ''))
+        if hit:
+            return hit
+        if split_qualifier(city)[1]:
+            # "Frankfurt (Oder)" is not in the dataset: its base name would lead to another Frankfurt
+            return None
+        # prefix: "frankfurt" -> "frankfurt am main" (first match in sort order)
+        lo = bisect.bisect_left(self.place_names, key)
+        if lo < len(self.place_names) and self.place_names[lo].startswith(key):
+            return self.places[self.place_names[lo]]
+        return self.fuzzy_place(key)
+
+    def fuzzy_place(self, key: str, min_similarity: float = 0.2) -> Optional[GeoPoint]:
+        """Closest name within MAX_EDITS(_SHORT) edits; None if there is no such name or no single closest one"""
+        query = _trigrams(key)
+        counts: Dict[int, int] = {}
+        for tg in query:
+            for i in self.trigrams.get(tg, ()):
+                counts[i] = counts.get(i, 0) + 1
+        limit = MAX_EDITS_SHORT if len(key) <= 5 else MAX_EDITS
+        best, best_distance, tied = None, limit + 1, False
+        for i, shared in counts.items():
+            # Jaccard similarity on trigram sets only preselects candidates
+            if shared / (len(query) + self.trigram_sizes[i] - shared) < min_similarity:
+                continue
+            distance = edit_distance(key, self.place_names[i], limit)
+            if distance < best_distance:
+                best, best_distance, tied = self.place_names[i], distance, False
+            elif distance == best_distance and distance <= limit:
+                tied = True
+        return self.places[best] if best and not tied else None
+
+    def resolve(self, postal_code: Optional[str] = None, city: Optional[str] = None) -> Optional[GeoPoint]:
+        """Postal code wins over city; returns None if neither can be resolved"""
+        if postal_code:
+            hit = self.lookup_postal_code(postal_code)
+            if hit:
+                return hit
+        if city:
+            return self.lookup_place(city)
+        return None
+
+
+_index: Optional[PostalIndex] = None
+
+
+def get_postal_index() -> PostalIndex:
+    """Lazily load the index (about 1 s for the full GeoNames DE file, instant for the bundled extract)"""
+    global _index
+    if _index is None:
+        path = Path(os.getenv('POSTAL_CODES_PATH') or DEFAULT_DATASET)
+        try:
+            _index = PostalIndex.from_file(path)
+        except OSError as e:
+            print(f"Postal code dataset not available ({path}): {e}")
+            _index = PostalIndex()
+    return _index
+
+
+def resolve_location(postal_code: Optional[str] = None, city: Optional[str] = None) -> Optional[GeoPoint]:
+    return get_postal_index().resolve(postal_code=postal_code, city=city)
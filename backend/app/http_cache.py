@@ -0,0 +1,155 @@
+"""
+Helpers for HTTP conditional requests (ETag / Last-Modified / 304).
+"""
+import datetime
+import hashlib
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag from arbitrary validator parts (table generations, query params, ...)"""
+    digest = hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()[:24]
+    return f'"{digest}"'
+
+
+def http_date(dt: datetime.datetime) -> str:
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=datetime.timezone.utc)
+    return format_datetime(dt, usegmt=True)
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime.datetime] = None) -> bool:
+    """If-None-Match takes precedence over If-Modified-Since (RFC 9110 13.2.2)"""
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match:
+        if if_none_match.strip() == '*':
+            return True
+        # weak comparison: W/"x" matches "x"
+        candidates = (t.strip() for t in if_none_match.split(','))
+        return any((c[2:] if c.startswith('W/') else c) == etag for c in candidates)
+    if_modified_since = request.headers.get('if-modified-since')
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=datetime.timezone.utc)
+        lm = last_modified if last_modified.tzinfo else last_modified.replace(tzinfo=datetime.timezone.utc)
+        lm = lm.replace(microsecond=0)
+        # a second-precision date from the current second could still change within that second
+        now = datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0)
+        return lm <= since and lm < now
+    return False
+
+
+def validator_headers(etag: str, last_modified: Optional[datetime.datetime] = None, cache_control: Optional[str] = None) -> dict:
+    headers = {'ETag': etag}
+    if last_modified is not None:
+        headers['Last-Modified'] = http_date(last_modified)
+    if cache_control:
+        headers['Cache-Control'] = cache_control
+    return headers
+
+
+def not_modified(headers: dict) -> Response:
+    return Response(status_code=304, headers=headers)
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """StaticFiles for content-addressed names: a name never changes content, so caches may keep it forever"""
+
+    def file_response(self, *args, **kwargs) -> Response:
+        response = super().file_response(*args, **kwargs)
+        if response.status_code in (200, 304):
+            response.headers['Cache-Control'] = IMMUTABLE
+        return response
+
+
+def content_etag(body: bytes) -> str:
+    """Strong ETag from the response bytes: equal content, equal validator, across workers and restarts"""
+    return f'"{hashlib.sha1(body).hexdigest()[:24]}"'
+
+
+# GET routes whose 200 responses get a content-hash ETag and a Cache-Control (unless the endpoint set
+# its own). max-age follows how fast the data moves; stale-while-revalidate lets browsers, the
+# service worker and nginx (nginx/cache.conf) answer at once and refresh in the background.
+CACHE_POLICIES = [
+    # OFF proxy: mirrors the upstream caches (product_cache 30 min, search_cache 20 min)
+    ('/api/v1/openfoodfacts/product/', 'public, max-age=1800, stale-while-revalidate=86400'),
+    ('/api/v1/openfoodfacts/search', 'public, max-age=600, stale-while-revalidate=3600'),
+    # OSM stores (Overpass) and our own store list
+    ('/api/v1/stores', 'public, max-age=300, stale-while-revalidate=3600'),
+    ('/stores', 'public, max-age=60, stale-while-revalidate=600'),
+    # shelf locations: always revalidated; with several workers only a content hash is a safe validator
+    ('/api/v1/product_locations', 'no-cache'),
+    # community data: short, a new report or rating should show up within a minute
+    ('/api/v1/price_reports/best_price', 'public, max-age=30, stale-while-revalidate=300'),
+    ('/api/v1/ratings/stats', 'public, max-age=60, stale-while-revalidate=600'),
+]
+
+
+def cache_policy(path: str) -> Optional[str]:
+    for prefix, cache_control in CACHE_POLICIES:
+        if path == prefix or (prefix.endswith('/') and path.startswith(prefix)):
+            return cache_control
+    return None
+
+
+class ConditionalGetMiddleware:
+    """
+    Pure ASGI: adds ETag / Cache-Control from CACHE_POLICIES and answers a matching
+    If-None-Match with 304. The body is still built (the hash needs it), only the
+    transfer is saved; app/response_cache.py in front of it saves the building too.
+    """
+
+    def __init__(self, app, policy=cache_policy):
+        self.app = app
+        self.policy = policy
+
+    async def __call__(self, scope, receive, send):
+        cache_control = self.policy(scope['path']) if scope['type'] == 'http' and scope['method'] in ('GET', 'HEAD') else None
+        if cache_control is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = {}
+        chunks = []
+
+        async def buffer(message):
+            if message['type'] == 'http.response.start':
+                start.update(message)
+            elif message['type'] == 'http.response.body':
+                chunks.append(message.get('body', b''))
+                if not message.get('more_body', False):
+                    await self._finish(scope, send, start, b''.join(chunks), cache_control)
+
+        await self.app(scope, receive, buffer)
+
+    @staticmethod
+    async def _finish(scope, send, start: dict, body: bytes, cache_control: str) -> None:
+        headers = list(start.get('headers', []))
+        if start.get('status') != 200:
+            await send(start)
+            await send({'type': 'http.response.body', 'body': body})
+            return
+        names = {k.lower() for k, _ in headers}
+        if b'etag' not in names:
+            headers.append((b'etag', content_etag(body).encode('latin-1')))
+        if b'cache-control' not in names:
+            headers.append((b'cache-control', cache_control.encode('latin-1')))
+        etag = next(v.decode('latin-1') for k, v in headers if k.lower() == b'etag')
+        if is_not_modified(Request(scope), etag):
+            kept = [(k, v) for k, v in headers if k.lower() in (b'etag', b'cache-control', b'last-modified', b'vary')]
+            await send({'type': 'http.response.start', 'status': 304, 'headers': kept})
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+        await send({**start, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': body})
@@ -0,0 +1,52 @@
+"""
+Shared outbound HTTP clients, opened and closed by the app lifespan.
+
+    resp = await http_clients.request('GET', url, params=params, timeout=30.0, verify=False)
+
+One pooled httpx.AsyncClient per `verify` setting keeps TCP/TLS connections
+to OFF and Overpass alive between requests instead of a new handshake per
+call. The clients belong to the event loop that opened them; on any other
+loop (scripts, a TestClient used without its lifespan) a one-off client is
+used, as before.
+"""
+import asyncio
+from typing import Dict, Optional
+
+import httpx
+
+LIMITS = httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=30.0)
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_clients: Dict[bool, httpx.AsyncClient] = {}
+
+
+async def start() -> None:
+    global _loop
+    await close()
+    _loop = asyncio.get_running_loop()
+
+
+async def close() -> None:
+    global _loop
+    clients = list(_clients.values())
+    _clients.clear()
+    _loop = None
+    for client in clients:
+        await client.aclose()
+
+
+def _shared(verify: bool) -> Optional[httpx.AsyncClient]:
+    if _loop is None or asyncio.get_running_loop() is not _loop:
+        return None
+    client = _clients.get(verify)
+    if client is None:
+        client = _clients[verify] = httpx.AsyncClient(verify=verify, limits=LIMITS)
+    return client
+
+
+async def request(method: str, url: str, *, timeout: float, verify: bool, **kwargs) -> httpx.Response:
+    client = _shared(verify)
+    if client is not None:
+        return await client.request(method, url, timeout=timeout, **kwargs)
+    async with httpx.AsyncClient(timeout=timeout, verify=verify) as client:
+        return await client.request(method, url, **kwargs)
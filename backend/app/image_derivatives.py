@@ -0,0 +1,95 @@
+"""
+Resized WebP derivatives for uploaded images, rendered in a process pool.
+
+For an upload stored as <sha256>.<ext> the derivatives are
+<sha256>-160.webp and <sha256>-640.webp next to it. Their names are
+known up front, so upload_image can return the URLs immediately while
+the worker renders them; until then the URLs 404 and clients fall back
+to the original. Decoding and resizing is CPU bound, which is why it runs
+in worker processes and not in the event loop's threadpool.
+
+Pillow is optional: without it uploads work as before, just without derivatives.
+"""
+import concurrent.futures
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - optional dependency
+    Image = None
+    ImageOps = None
+
+DERIVATIVE_WIDTHS = (160, 640)
+WEBP_QUALITY = 80
+# decompression-bomb guard for the workers (~50 MP, far above any phone photo)
+MAX_IMAGE_PIXELS = 50_000_000
+
+_pool: Optional[concurrent.futures.ProcessPoolExecutor] = None
+
+
+def available() -> bool:
+    return Image is not None
+
+
+def derivative_name(filename: str, width: int) -> str:
+    """'ab12....jpg' -> 'ab12...-160.webp'"""
+    return f"{Path(filename).stem}-{width}.webp"
+
+
+def derivative_names(filename: str, widths=DERIVATIVE_WIDTHS) -> Dict[int, str]:
+    return {w: derivative_name(filename, w) for w in widths}
+
+
+def render_derivatives(source: str, widths=DERIVATIVE_WIDTHS) -> List[str]:
+    """Worker entry point: write missing derivatives of `source`, return the names written"""
+    Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+    src = Path(source)
+    todo = {w: src.with_name(derivative_name(src.name, w)) for w in widths}
+    todo = {w: p for w, p in todo.items() if not p.exists()}
+    if not todo:
+        return []
+    written = []
+    with Image.open(src) as im:
+        im = ImageOps.exif_transpose(im)
+        im = im.convert('RGBA' if im.mode in ('RGBA', 'LA', 'P') else 'RGB')
+        for width, target in sorted(todo.items()):
+            copy = im.copy()
+            # never upscale; height follows the aspect ratio
+            copy.thumbnail((width, width * 10), Image.LANCZOS)
+            tmp = target.with_name(f".{target.name}.part")
+            copy.save(tmp, 'WEBP', quality=WEBP_QUALITY, method=4)
+            os.replace(tmp, target)
+            written.append(target.name)
+    return written
+
+
+def get_pool() -> concurrent.futures.ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        workers = int(os.getenv('IMAGE_WORKERS', '2'))
+        _pool = concurrent.futures.ProcessPoolExecutor(max_workers=max(1, workers))
+    return _pool
+
+
+def _log_failure(future: concurrent.futures.Future) -> None:
+    exc = future.exception()
+    if exc is not None:
+        print(f"Image derivative generation failed: {exc}")
+
+
+def schedule_derivatives(source: Path) -> Optional[concurrent.futures.Future]:
+    """Queue rendering in the process pool (fire and forget); None if Pillow is missing"""
+    if not available():
+        return None
+    future = get_pool().submit(render_derivatives, str(source))
+    future.add_done_callback(_log_failure)
+    return future
+
+
+def shutdown() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
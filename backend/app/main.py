@@ -1,4 +1,5 @@
-from fastapi import FastAPI, HTTPException, Depends
+from contextlib import asynccontextmanager
+from fastapi import APIRouter, FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 from . import models, schemas
@@ -7,45 +8,64 @@ from . import product_schemas
 from . import donation_models
 from . import donation_schemas
 from pydantic import ValidationError
-from fastapi import Body, Request
-from fastapi import UploadFile, File
+from fastapi import Body, Request, Query
 import datetime
-from .database import SessionLocal, engine
+from .database import SessionLocal, async_engine, get_async_db, get_read_db
 import os
 from pathlib import Path
-import uuid
-from fastapi.staticfiles import StaticFiles
 import base64
 from starlette.responses import Response
-from fastapi.responses import FileResponse
-from .openfoodfacts import OpenFoodFactsClient
-from .openfoodfacts_routes import router as off_router
+from fastapi.responses import FileResponse, ORJSONResponse
+from sqlalchemy import or_, and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from .openfoodfacts_routes import get_product_by_barcode, router as off_router
 from .rating_routes import router as rating_router
+from .store_routes import router as store_router
+from .community_routes import router as community_router
+from .basket_routes import router as basket_router
+from .sync_routes import router as sync_router
+from .receipt_routes import router as receipt_router
+from .match_routes import router as match_router
 from . import rating_models
+from . import store_models
+from . import sync_models
+from . import http_clients
+from .product_catalog import product_clause, resolve_product_id
+from .http_cache import ImmutableStaticFiles, ConditionalGetMiddleware
+from .uploads import store_image_upload
+from . import image_derivatives
+from .singleflight import ClientDisconnected
+from .db_writer import writer, added
+from .schema import init_schema
+from .response_cache import ResponseCacheMiddleware, response_cache
+from .compression import CompressionMiddleware, PrecompressedStaticFiles
+
+# Endpoints defined in this module; create_app() includes it next to the feature routers
+router = APIRouter()
 
-models.Base.metadata.create_all(bind=engine)
-product_models.Base = getattr(product_models, 'Base', None)
-try:
-    product_models.Base.metadata.create_all(bind=engine)
-except Exception:
-    pass
-donation_models.Base = getattr(donation_models, 'Base', None)
-try:
-    donation_models.Base.metadata.create_all(bind=engine)
-except Exception:
-    pass
-rating_models.Base = getattr(rating_models, 'Base', None)
-try:
-    rating_models.Base.metadata.create_all(bind=engine)
-except Exception:
-    pass
-
-app = FastAPI(title="WirkaufenFair API")
+FRONTEND_DIR = Path(__file__).resolve().parents[2] / 'frontend'
+# Uploads: stored names are content hashes (or random for legacy uploads) and never reused
+UPLOAD_DIR = Path(__file__).resolve().parents[2] / 'uploads'
+MAX_UPLOAD_BYTES = 5 * 1024 * 1024  # 5 MiB
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Per worker: schema check, upload dir and shared clients up front; everything closed on shutdown"""
+    init_schema()
+    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    await http_clients.start()
+    try:
+        yield
+    finally:
+        await http_clients.close()
+        image_derivatives.shutdown()
+        writer.stop()
+        await async_engine.dispose()
 
 
 # HTTP Basic protect admin static pages when ADMIN_USER/ADMIN_PASSWORD env vars are set.
 # If both are set, any request path starting with /admin will require a Basic auth header.
-@app.middleware("http")
 async def admin_basic_auth_middleware(request, call_next):
     try:
         admin_user = os.getenv('ADMIN_USER')
@@ -68,25 +88,28 @@ async def admin_basic_auth_middleware(request, call_next):
         pass
     return await call_next(request)
 
-# Serve frontend static files (if frontend folder exists in repo root)
-FRONTEND_DIR = Path(__file__).resolve().parents[2] / 'frontend'
-if FRONTEND_DIR.exists():
+
+def mount_frontend(app: FastAPI) -> None:
+    """Serve frontend static files (if frontend folder exists in repo root)"""
+    if not FRONTEND_DIR.exists():
+        return
     # mount admin folder separately (to serve /admin/... paths)
     ADMIN_DIR = FRONTEND_DIR / 'admin'
     if ADMIN_DIR.exists():
-        app.mount('/admin', StaticFiles(directory=str(ADMIN_DIR), html=True), name='admin')
+        app.mount('/admin', PrecompressedStaticFiles(directory=str(ADMIN_DIR), html=True), name='admin')
     # mount rest of frontend at /static
-    app.mount('/static', StaticFiles(directory=str(FRONTEND_DIR), html=True), name='frontend')
+    frontend_files = PrecompressedStaticFiles(directory=str(FRONTEND_DIR), html=True)
+    app.mount('/static', frontend_files, name='frontend')
     # mount /assets directly so absolute asset paths work
     ASSETS_DIR = FRONTEND_DIR / 'assets'
     if ASSETS_DIR.exists():
-        app.mount('/assets', StaticFiles(directory=str(ASSETS_DIR)), name='assets')
+        app.mount('/assets', PrecompressedStaticFiles(directory=str(ASSETS_DIR)), name='assets')
     # serve /style.css for legacy absolute path references
     STYLE_PATH = FRONTEND_DIR / 'style.css'
     if STYLE_PATH.exists():
         @app.get('/style.css')
-        def style_css():
-            return FileResponse(str(STYLE_PATH))
+        async def style_css(request: Request):
+            return await frontend_files.get_response('style.css', request.scope)
     # serve /favicon.ico if available under assets
     FAVICON_ICO = ASSETS_DIR / 'favicon.ico' if ASSETS_DIR.exists() else None
     FAVICON_PNG = ASSETS_DIR / 'favicon.png' if ASSETS_DIR.exists() else None
@@ -106,52 +129,72 @@ if FRONTEND_DIR.exists():
     def admin_root():
         return Response(status_code=302, headers={'Location': '/admin/product_locations.html'})
 
-# Uploads: configure directory and mount static serving
-UPLOAD_DIR = Path(__file__).resolve().parents[2] / 'uploads'
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
-app.mount('/uploads', StaticFiles(directory=str(UPLOAD_DIR)), name='uploads')
 
-ALLOWED_EXTS = {'.jpg', '.jpeg', '.png', '.webp', '.gif'}
-MAX_UPLOAD_BYTES = 5 * 1024 * 1024  # 5 MiB
+async def client_disconnected(request: Request, exc: ClientDisconnected):
+    # nobody reads this response; 499 (nginx: "client closed request") keeps it apart in access logs
+    return Response(status_code=499)
 
 
-@app.post('/api/v1/uploads')
-async def upload_image(file: UploadFile = File(...)):
-    # Basic type/size checks
-    ct = (file.content_type or '').lower()
-    if not ct.startswith('image/'):
-        raise HTTPException(status_code=400, detail='Only image uploads are allowed')
-    # Read file into memory to size-check (simple MVP)
-    data = await file.read()
-    if len(data) > MAX_UPLOAD_BYTES:
-        raise HTTPException(status_code=413, detail='File too large (max 5 MiB)')
-    # Extension sanitation
-    ext = Path(file.filename or '').suffix.lower()
-    if ext not in ALLOWED_EXTS:
-        # try to guess from content type
-        if '/jpeg' in ct:
-            ext = '.jpg'
-        elif '/png' in ct:
-            ext = '.png'
-        elif '/webp' in ct:
-            ext = '.webp'
-        elif '/gif' in ct:
-            ext = '.gif'
-        else:
-            raise HTTPException(status_code=400, detail='Unsupported image type')
-    fname = f"{uuid.uuid4().hex}{ext}"
-    fpath = UPLOAD_DIR / fname
-    with open(fpath, 'wb') as f:
-        f.write(data)
-    return {"url": f"/uploads/{fname}"}
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+def create_app() -> FastAPI:
+    """
+    Build the ASGI app. Nothing here touches the database or the filesystem beyond
+    checking which frontend folders exist; that happens in `lifespan` when a worker starts.
+    """
+    # orjson: several times faster than the stdlib encoder on the large OFF/product lists
+    app = FastAPI(title="WirkaufenFair API", lifespan=lifespan, default_response_class=ORJSONResponse)
+    app.middleware('http')(admin_basic_auth_middleware)
+    mount_frontend(app)
+    # the directory is created by the lifespan
+    app.mount('/uploads', ImmutableStaticFiles(directory=str(UPLOAD_DIR), check_dir=False), name='uploads')
+    app.add_exception_handler(ClientDisconnected, client_disconnected)
+    # innermost first: ETag/Cache-Control are part of what the response cache stores,
+    # and a cache hit still gets CORS headers
+    app.add_middleware(ConditionalGetMiddleware)
+    app.add_middleware(ResponseCacheMiddleware)
+    # outside the response cache: it keeps one uncompressed copy for every encoding
+    app.add_middleware(CompressionMiddleware)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    app.include_router(router)
+    for feature_router in (off_router, rating_router, store_router, community_router, basket_router,
+                           sync_router, receipt_router, match_router):
+        app.include_router(feature_router)
+    return app
+
+
+@router.get('/api/v1/response_cache/stats')
+def response_cache_stats():
+    """Hits, misses and hit ratio per cached route (app/response_cache.py)"""
+    return response_cache.snapshot()
+
+
+# the body is parsed by store_image_upload as it streams in, so the schema is declared by hand
+UPLOAD_REQUEST_BODY = {'requestBody': {'required': True, 'content': {'multipart/form-data': {'schema': {
+    'type': 'object', 'required': ['file'], 'properties': {'file': {'type': 'string', 'format': 'binary'}},
+}}}}}
+
+
+@router.post('/api/v1/uploads', openapi_extra=UPLOAD_REQUEST_BODY)
+async def upload_image(request: Request):
+    """Store an image (multipart field `file`) under its content hash; identical uploads return the same URL"""
+    stored = await store_image_upload(request, UPLOAD_DIR, MAX_UPLOAD_BYTES)
+    derivatives = {}
+    if image_derivatives.available() and not stored.filename.endswith('.gif'):
+        # rendered in the background; URLs 404 for a moment until the worker is done
+        image_derivatives.schedule_derivatives(UPLOAD_DIR / stored.filename)
+        derivatives = {str(w): f"/uploads/{name}" for w, name in image_derivatives.derivative_names(stored.filename).items()}
+    return {
+        "url": f"/uploads/{stored.filename}",
+        "sha256": stored.sha256,
+        "size": stored.size,
+        "deduplicated": not stored.created,
+        "derivatives": derivatives,
+    }
 
 
 def get_db():
@@ -162,86 +205,146 @@ def get_db():
         db.close()
 
 
-@app.post('/api/v1/signup', response_model=schemas.Signup)
-def create_signup(signup: schemas.SignupCreate, db: Session = Depends(get_db)):
+@router.post('/api/v1/signup', response_model=schemas.Signup)
+def create_signup(signup: schemas.SignupCreate):
     db_signup = models.Signup(name=signup.name, email=signup.email, role=signup.role, notes=signup.notes)
-    db.add(db_signup)
-    db.commit()
-    db.refresh(db_signup)
-    return db_signup
+    return writer.run(lambda db: added(db, db_signup))
 
 
-@app.get('/api/v1/signups', response_model=list[schemas.Signup])
-def list_signups(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+@router.get('/api/v1/signups', response_model=list[schemas.Signup])
+def list_signups(skip: int = 0, limit: int = 100, db: Session = Depends(get_read_db)):
     items = db.query(models.Signup).offset(skip).limit(limit).all()
     return items
 
 
-@app.post('/api/v1/product_locations', response_model=product_schemas.ProductLocation)
-def suggest_product_location(payload: product_schemas.ProductLocationCreate = Body(...), db: Session = Depends(get_db)):
+@router.post('/api/v1/product_locations', response_model=product_schemas.ProductLocation)
+def suggest_product_location(payload: product_schemas.ProductLocationCreate = Body(...)):
     # payload is validated by Pydantic
     pl = product_models.ProductLocation(**payload.dict())
-    db.add(pl)
-    db.commit()
-    db.refresh(pl)
-    return pl
+    return writer.run(lambda db: added(db, pl))
+
+
+PRODUCT_LOCATION_FIELDS = {c.name for c in product_models.ProductLocation.__table__.columns}
+PRODUCT_LOCATIONS_PAGE_MAX = 500
+
+
+def encode_cursor(created_at: datetime.datetime, id: int) -> str:
+    raw = f"{created_at.isoformat()}|{id}".encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> tuple[datetime.datetime, int]:
+    padded = cursor + '=' * (-len(cursor) % 4)
+    created_at, _, id = base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8').partition('|')
+    return datetime.datetime.fromisoformat(created_at), int(id)
 
 
-@app.get('/api/v1/product_locations')
-@app.get('/api/v1/product_locations', response_model=list[product_schemas.ProductLocation])
-def list_product_locations(product_identifier: str | None = None, db: Session = Depends(get_db)):
+@router.get('/api/v1/product_locations', response_model=list[product_schemas.ProductLocation])
+async def list_product_locations(
+    request: Request,
+    product_identifier: str | None = None,
+    store_name: str | None = None,
+    status: str | None = None,
+    is_regional: int | None = None,
+    cursor: str | None = None,
+    limit: int = Query(200, ge=1, le=PRODUCT_LOCATIONS_PAGE_MAX),
+    fields: str | None = Query(None, description="Comma-separated projection, e.g. id,product_identifier,store_name"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Newest first, keyset-paginated on (created_at, id). The next page is announced
+    via the X-Next-Cursor / Link headers so the body stays a plain list.
+    Validators come from ConditionalGetMiddleware (content hash, so they hold across
+    workers); the response cache in front usually saves the query for a revalidation.
+    """
+    projection = None
+    if fields:
+        projection = [f.strip() for f in fields.split(',') if f.strip()]
+        unknown = [f for f in projection if f not in PRODUCT_LOCATION_FIELDS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except Exception:
+            raise HTTPException(status_code=400, detail='Invalid cursor')
+
     try:
-        q = db.query(product_models.ProductLocation)
+        PL = product_models.ProductLocation
+        columns = [getattr(PL, f) for f in dict.fromkeys((projection or []) + ['id', 'created_at'])] if projection else [PL]
+        q = select(*columns)
         if product_identifier:
-            q = q.filter(product_models.ProductLocation.product_identifier == product_identifier)
-        items = q.order_by(product_models.ProductLocation.created_at.desc()).limit(200).all()
-        return items
+            q = q.where(await db.run_sync(product_clause, PL, product_identifier))
+        if store_name:
+            q = q.where(PL.store_name == store_name)
+        if status:
+            q = q.where(PL.status == status)
+        if is_regional is not None:
+            q = q.where(PL.is_regional == is_regional)
+        if after:
+            after_ts, after_id = after
+            q = q.where(or_(PL.created_at < after_ts, and_(PL.created_at == after_ts, PL.id < after_id)))
+        result = await db.execute(q.order_by(PL.created_at.desc(), PL.id.desc()).limit(limit + 1))
+        rows = result.all() if projection else result.scalars().all()
     except Exception as e:
         # Log error for debugging and return a controlled 500
         print(f"Error in list_product_locations: {e}")
-        from fastapi import HTTPException
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
+    headers = {}
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if projection:
+        items = [{f: getattr(r, f) for f in projection} for r in rows]
+    else:
+        items = [product_schemas.ProductLocation.model_validate(r, from_attributes=True).model_dump(mode='json') for r in rows]
+    if has_more and rows[-1].created_at is not None:
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+        headers['X-Next-Cursor'] = next_cursor
+        headers['Link'] = f'<{request.url.include_query_params(cursor=next_cursor)}>; rel="next"'
+    return ORJSONResponse(content=items, headers=headers)
 
-@app.get('/api/v1/products/lookup/{barcode}')
-def lookup_product(barcode: str):
+
+@router.get('/api/v1/products/lookup/{barcode}')
+async def lookup_product(barcode: str, request: Request):
     """
     Lookup product info from Open Food Facts by barcode (EAN/GTIN).
     Returns product name, brand, categories, image, etc.
+    Same path as the OFF proxy's product endpoint: product cache, single flight, upstream scheduler.
     """
-    client = OpenFoodFactsClient()
-    product = client.get_product(barcode)
-    if not product:
-        raise HTTPException(status_code=404, detail='Product not found in Open Food Facts')
+    try:
+        product = await get_product_by_barcode(barcode, request)
+    except HTTPException as e:
+        if e.status_code == 404:
+            raise HTTPException(status_code=404, detail='Product not found in Open Food Facts')
+        raise
     return {
         "barcode": barcode,
-        "product_name": product.get("product_name") or product.get("product_name_de"),
-        "brands": product.get("brands"),
-        "categories": product.get("categories"),
+        "product_name": product.get("product_name") or product.get("product_name_orig"),
+        "brands": product.get("brand"),
+        "categories": product.get("categories_text"),
         "image_url": product.get("image_url"),
-        "nutriscore_grade": product.get("nutriscore_grade"),
-        "ecoscore_grade": product.get("ecoscore_grade"),
+        "nutriscore_grade": (product.get("nutriscore") or '').lower() or None,
+        "ecoscore_grade": (product.get("ecoscore") or '').lower() or None,
     }
 
 
-@app.post('/api/v1/donations', response_model=donation_schemas.Donation)
-def create_donation(payload: donation_schemas.DonationCreate = Body(...), db: Session = Depends(get_db)):
+@router.post('/api/v1/donations', response_model=donation_schemas.Donation)
+def create_donation(payload: donation_schemas.DonationCreate = Body(...)):
     data = payload.dict()
     d = donation_models.Donation(**data)
-    db.add(d)
-    db.commit()
-    db.refresh(d)
-    return d
+    return writer.run(lambda db: added(db, d))
 
 
-@app.get('/api/v1/donations', response_model=list[donation_schemas.Donation])
-def list_donations(skip: int = 0, limit: int = 200, db: Session = Depends(get_db)):
+@router.get('/api/v1/donations', response_model=list[donation_schemas.Donation])
+def list_donations(skip: int = 0, limit: int = 200, db: Session = Depends(get_read_db)):
     items = db.query(donation_models.Donation).order_by(donation_models.Donation.created_at.desc()).offset(skip).limit(limit).all()
     return items
 
 
-@app.post('/api/v1/product_locations/{id}/vote')
-def vote_product_location(id: int, vote: dict = Body(...), db: Session = Depends(get_db), request: Request = None):
+@router.post('/api/v1/product_locations/{id}/vote')
+def vote_product_location(id: int, vote: dict = Body(...), request: Request = None):
     # Simple API key protection for admin actions.
     admin_key = os.getenv('ADMIN_API_KEY')
     if admin_key:
@@ -249,76 +352,54 @@ def vote_product_location(id: int, vote: dict = Body(...), db: Session = Depends
         header_key = request.headers.get('x-api-key') if request else None
         if header_key != admin_key:
             raise HTTPException(status_code=401, detail='Unauthorized')
-    pl = db.query(product_models.ProductLocation).filter(product_models.ProductLocation.id == id).first()
-    if not pl:
-        raise HTTPException(status_code=404, detail='Not found')
-    v = vote.get('vote')
-    if v == 'up':
-        pl.upvotes = pl.upvotes + 1
-    elif v == 'down':
-        pl.downvotes = pl.downvotes + 1
-    else:
-        raise HTTPException(status_code=400, detail='vote must be up or down')
-    db.commit()
-    return {"id": pl.id, "upvotes": pl.upvotes, "downvotes": pl.downvotes}
+
+    def write(db):
+        pl = db.query(product_models.ProductLocation).filter(product_models.ProductLocation.id == id).first()
+        if not pl:
+            raise HTTPException(status_code=404, detail='Not found')
+        v = vote.get('vote')
+        if v == 'up':
+            pl.upvotes = pl.upvotes + 1
+        elif v == 'down':
+            pl.downvotes = pl.downvotes + 1
+        else:
+            raise HTTPException(status_code=400, detail='vote must be up or down')
+        return {"id": pl.id, "upvotes": pl.upvotes, "downvotes": pl.downvotes}
+    return writer.run(write)
 
 
-@app.post('/api/v1/product_locations/{id}/verify')
-def verify_product_location(id: int, verifier: dict = Body(...), db: Session = Depends(get_db), request: Request = None):
+@router.post('/api/v1/product_locations/{id}/verify')
+def verify_product_location(id: int, verifier: dict = Body(...), request: Request = None):
     # API key check (header-only)
     admin_key = os.getenv('ADMIN_API_KEY')
     if admin_key:
         header_key = request.headers.get('x-api-key') if request else None
         if header_key != admin_key:
             raise HTTPException(status_code=401, detail='Unauthorized')
-    pl = db.query(product_models.ProductLocation).filter(product_models.ProductLocation.id == id).first()
-    if not pl:
-        raise HTTPException(status_code=404, detail='Not found')
-    pl.status = 'verified'
-    pl.verified_by = verifier.get('verifier')
-    pl.verified_at = datetime.datetime.utcnow()
-    db.commit()
-    return {"id": pl.id, "status": pl.status, "verified_by": pl.verified_by}
-
-# Include OpenFoodFacts API routes
-app.include_router(off_router)
-
-# Include Ratings & Price Reports routes
-app.include_router(rating_router)
 
-# Include Store routes
-from .store_routes import router as store_router
-from . import store_models
-store_models.Base = getattr(store_models, 'Base', None)
-try:
-    store_models.Base.metadata.create_all(bind=engine)
-except Exception:
-    pass
-app.include_router(store_router)
-
-# Include community routes (Overpass/OSM proxy)
-from .community_routes import router as community_router
-app.include_router(community_router)
+    def write(db):
+        pl = db.query(product_models.ProductLocation).filter(product_models.ProductLocation.id == id).first()
+        if not pl:
+            raise HTTPException(status_code=404, detail='Not found')
+        pl.status = 'verified'
+        pl.verified_by = verifier.get('verifier')
+        pl.verified_at = datetime.datetime.utcnow()
+        return {"id": pl.id, "status": pl.status, "verified_by": pl.verified_by}
+    return writer.run(write)
 
 # Create a ProductLocation from Open Food Facts product payload
-@app.post('/api/v1/product_locations/from_off', response_model=product_schemas.ProductLocation)
-def create_product_from_off(payload: dict = Body(...), db: Session = Depends(get_db)):
+@router.post('/api/v1/product_locations/from_off', response_model=product_schemas.ProductLocation)
+def create_product_from_off(payload: dict = Body(...)):
     """
     Accepts OFF-like payload and persists a ProductLocation for the selected store.
     Expected fields: product_identifier (required), store_name (required), size_amount?, size_unit?, image_url?, aisle?, shelf_label?
+    An existing location of the same product in the store is returned instead.
     """
     product_identifier = payload.get('product_identifier')
     store_name = payload.get('store_name')
     if not product_identifier or not store_name:
         raise HTTPException(status_code=400, detail='product_identifier and store_name are required')
 
-    existing = db.query(product_models.ProductLocation).filter(
-        product_models.ProductLocation.product_identifier == product_identifier,
-        product_models.ProductLocation.store_name == store_name
-    ).first()
-    if existing:
-        return existing
-
     pl = product_models.ProductLocation(
         product_identifier=product_identifier,
         store_name=store_name,
@@ -336,19 +417,34 @@ def create_product_from_off(payload: dict = Body(...), db: Session = Depends(get
         price_history=payload.get('price_history'),
         created_at=datetime.datetime.utcnow()
     )
-    db.add(pl)
-    db.commit()
-    db.refresh(pl)
-    return pl
+
+    def write(db):
+        # checked inside the write job: jobs run one at a time, so two concurrent selects cannot both insert
+        existing = db.query(product_models.ProductLocation).filter(
+            product_clause(db, product_models.ProductLocation, product_identifier),
+            product_models.ProductLocation.store_name == store_name
+        ).first()
+        if existing:
+            return existing
+        if payload.get('barcode'):
+            # link the OFF barcode and the display identifier to one product
+            pl.product_id = resolve_product_id(db, product_identifier, barcode=payload.get('barcode'),
+                                               brand=payload.get('brand'), quantity=payload.get('quantity'))
+        return added(db, pl)
+    return writer.run(write)
 
 # User feedback on availability and optional metadata updates
-@app.post('/api/v1/product_locations/{id}/feedback')
-def product_location_feedback(id: int, feedback: dict = Body(...), db: Session = Depends(get_db)):
+@router.post('/api/v1/product_locations/{id}/feedback')
+def product_location_feedback(id: int, feedback: dict = Body(...)):
     """
     Feedback schema:
     { "found": true|false, "aisle"?: str, "shelf_label"?: str, "photo_url"?: str }
     If found = true increments upvote else increments downvote; also updates provided fields.
     """
+    return writer.run(lambda db: _apply_feedback(db, id, feedback))
+
+
+def _apply_feedback(db: Session, id: int, feedback: dict) -> dict:
     pl = db.query(product_models.ProductLocation).filter(product_models.ProductLocation.id == id).first()
     if not pl:
         raise HTTPException(status_code=404, detail='Not found')
@@ -367,6 +463,7 @@ def product_location_feedback(id: int, feedback: dict = Body(...), db: Session =
     if 'photo_url' in feedback:
         pl.photo_url = feedback.get('photo_url')
 
-    db.commit()
-    db.refresh(pl)
     return {"id": pl.id, "upvotes": pl.upvotes, "downvotes": pl.downvotes, "aisle": pl.aisle, "shelf_label": pl.shelf_label, "photo_url": pl.photo_url}
+
+
+app = create_app()
@@ -0,0 +1,19 @@
+"""
+Shopping list matching: free-text items -> top-k known products in one round trip.
+"""
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from . import match_schemas
+from .database import get_read_db
+from .matcher import match_items
+
+router = APIRouter(prefix="/api/v1", tags=["Matching"])
+
+
+@router.post("/match", response_model=match_schemas.MatchResponse)
+def match_shopping_list(payload: match_schemas.MatchRequest, db: Session = Depends(get_read_db)):
+    """Synonyms, categories and typos are handled server-side (same rules as matcher.js)"""
+    matches = match_items(db, payload.items, limit=payload.limit, store_name=payload.store_name)
+    return match_schemas.MatchResponse(results=[
+        match_schemas.ItemMatches(query=item, matches=found) for item, found in zip(payload.items, matches)
+    ])
@@ -0,0 +1,25 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List
+
+
+class MatchRequest(BaseModel):
+    items: List[str] = Field(..., max_length=200)  # free-text shopping list entries
+    limit: int = Field(5, ge=1, le=20)  # matches per item
+    store_name: Optional[str] = None  # only products known at this store
+
+
+class ProductMatch(BaseModel):
+    product_identifier: str
+    product_id: Optional[int] = None
+    score: float  # 0-1
+    category: Optional[str] = None
+    stores: List[str] = []
+
+
+class ItemMatches(BaseModel):
+    query: str
+    matches: List[ProductMatch]
+
+
+class MatchResponse(BaseModel):
+    results: List[ItemMatches]
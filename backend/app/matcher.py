@@ -0,0 +1,260 @@
+"""
+Shopping list matching on the server: free-text list items -> known products.
+
+Port of the rules in frontend/assets/modules/matcher.js (SYNONYMS, CATEGORIES,
+CATEGORY_EXCLUSIONS, BRANDS, STOP_WORDS, quantity stripping) on top of an
+inverted index over product names, brands and categories, so clients no
+longer have to download product lists to match locally.
+
+Index layout:
+- postings: word -> entry ids (entries are canonical products, or raw
+  identifiers not linked to one yet)
+- sorted vocabulary for prefix matches ("hafer" -> "hafermilch")
+- deletion neighbourhood (SymSpell, distance 1) for typos ("jogurt", "milhc")
+
+The index is built once and then kept current incrementally (product_index.ProductIndex).
+"""
+import bisect
+import math
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from .product_index import IndexEntry, ProductIndex, SharedIndex
+from .receipt_parser import tokenize
+
+SYNONYMS = {
+    'milch': ['milch', 'vollmilch', 'frischmilch', 'h-milch', 'hafermilch', 'haferdrink', 'hafer', 'oat', 'oatmilk',
+              'oat-milk', 'mandelmilch', 'mandel', 'almond', 'almondmilk', 'sojamilch', 'sojadrink', 'soja', 'soy',
+              'soy-milk', 'kokosmilch', 'coconut', 'drink', 'pflanzenmilch', 'plant milk', 'plantmilk'],
+    'joghurt': ['joghurt', 'jogurt', 'yogurt', 'yoghurt'],
+    'käse': ['käse', 'cheese', 'gouda', 'emmentaler'],
+    'brot': ['brot', 'bread', 'vollkornbrot', 'toast'],
+}
+
+CATEGORIES = {
+    'obst': ['apfel', 'birne', 'banane', 'orange', 'erdbeere'],
+    'gemüse': ['tomate', 'gurke', 'paprika', 'salat', 'möhre', 'kartoffel'],
+    'milchprodukte': ['milch', 'joghurt', 'käse', 'quark', 'sahne'],
+    'butter': ['butter', 'margarine'],
+    'fleisch': ['rind', 'schwein', 'hähnchen', 'huhn', 'pute', 'wurst'],
+    'getränke': ['wasser', 'saft', 'limonade', 'cola', 'tee', 'kaffee', 'bier'],
+}
+
+CATEGORY_EXCLUSIONS = {
+    'milch': ['butter'],
+    'joghurt': ['butter'],
+}
+
+BRANDS = ['danone', 'müller', 'arla', 'weihenstephan', 'alpro', 'oatly', 'nestlé', 'coca-cola']
+STOP_WORDS = {'der', 'die', 'das', 'den', 'dem', 'ein', 'eine', 'einen', 'einem', 'und', 'oder', 'mit', 'ohne', 'für',
+              'zum', 'zur', 'von', 'im', 'in', 'auf', 'an', 'am', 'zu', 'bei'}
+UNIT_WORDS = {'g', 'kg', 'ml', 'l', 'liter', 'st', 'stk', 'stück', 'x', 'pack', 'packung'}
+
+# match weights by how a query token reached an index word
+EXACT, SYNONYM, CATEGORY = 1.0, 0.6, 0.45
+TYPO = 0.7
+MAX_PREFIX_EXPANSION = 30
+
+
+def _fold(word: str) -> str:
+    # same folding as the index tokens ('käse' -> 'kaese'); multi-word synonyms keep their first word
+    tokens = tokenize(word)
+    return ''.join(tokens) if tokens else ''
+
+
+def core_tokens(text: str) -> List[str]:
+    """getCoreQueryTokens: drop quantities, units and stop words ('2x 500g Vollmilch' -> ['vollmilch'])"""
+    stop = {_fold(w) for w in STOP_WORDS} | {_fold(w) for w in UNIT_WORDS}
+    return [t for t in tokenize(text) if t.isalpha() and len(t) >= 3 and t not in stop]
+
+
+def _build_groups(groups: Dict[str, List[str]]) -> Dict[str, Tuple[str, Set[str]]]:
+    """folded member -> (folded key, all folded members)"""
+    lookup = {}
+    for key, members in groups.items():
+        folded = {_fold(m) for m in members} | {_fold(key)}
+        folded.discard('')
+        for m in folded:
+            lookup.setdefault(m, (_fold(key), folded))
+    return lookup
+
+
+_SYNONYMS = _build_groups(SYNONYMS)
+_CATEGORY_ITEMS = {_fold(c): {_fold(i) for i in items} for c, items in CATEGORIES.items()}
+_CATEGORY_EXCLUSIONS = {_fold(k): {_fold(c) for c in v} for k, v in CATEGORY_EXCLUSIONS.items()}
+_BRANDS = [_fold(b) for b in BRANDS]
+# words worth splitting out of compounds ("hafermilch" -> "milch", "vollkornbrot" -> "brot")
+_COMPOUND_HEADS = sorted({m for _, members in _SYNONYMS.values() for m in members if len(m) >= 4} |
+                         {i for items in _CATEGORY_ITEMS.values() for i in items if len(i) >= 4}, key=len, reverse=True)
+
+
+def product_category(name: str) -> Optional[str]:
+    """getProductCategory: first category with an item contained in the name"""
+    folded = ' '.join(tokenize(name))
+    for category, items in _CATEGORY_ITEMS.items():
+        if any(item in folded for item in items):
+            return category
+    return None
+
+
+def _deletes(word: str) -> Set[str]:
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+def _within_one_edit(a: str, b: str) -> bool:
+    """Damerau-Levenshtein distance <= 1"""
+    if a == b:
+        return True
+    la, lb = len(a), len(b)
+    if abs(la - lb) > 1:
+        return False
+    if la == lb:
+        diff = [i for i in range(la) if a[i] != b[i]]
+        if len(diff) == 1:
+            return True
+        return len(diff) == 2 and diff[1] == diff[0] + 1 and a[diff[0]] == b[diff[1]] and a[diff[1]] == b[diff[0]]
+    if la > lb:
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    return a[i:] == b[i + 1:]
+
+
+class MatchIndex(ProductIndex):
+    """Entries are indexed under their name, brand and identifier words, plus compound heads"""
+
+    def __init__(self):
+        super().__init__()
+        self.deletes: Dict[str, Set[str]] = {}
+
+    def word_added(self, word: str) -> None:
+        if len(word) >= 4:
+            for d in _deletes(word):
+                self.deletes.setdefault(d, set()).add(word)
+
+    def entry_tokens(self, entry: IndexEntry) -> Set[str]:
+        texts = [entry.display, entry.brand or ''] + list(entry.variants)
+        tokens = set()
+        for text in texts:
+            for token in tokenize(text):
+                if token.isalpha() and len(token) >= 2:
+                    tokens.add(token)
+        for token in list(tokens):
+            for head in _COMPOUND_HEADS:
+                if token != head and token.endswith(head):
+                    tokens.add(head)
+                    break
+        entry.category = product_category(' '.join(texts))
+        return tokens
+
+    # --- querying -------------------------------------------------------------------------
+
+    def _expand(self, token: str) -> Dict[str, float]:
+        """Index words a query token can stand for, with weights"""
+        matches: Dict[str, float] = {}
+
+        def add(word, weight):
+            if self.postings.get(word) and weight > matches.get(word, 0):
+                matches[word] = weight
+
+        add(token, EXACT)
+        lo = bisect.bisect_left(self.vocabulary, token)
+        for word in self.vocabulary[lo:lo + MAX_PREFIX_EXPANSION]:
+            if not word.startswith(token):
+                break
+            add(word, 0.75 + 0.25 * len(token) / len(word))
+        if token not in self.postings and len(token) >= 4:
+            candidates = set(self.deletes.get(token, ()))
+            for d in _deletes(token):
+                candidates.add(d)
+                candidates.update(self.deletes.get(d, ()))
+            for word in candidates:
+                if _within_one_edit(token, word):
+                    add(word, TYPO)
+        group = _SYNONYMS.get(token)
+        if group:
+            for word in group[1]:
+                self._add_with_inflections(add, word, SYNONYM)
+        items = _CATEGORY_ITEMS.get(token)
+        if items:
+            for word in items:
+                self._add_with_inflections(add, word, CATEGORY)
+        return matches
+
+    def _add_with_inflections(self, add, word: str, weight: float) -> None:
+        # synonym/category lists hold base forms: 'banane' must reach 'bananen'
+        add(word, weight)
+        lo = bisect.bisect_left(self.vocabulary, word)
+        for candidate in self.vocabulary[lo:lo + 3]:
+            if candidate.startswith(word) and len(candidate) - len(word) <= 2:
+                add(candidate, weight)
+
+    def _idf(self, word: str) -> float:
+        return math.log(1 + len(self.entries) / max(len(self.postings.get(word, ())), 1))
+
+    def match(self, text: str, limit: int = 5, store_name: Optional[str] = None, min_score: float = 0.3) -> List[dict]:
+        tokens = list(dict.fromkeys(core_tokens(text)))
+        if not tokens or not self.entries:
+            return []
+        excluded = set()
+        for token in tokens:
+            excluded |= _CATEGORY_EXCLUSIONS.get(token, set())
+        folded_query = ''.join(tokenize(text))
+        max_idf = math.log(1 + len(self.entries))
+
+        scores: Dict[object, float] = {}
+        possible = 0.0
+        for token in tokens:
+            expansions = self._expand(token)
+            possible += max((self._idf(w) for w in expansions), default=max_idf)
+            best: Dict[object, float] = {}
+            for word, weight in expansions.items():
+                value = weight * self._idf(word)
+                for key in self.postings[word]:
+                    if value > best.get(key, 0):
+                        best[key] = value
+            for key, value in best.items():
+                scores[key] = scores.get(key, 0.0) + value
+
+        ranked = []
+        for key, value in scores.items():
+            entry = self.entries[key]
+            if store_name and store_name not in entry.stores:
+                continue
+            if entry.category in excluded:
+                continue
+            score = value / possible
+            # brandBoost: brand named in the query and present on the product
+            if any(b in folded_query and b in entry.tokens for b in _BRANDS):
+                score += 0.1
+            # shorter names explain the query better ("Milch 1L" before "Milchreis Schoko Vanille")
+            score -= 0.02 * max(len(entry.tokens) - len(tokens), 0)
+            if score >= min_score:
+                ranked.append((min(score, 1.0), entry))
+        ranked.sort(key=lambda x: (-x[0], x[1].display))
+        return [
+            {
+                'product_identifier': entry.display,
+                'product_id': entry.product_id,
+                'score': round(score, 3),
+                'category': entry.category,
+                'stores': sorted(entry.stores),
+            }
+            for score, entry in ranked[:limit]
+        ]
+
+
+_shared: SharedIndex[MatchIndex] = SharedIndex(MatchIndex)
+
+
+def get_match_index(db: Session) -> MatchIndex:
+    """Shared index; brought up to date (incrementally) whenever product tables have new commits"""
+    return _shared.get(db)
+
+
+def match_items(db: Session, items: Iterable[str], limit: int = 5, store_name: Optional[str] = None) -> List[List[dict]]:
+    index = get_match_index(db)
+    with _shared.lock:
+        return [index.match(item, limit=limit, store_name=store_name) for item in items]
@@ -0,0 +1,157 @@
+"""
+Helpers for the revisions in backend/migrations/versions.
+
+Revisions have to work on two kinds of databases: fresh ones and ones that
+grew through create_all and the old patch scripts, where any table, column
+or index may already exist. The *_if_missing helpers make every step
+idempotent.
+
+Big tables must not be locked for minutes:
+
+    create_index_online   PostgreSQL: CREATE INDEX CONCURRENTLY outside the
+                          migration transaction (reads and writes continue).
+                          SQLite has no concurrent build; under WAL readers
+                          keep going, writers wait for the build.
+    backfill_in_batches   keyset-batched UPDATEs, each committed on its own,
+                          so the write lock is held per batch, with progress.
+"""
+import sys
+import time
+from typing import Iterable, Optional
+
+import sqlalchemy as sa
+from alembic import op
+
+BATCH_SIZE = 1000
+
+
+def _inspector():
+    return sa.inspect(op.get_bind())
+
+
+# offline (`alembic upgrade head --sql`) there is nothing to inspect: the script is
+# written for a database at the previous revision, so nothing exists yet
+
+def has_table(table: str) -> bool:
+    return not op.get_context().as_sql and _inspector().has_table(table)
+
+
+def has_column(table: str, column: str) -> bool:
+    return not op.get_context().as_sql and column in {c['name'] for c in _inspector().get_columns(table)}
+
+
+def has_index(table: str, name: str) -> bool:
+    return not op.get_context().as_sql and name in {i['name'] for i in _inspector().get_indexes(table)}
+
+
+def create_table_if_missing(table: str, *columns, **kw) -> bool:
+    if has_table(table):
+        return False
+    op.create_table(table, *columns, **kw)
+    return True
+
+
+def add_column_if_missing(table: str, column: sa.Column) -> bool:
+    if has_column(table, column.name):
+        return False
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite' and column.foreign_keys:
+        # Alembic adds the foreign key as a separate ALTER, which SQLite lacks (batch mode would
+        # copy the whole table); SQLite takes it inline on ADD COLUMN
+        ddl = str(sa.schema.CreateColumn(column).compile(dialect=bind.dialect))
+        for fk in column.foreign_keys:
+            target_table, target_column = fk.target_fullname.rsplit('.', 1)
+            ddl += f" REFERENCES {target_table} ({target_column})"
+        op.execute(f"ALTER TABLE {table} ADD COLUMN {ddl}")
+        return True
+    op.add_column(table, column)
+    return True
+
+
+def create_index_online(name: str, table: str, columns: Iterable[str], unique: bool = False) -> bool:
+    if has_index(table, name):
+        return False
+    if op.get_bind().dialect.name == 'postgresql':
+        # CONCURRENTLY cannot run inside a transaction block
+        with op.get_context().autocommit_block():
+            op.create_index(name, table, list(columns), unique=unique, postgresql_concurrently=True, if_not_exists=True)
+    else:
+        op.create_index(name, table, list(columns), unique=unique, if_not_exists=True)
+    return True
+
+
+def drop_index_online(name: str, table: str) -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+    else:
+        op.drop_index(name, table_name=table, if_exists=True)
+
+
+class Progress:
+    """`label: done/total (pct), rows/s, eta` every `every` seconds and at the end"""
+
+    def __init__(self, label: str, total: Optional[int], every: float = 2.0, out=None):
+        self.label = label
+        self.total = total
+        self.every = every
+        self.out = out or sys.stdout
+        self.done = 0
+        self.started = self._last = time.monotonic()
+
+    def advance(self, n: int) -> None:
+        self.done += n
+        now = time.monotonic()
+        if now - self._last >= self.every:
+            self._last = now
+            self._print(now)
+
+    def finish(self) -> None:
+        self._print(time.monotonic())
+
+    def _print(self, now: float) -> None:
+        elapsed = max(now - self.started, 1e-6)
+        rate = self.done / elapsed
+        line = f"{self.label}: {self.done}"
+        if self.total:
+            line += f"/{self.total} ({self.done / self.total:.0%})"
+            if rate and self.done < self.total:
+                line += f", eta {(self.total - self.done) / rate:.0f} s"
+        line += f", {rate:.0f} rows/s"
+        print(line, file=self.out, flush=True)
+
+
+def backfill_in_batches(table: str, set_sql: str, where_sql: str, batch_size: int = BATCH_SIZE,
+                        key: str = 'id', params: Optional[dict] = None) -> int:
+    """
+    UPDATE {table} SET {set_sql} WHERE {where_sql}, batch_size rows at a time in key order.
+    `where_sql` must stop matching rows once they are updated (e.g. `col IS NULL`), so the
+    backfill can be interrupted and run again.
+    """
+    if op.get_context().as_sql:
+        op.execute(sa.text(f"UPDATE {table} SET {set_sql} WHERE {where_sql}").bindparams(**(params or {})))
+        return 0
+    with op.get_context().autocommit_block():
+        conn = op.get_bind()
+        params = params or {}
+        total = conn.execute(sa.text(f"SELECT COUNT(*) FROM {table} WHERE {where_sql}"), params).scalar()
+        if not total:
+            return 0
+        progress = Progress(table, total)
+        select_batch = sa.text(
+            f"SELECT {key} FROM {table} WHERE ({where_sql}) AND {key} > :_last ORDER BY {key} LIMIT :_n"
+        )
+        update_batch = sa.text(
+            f"UPDATE {table} SET {set_sql} WHERE {key} IN :_keys"
+        ).bindparams(sa.bindparam('_keys', expanding=True))
+        # keyset from just below the smallest pending key
+        last = conn.execute(sa.text(f"SELECT MIN({key}) FROM {table} WHERE {where_sql}"), params).scalar() - 1
+        while True:
+            keys = conn.execute(select_batch, {**params, '_last': last, '_n': batch_size}).scalars().all()
+            if not keys:
+                break
+            conn.execute(update_batch, {**params, '_keys': keys})
+            last = keys[-1]
+            progress.advance(len(keys))
+        progress.finish()
+        return progress.done
@@ -0,0 +1,49 @@
+"""
+Opt-in background prefetch for the OFF proxy (OFF_PREFETCH=1).
+
+After a search response has been sent, the next page and the detail records
+of the top results are fetched into the proxy caches, so the page-2 click or
+the product tap that usually follows is a cache hit.
+
+Prefetch must never slow down real users. Its upstream requests run at
+upstream.PREFETCH priority, so the upstream scheduler serves every queued
+interactive and enrichment request first, keeps a reserve of rate-limit tokens
+for them, lets prefetch hold at most OFF_PREFETCH_CONCURRENCY connections per
+host (upstream.PRIORITY_CONCURRENCY), and drops a prefetch that gets no slot
+within its deadline (upstream.DEFAULT_DEADLINE).
+"""
+import asyncio
+import os
+from typing import Awaitable, Callable, Iterable
+
+from fastapi import HTTPException
+
+from . import upstream
+
+ENABLED = os.getenv('OFF_PREFETCH', '0').lower() in ('1', 'true', 'yes')
+DETAILS = int(os.getenv('OFF_PREFETCH_DETAILS', '5'))
+
+stats = {'scheduled': 0, 'completed': 0, 'skipped': 0, 'failed': 0}
+
+
+async def _run(job: Callable[[], Awaitable[object]]) -> None:
+    # each job runs in its own task, so this does not leak
+    upstream.priority.set(upstream.PREFETCH)
+    try:
+        await job()
+        stats['completed'] += 1
+    except upstream.UpstreamDeadlineExceeded:
+        stats['skipped'] += 1
+    except HTTPException as e:
+        # the search route reports a missed deadline as 503
+        stats['skipped' if e.status_code == 503 else 'failed'] += 1
+    except Exception as e:
+        stats['failed'] += 1
+        print('OFF prefetch failed:', repr(e))
+
+
+async def run_jobs(jobs: Iterable[Callable[[], Awaitable[object]]]) -> None:
+    """Background task body; the jobs' upstream requests queue at PREFETCH priority"""
+    jobs = list(jobs)
+    stats['scheduled'] += len(jobs)
+    await asyncio.gather(*(_run(job) for job in jobs))
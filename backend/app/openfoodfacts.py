@@ -43,6 +43,9 @@ class OpenFoodFactsClient:
                 print(f"OFF request failed: {e}")
                 raise
 
+    def close(self) -> None:
+        self.session.close()
+
     def get_product(self, barcode: str) -> Optional[Dict[str, Any]]:
         """
         Get product info by barcode (EAN/GTIN).
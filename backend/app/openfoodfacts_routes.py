@@ -2,7 +2,8 @@
 Open Food Facts API proxy endpoints
 Provides live product data without storing in local DB
 """
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse
 from typing import Optional, List, Dict, Any
 import httpx
 import re
@@ -13,6 +14,9 @@ import json
 import asyncio
 import asyncio
 from .ethics_db import get_ethics_score, extract_brand_from_product, get_ethics_issues_summary
+from . import autocomplete, http_clients, off_prefetch, query_normalization, upstream
+from .singleflight import ClientDisconnected, flights
+from .openfoodfacts_schemas import OFF_PRODUCT_FIELDS, OFFProduct, OFFSearchResponse, Suggestion
 
 router = APIRouter(prefix="/api/v1/openfoodfacts", tags=["OpenFoodFacts"])
 
@@ -20,14 +24,20 @@ router = APIRouter(prefix="/api/v1/openfoodfacts", tags=["OpenFoodFacts"])
 VERIFY_SSL = False
 REQUEST_TIMEOUT = 30.0
 
-async def http_get_with_retry(url, params=None, timeout=REQUEST_TIMEOUT, retries=3, verify=VERIFY_SSL):
+async def http_get_with_retry(url, params=None, timeout=REQUEST_TIMEOUT, retries=3, verify=VERIFY_SSL, deadline=None):
+    """GET through the upstream scheduler; `deadline` bounds the wait for a slot (per attempt)"""
     delay = 0.5
     last_exc = None
     for attempt in range(1, retries + 1):
         try:
-            async with httpx.AsyncClient(timeout=timeout, verify=verify) as client:
-                resp = await client.get(url, params=params)
-                return resp
+            async with upstream.scheduler.slot(url, deadline=deadline):
+                resp = await http_clients.request('GET', url, params=params, timeout=timeout, verify=verify)
+            if resp.status_code == 429:
+                upstream.scheduler.throttled(url, upstream.retry_after_seconds(resp.headers.get('Retry-After')))
+            return resp
+        except upstream.UpstreamDeadlineExceeded:
+            # queueing again would only wait longer
+            raise
         except Exception as e:
             last_exc = e
             print(f'HTTP GET attempt {attempt} to {url} failed: {e}')
@@ -261,19 +271,87 @@ def compute_fair_score_for_product(p: Dict[str, Any]) -> float:
     return round(total, 4)
 
 
-@router.get("/search")
+def _grade_score(grade) -> float:
+    return GRADE_SCORE.get(str(grade or '').upper(), 0)
+
+
+def _ethics_score(p: Dict[str, Any]) -> float:
+    try:
+        return float(p.get('ethics_score') if isinstance(p.get('ethics_score'), (int, float)) else (p.get('ethics_score') or 0.6))
+    except (TypeError, ValueError):
+        return 0.6
+
+
+# server-side sorts; computed while sorting so the payload carries no helper fields
+SORT_KEYS = {
+    'green': lambda p: _grade_score(p.get('ecoscore') or p.get('ecoscore_grade')),
+    'nutri': lambda p: _grade_score(p.get('nutriscore') or p.get('nutriscore_grade')),
+    'ethics': _ethics_score,
+}
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """`fields=barcode,product_name` -> validated projection of OFFProduct fields (None: all)"""
+    if not fields:
+        return None
+    projection = [f.strip() for f in fields.split(',') if f.strip()]
+    unknown = [f for f in projection if f not in OFF_PRODUCT_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return projection
+
+
+@router.get("/search", response_model=OFFSearchResponse)
 async def search_products(
+    request: Request,
+    background_tasks: BackgroundTasks,
     query: str = Query(..., description="Search term (e.g., 'Joghurt', 'Milch')"),
     country: str = Query("de", description="Country code"),
     page: int = Query(1, description="Page number"),
     page_size: int = Query(50, description="Results per page"),
     max_results: Optional[int] = Query(None, description="If set, fetch up to this many total results by paging (server-capped)."),
     sort_by: str = Query('fair', description="Sort by: 'fair'|'green'|'nutri'|'ethics'|'price' (default: fair)"),
+    fields: Optional[str] = Query(None, description="Comma-separated product projection, e.g. barcode,product_name,image_small_url"),
 ) -> Dict[str, Any]:
+    projection = parse_fields(fields)
+    autocomplete.record_search(query)
+    # one cache entry and one upstream request for "Milch", "milch " and "die Milch"
+    normalized = query_normalization.normalize_query(query)
+    query = normalized.text
     # include sort_by in cache key so different sorts are cached separately
-    cached = search_cache.get(query, country, page, page_size, sort_by, max_results)
+    cache_params = (country, page, page_size, sort_by, max_results)
+    cached = search_cache.get(query, *cache_params)
+    query_normalization.stats.record('search', normalized, cached is not None, cache_params)
     if cached is not None:
-        return cached
+        result = cached
+    else:
+        # identical concurrent searches share one upstream call, which stops when all their clients are gone
+        result = await flights.run(('search', query, cache_params), lambda: _fetch_search(query, *cache_params), request)
+    if off_prefetch.ENABLED and not max_results:
+        background_tasks.add_task(off_prefetch.run_jobs, _prefetch_jobs(query, result, *cache_params))
+    if projection:
+        # the cache keeps full products; the projection only trims what goes over the wire
+        result = {**result, "products": [{f: p[f] for f in projection if f in p} for p in result["products"]]}
+    # skips the per-request response model pass (validated in _fetch_search); 500 products: ~4x faster
+    return ORJSONResponse(result)
+
+
+def _prefetch_jobs(query: str, result: Dict[str, Any], country: str, page: int, page_size: int, sort_by: str, max_results) -> List:
+    """Next search page (if there is one) and the detail records of the top results"""
+    jobs = []
+    if page * page_size < (result.get('count') or 0):
+        params = (country, page + 1, page_size, sort_by, max_results)
+        if search_cache.get(query, *params) is None:
+            jobs.append(lambda: _fetch_search(query, *params))
+    for product in result.get('products', [])[:off_prefetch.DETAILS]:
+        barcode = product.get('barcode')
+        if barcode and product_cache.get(barcode) is None:
+            jobs.append(lambda barcode=barcode: _fetch_product(barcode))
+    return jobs
+
+
+async def _fetch_search(query: str, country: str, page: int, page_size: int, sort_by: str, max_results: Optional[int]) -> Dict[str, Any]:
+    cache_params = (country, page, page_size, sort_by, max_results)
     # If max_results requested, we will page until we collect up to that many (server capped)
     desired = None
     if max_results is not None and isinstance(max_results, int) and max_results > 0:
@@ -312,6 +390,8 @@ async def search_products(
                     try:
                         response = await http_get_with_retry(OFF_SEARCH, params=p_params, timeout=REQUEST_TIMEOUT, retries=2, verify=VERIFY_SSL)
                         data = response.json()
+                    except upstream.UpstreamDeadlineExceeded:
+                        raise
                     except Exception:
                         # try v0 fallback
                         v0_params = {
@@ -342,6 +422,8 @@ async def search_products(
             try:
                 response = await http_get_with_retry(OFF_SEARCH, params=params, timeout=REQUEST_TIMEOUT, retries=2, verify=VERIFY_SSL)
                 data = response.json()
+            except upstream.UpstreamDeadlineExceeded:
+                raise
             except Exception as e:
                 print(f"⚠️ OFF v2 API request failed, trying v0 fallback: {e}")
                 v0_params = {
@@ -365,48 +447,18 @@ async def search_products(
                 pass
 
         transformed = [transform_off_product(p) for p in products]
-        # compute server-side fair score and numeric helpers for other sorts
-        for t in transformed:
-            try:
-                t['__fairScore'] = compute_fair_score_for_product(t)
-            except Exception:
-                t['__fairScore'] = 0
-            # numeric ecoscore/nutri/ethics for sorting
-            try:
-                eco_grade = (t.get('ecoscore') or t.get('ecoscore_grade') or '')
-                t['__ecoNumeric'] = GRADE_SCORE.get(str(eco_grade).upper(), 0)
-            except Exception:
-                t['__ecoNumeric'] = 0
-            try:
-                nutri_grade = (t.get('nutriscore') or t.get('nutriscore_grade') or '')
-                t['__nutriNumeric'] = GRADE_SCORE.get(str(nutri_grade).upper(), 0)
-            except Exception:
-                t['__nutriNumeric'] = 0
-            try:
-                t['__ethicsNumeric'] = float(t.get('ethics_score') if isinstance(t.get('ethics_score'), (int, float)) else (t.get('ethics_score') or 0.6))
-            except Exception:
-                t['__ethicsNumeric'] = 0.6
 
         # choose sorting method
         # Important: when sort_by == 'fair' we DO NOT re-sort server-side here —
         # we keep the OFF ordering (textual relevance) and let the frontend re-rank by fair score.
         sort_by = (sort_by or 'fair').lower()
-        if sort_by == 'green':
-            # sort by ecoscore (higher is better)
-            transformed.sort(key=lambda x: x.get('__ecoNumeric', 0), reverse=True)
-        elif sort_by == 'nutri':
-            transformed.sort(key=lambda x: x.get('__nutriNumeric', 0), reverse=True)
-        elif sort_by == 'ethics':
-            transformed.sort(key=lambda x: x.get('__ethicsNumeric', 0), reverse=True)
+        if sort_by in SORT_KEYS:
+            # higher is better
+            transformed.sort(key=SORT_KEYS[sort_by], reverse=True)
         elif sort_by == 'price':
             # lower estimated_price first (cheaper first). Unknown prices go to the end.
             transformed.sort(key=lambda x: (x.get('estimated_price') is None, x.get('estimated_price', float('inf'))))
-        elif sort_by == 'fair':
-            # keep OFF-provided ordering (relevance) — frontend will apply fair re-ranking
-            pass
-        else:
-            # unknown sort requested -> keep OFF ordering
-            pass
+        # 'fair' and unknown sorts keep OFF ordering
 
         # Enrich top results (best-effort)
         try:
@@ -425,8 +477,13 @@ async def search_products(
                     to_enrich.append(code)
                     idx_map[code] = i
             if to_enrich:
-                tasks = [http_get_with_retry(f"{OFF_PRODUCT}/{code}.json", timeout=REQUEST_TIMEOUT, retries=2, verify=VERIFY_SSL) for code in to_enrich]
-                responses = await asyncio.gather(*tasks, return_exceptions=True)
+                # behind interactive requests in the scheduler, but not below a prefetch that triggered it
+                token = upstream.priority.set(max(upstream.priority.get(), upstream.ENRICHMENT))
+                try:
+                    tasks = [http_get_with_retry(f"{OFF_PRODUCT}/{code}.json", timeout=REQUEST_TIMEOUT, retries=2, verify=VERIFY_SSL) for code in to_enrich]
+                    responses = await asyncio.gather(*tasks, return_exceptions=True)
+                finally:
+                    upstream.priority.reset(token)
                 for code, resp in zip(to_enrich, responses):
                     if isinstance(resp, Exception):
                         continue
@@ -435,6 +492,8 @@ async def search_products(
                         if not full:
                             continue
                         enriched = transform_off_product(full)
+                        # full record already fetched: the detail view will not need to fetch it again
+                        product_cache.set(enriched, code)
                         idx = idx_map.get(code)
                         if idx is None:
                             continue
@@ -448,46 +507,90 @@ async def search_products(
         except Exception:
             pass
 
-        result = {
+        # validated once per upstream fetch; requests send the cached, JSON-ready dict as it is
+        result = OFFSearchResponse.model_validate({
             "count": data.get('count', 0),
             "page": data.get('page', page),
             "page_size": data.get('page_size', page_size),
             "products": transformed
-        }
-        search_cache.set(result, query, country, page, page_size)
+        }).model_dump(mode='json')
+        search_cache.set(result, query, *cache_params)
+        autocomplete.remember_off_products(_suggestion(t) for t in transformed)
         return result
+    except upstream.UpstreamDeadlineExceeded as e:
+        raise HTTPException(status_code=503, detail=f"Open Food Facts is rate limited, try again shortly ({e})")
     except httpx.HTTPError as e:
         raise HTTPException(status_code=500, detail=f"Error fetching from Open Food Facts: {str(e)}")
 
 
-@router.get("/product/{barcode}")
-async def get_product_by_barcode(barcode: str) -> Dict[str, Any]:
+async def _fetch_product(barcode: str) -> Optional[Dict[str, Any]]:
+    """Fetch, transform and cache one product; None if OFF does not know the barcode"""
+    response = await http_get_with_retry(f"{OFF_PRODUCT}/{barcode}.json", timeout=REQUEST_TIMEOUT, retries=2, verify=VERIFY_SSL)
+    data = response.json()
+    if data.get('status') != 1:
+        return None
+    result = transform_off_product(data.get('product', {}))
+    product_cache.set(result, barcode)
+    autocomplete.remember_off_products([_suggestion(result)])
+    return result
+
+
+def _suggestion(t: Dict[str, Any]) -> Dict[str, Any]:
+    """Autocomplete shape of a transformed OFF product"""
+    name = t.get('product_name') or ''
+    brand = t.get('brand') or ''
+    return {"barcode": t.get('barcode'), "display": f"{brand} {name}".strip() if brand else name, "image_url": t.get('image_url')}
+
+
+@router.get("/product/{barcode}", response_model=OFFProduct)
+async def get_product_by_barcode(barcode: str, request: Request) -> Dict[str, Any]:
     cached = product_cache.get(barcode)
     if cached is not None:
         return cached
-    url = f"{OFF_PRODUCT}/{barcode}.json"
     try:
-        response = await http_get_with_retry(url, timeout=REQUEST_TIMEOUT, retries=2, verify=VERIFY_SSL)
-        data = response.json()
-        if data.get('status') != 1:
+        result = await flights.run(('product', barcode), lambda: _fetch_product(barcode), request)
+        if result is None:
             raise HTTPException(status_code=404, detail="Product not found")
-        product = data.get('product', {})
-        result = transform_off_product(product)
-        product_cache.set(result, barcode)
         return result
+    except (HTTPException, ClientDisconnected):
+        raise
     except Exception as e:
         print('OFF product proxy error:', repr(e))
         raise HTTPException(status_code=500, detail=f"Error fetching from Open Food Facts: {str(e)}")
 
 
-@router.get("/autocomplete")
+@router.get("/autocomplete", response_model=List[Suggestion], response_model_exclude_unset=True)
 async def autocomplete_products(
+    request: Request,
     query: str = Query(..., min_length=2, description="Search term (min 2 chars)"),
     limit: int = Query(10, description="Max results")
 ) -> List[Dict[str, Any]]:
+    # local index first (sub-millisecond); OFF only when it cannot fill the list
+    local = await autocomplete.suggest(query, limit)
+    if len(local) >= limit:
+        return local
+    normalized = query_normalization.normalize_query(query)
+    query = normalized.text
     cached = autocomplete_cache.get(query, limit)
+    query_normalization.stats.record('autocomplete', normalized, cached is not None, (limit,))
     if cached is not None:
-        return cached
+        return _merge_suggestions(local, cached, limit)
+    try:
+        results = await flights.run(('autocomplete', query, limit), lambda: _fetch_autocomplete(query, limit), request)
+        return _merge_suggestions(local, results, limit)
+    except ClientDisconnected:
+        raise
+    except upstream.UpstreamDeadlineExceeded:
+        # search lane saturated: typing must not wait for it
+        return local
+    except Exception as e:
+        if local:
+            # OFF slow or down: what we have locally is better than an error
+            return local
+        raise HTTPException(status_code=500, detail=f"Error fetching from Open Food Facts: {str(e)}")
+
+
+async def _fetch_autocomplete(query: str, limit: int) -> List[Dict[str, Any]]:
     params = {
         "search_terms": query,
         "countries_tags": "de",
@@ -495,25 +598,34 @@ async def autocomplete_products(
         "page_size": limit,
         "fields": "code,product_name,product_name_de,brands,quantity,image_url,image_front_url,image_front_small_url,image_small_url"
     }
-    try:
-        response = await http_get_with_retry(OFF_SEARCH, params=params, timeout=5.0, retries=2, verify=VERIFY_SSL)
-        data = response.json()
-        products = data.get('products', [])
-        results = []
-        for p in products:
-            name = p.get('product_name_de') or p.get('product_name') or ''
-            brand = p.get('brands', '').split(',')[0].strip()
-            display = f"{brand} {name}".strip() if brand else name
-            image_url = p.get('image_url') or p.get('image_front_url') or p.get('image_front_small_url') or p.get('image_small_url')
-            results.append({
-                "barcode": p.get('code'),
-                "display": display,
-                "image_url": image_url
-            })
-        autocomplete_cache.set(results, query, limit)
-        return results
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error fetching from Open Food Facts: {str(e)}")
+    response = await http_get_with_retry(OFF_SEARCH, params=params, timeout=5.0, retries=2, verify=VERIFY_SSL, deadline=2.0)
+    data = response.json()
+    products = data.get('products', [])
+    results = []
+    for p in products:
+        name = p.get('product_name_de') or p.get('product_name') or ''
+        brand = p.get('brands', '').split(',')[0].strip()
+        display = f"{brand} {name}".strip() if brand else name
+        image_url = p.get('image_url') or p.get('image_front_url') or p.get('image_front_small_url') or p.get('image_small_url')
+        results.append({
+            "barcode": p.get('code'),
+            "display": display,
+            "image_url": image_url
+        })
+    autocomplete_cache.set(results, query, limit)
+    autocomplete.remember_off_products(results)
+    return results
+
+
+def _merge_suggestions(local: List[Dict[str, Any]], remote: List[Dict[str, Any]], limit: int) -> List[Dict[str, Any]]:
+    seen = {(s.get('barcode') or s['display'].casefold()) for s in local}
+    merged = list(local)
+    for s in remote:
+        key = s.get('barcode') or (s.get('display') or '').casefold()
+        if key and key not in seen:
+            seen.add(key)
+            merged.append(s)
+    return merged[:limit]
 
 
 @router.post("/cache/clear")
@@ -524,13 +636,21 @@ async def clear_cache() -> Dict[str, str]:
     search_cache.cache.clear()
     product_cache.cache.clear()
     autocomplete_cache.cache.clear()
+    query_normalization.stats.clear()
     return {"status": "success", "message": "All OFF proxy caches cleared"}
 
 
+@router.get("/upstream/stats")
+async def upstream_stats() -> Dict[str, Any]:
+    """Outbound scheduler: queue depth per lane and priority, token buckets, wait times"""
+    return {**upstream.scheduler.snapshot(), "prefetch": dict(off_prefetch.stats), "flights": flights.snapshot()}
+
+
 @router.get("/cache/stats")
 async def cache_stats() -> Dict[str, Any]:
     return {
         "search_cache": {"entries": len(search_cache.cache), "ttl_minutes": 20},
         "product_cache": {"entries": len(product_cache.cache), "ttl_minutes": 30},
-        "autocomplete_cache": {"entries": len(autocomplete_cache.cache), "ttl_minutes": 15}
+        "autocomplete_cache": {"entries": len(autocomplete_cache.cache), "ttl_minutes": 15},
+        "query_normalization": query_normalization.stats.snapshot(),
     }
\ No newline at end of file
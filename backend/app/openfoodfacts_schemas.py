@@ -0,0 +1,64 @@
+from pydantic import BaseModel, ConfigDict
+from typing import Optional, List
+
+
+class UnitPrice(BaseModel):
+    value: float
+    unit: str  # 'kg' | 'l'
+    display: str
+
+
+class OFFProduct(BaseModel):
+    """
+    A transformed OFF product (transform_off_product). Every field is optional so that
+    `fields=` projections validate; routes serialize with exclude_unset, which keeps
+    the full shape (None included) for unprojected products.
+    """
+    # OFF data is user-entered: a quantity or store list occasionally arrives as a number
+    model_config = ConfigDict(coerce_numbers_to_str=True)
+
+    barcode: Optional[str] = None
+    product_identifier: Optional[str] = None
+    product_name: Optional[str] = None
+    product_name_orig: Optional[str] = None
+    brand: Optional[str] = None
+    quantity: Optional[str] = None
+    size_amount: Optional[float] = None
+    size_unit: Optional[str] = None
+    image_url: Optional[str] = None
+    image_small_url: Optional[str] = None
+    image_front_small_url: Optional[str] = None
+    nutriscore: Optional[str] = None
+    ecoscore: Optional[str] = None
+    ethics_score: Optional[float] = None
+    ethics_issues: Optional[List[str]] = None
+    categories: Optional[List[str]] = None
+    categories_text: Optional[str] = None
+    stores: Optional[str] = None
+    source: Optional[str] = None
+    price: Optional[float] = None
+    price_currency: Optional[str] = None
+    ingredients: Optional[str] = None
+    allergens: Optional[List[str]] = None
+    labels: Optional[List[str]] = None
+    manufacturing_places: Optional[str] = None
+    origins: Optional[str] = None
+    estimated_price: Optional[float] = None
+    unit_price: Optional[UnitPrice] = None
+
+
+OFF_PRODUCT_FIELDS = frozenset(OFFProduct.model_fields)
+
+
+class OFFSearchResponse(BaseModel):
+    count: int = 0
+    page: int
+    page_size: int
+    products: List[OFFProduct]
+
+
+class Suggestion(BaseModel):
+    barcode: Optional[str] = None
+    display: str
+    image_url: Optional[str] = None
+    source: Optional[str] = None  # local index only
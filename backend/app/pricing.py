@@ -0,0 +1,129 @@
+"""
+Set-based current-price lookups shared by the basket optimizer and other bulk readers.
+
+Precedence matches get_best_price: a price stored on the ProductLocation wins,
+otherwise the most trusted community report of the last 30 days
+(most upvotes, then newest, never rejected).
+"""
+import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import String, and_, cast, func, or_
+from sqlalchemy.orm import Session
+
+from . import product_models, rating_models
+from .product_catalog import lookup_product_ids
+
+PRICE_WINDOW_DAYS = 30
+
+PriceKey = Tuple[str, str]  # (product_identifier, store_name)
+
+
+def current_prices(
+    db: Session,
+    product_identifiers: Optional[Iterable[str]],
+    store_names: Optional[Iterable[str]] = None,
+) -> Dict[PriceKey, float]:
+    """Return {(product_identifier, store_name): price} with two queries, independent of basket size.
+    None for products or stores means no filter on that side.
+    Requested identifiers are matched through the product catalog, so any
+    variant of a product (barcode, differently spelled name) finds its prices."""
+    products = list(set(product_identifiers)) if product_identifiers is not None else None
+    stores = list(set(store_names)) if store_names is not None else None
+    if products == [] or stores == []:
+        return {}
+
+    # product_id -> requested identifiers it answers for
+    by_pid: Dict[int, List[str]] = {}
+    if products is not None:
+        for ident, pid in lookup_product_ids(db, products).items():
+            by_pid.setdefault(pid, []).append(ident)
+
+    def product_filter(model):
+        # rows without product_id (not backfilled yet) still match on the raw string
+        legacy = and_(model.product_id.is_(None), model.product_identifier.in_(products))
+        return or_(model.product_id.in_(list(by_pid)), legacy) if by_pid else legacy
+
+    def keys_for(pid, ident, store):
+        if products is None:
+            return [(ident, store)]
+        return [(i, store) for i in by_pid.get(pid, [ident])]
+
+    PL = product_models.ProductLocation
+    q = db.query(PL.product_id, PL.product_identifier, PL.store_name, PL.current_price).filter(PL.current_price.isnot(None))
+    if products is not None:
+        q = q.filter(product_filter(PL))
+    if stores is not None:
+        q = q.filter(PL.store_name.in_(stores))
+    prices: Dict[PriceKey, float] = {}
+    for pid, ident, store, price in q:
+        for key in keys_for(pid, ident, store):
+            prices.setdefault(key, price)
+
+    PR = rating_models.PriceReport
+    since = datetime.datetime.utcnow() - datetime.timedelta(days=PRICE_WINDOW_DAYS)
+    # one ranking per product when filtering by product, per raw identifier for full dumps
+    product_key = func.coalesce(cast(PR.product_id, String), PR.product_identifier) if products is not None else PR.product_identifier
+    rank = func.row_number().over(
+        partition_by=(product_key, PR.store_name),
+        order_by=(PR.upvotes.desc(), PR.created_at.desc()),
+    ).label('rank')
+    ranked = db.query(
+        PR.product_id.label('product_id'),
+        PR.product_identifier.label('product_identifier'),
+        PR.store_name.label('store_name'),
+        PR.reported_price.label('price'),
+        rank,
+    ).filter(
+        PR.status != 'rejected',
+        PR.created_at >= since,
+    )
+    if products is not None:
+        ranked = ranked.filter(product_filter(PR))
+    if stores is not None:
+        ranked = ranked.filter(PR.store_name.in_(stores))
+    ranked = ranked.subquery()
+    for pid, ident, store, price in db.query(
+        ranked.c.product_id, ranked.c.product_identifier, ranked.c.store_name, ranked.c.price
+    ).filter(ranked.c.rank == 1):
+        for key in keys_for(pid, ident, store):
+            prices.setdefault(key, price)
+    return prices
+
+
+def recent_report_prices(
+    db: Session,
+    product_identifiers: Iterable[str],
+    store_name: str,
+    per_product: int = 5,
+) -> Dict[str, List[float]]:
+    """{product_identifier: prices of its newest non-rejected reports at store_name} in one query,
+    the set-based form of the plausibility lookup in create_price_report."""
+    products = list(set(product_identifiers))
+    if not products:
+        return {}
+    by_pid: Dict[int, List[str]] = {}
+    for ident, pid in lookup_product_ids(db, products).items():
+        by_pid.setdefault(pid, []).append(ident)
+
+    PR = rating_models.PriceReport
+    legacy = and_(PR.product_id.is_(None), PR.product_identifier.in_(products))
+    product_key = func.coalesce(cast(PR.product_id, String), PR.product_identifier)
+    rank = func.row_number().over(partition_by=product_key, order_by=PR.created_at.desc()).label('rank')
+    ranked = db.query(
+        PR.product_id.label('product_id'),
+        PR.product_identifier.label('product_identifier'),
+        PR.reported_price.label('price'),
+        rank,
+    ).filter(
+        or_(PR.product_id.in_(list(by_pid)), legacy) if by_pid else legacy,
+        PR.store_name == store_name,
+        PR.status != 'rejected',
+    ).subquery()
+    recent: Dict[str, List[float]] = {}
+    for pid, ident, price in db.query(
+        ranked.c.product_id, ranked.c.product_identifier, ranked.c.price
+    ).filter(ranked.c.rank <= per_product).order_by(ranked.c.rank):
+        for key in by_pid.get(pid, [ident]):
+            recent.setdefault(key, []).append(price)
+    return recent
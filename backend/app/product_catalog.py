@@ -0,0 +1,236 @@
+"""
+Canonical products: one integer id per product, many identifier variants.
+
+product_identifier is free text across the hot tables (an EAN, or the
+"brand name quantity" string built by transform_off_product /
+import_product_from_off). Every variant is normalized into an alias that
+points at a row in `products`; the hot tables carry that integer
+product_id so lookups, aggregations and indexes work on integers.
+
+New rows get their product_id automatically (before_flush hook below);
+rows written before the column existed are filled in by backfill_product_ids().
+"""
+import re
+import threading
+import unicodedata
+from typing import Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import and_, event, or_, select
+from sqlalchemy.orm import Session
+
+from .product_models import Product, ProductAlias
+
+BARCODE_LENGTHS = (8, 12, 13, 14)
+ALIAS_CACHE_MAX = 50000
+
+_cache_lock = threading.Lock()
+_alias_cache: Dict[str, int] = {}
+
+
+def normalize_barcode(value: str) -> Optional[str]:
+    """Digits-only GTIN-8/12/13/14 -> canonical form (GTIN-12/14 folded to GTIN-13 where possible)"""
+    digits = re.sub(r'[\s-]', '', value or '')
+    if not digits.isdigit() or len(digits) not in BARCODE_LENGTHS:
+        return None
+    if len(digits) == 12:
+        digits = '0' + digits
+    if len(digits) == 14 and digits.startswith('0'):
+        digits = digits[1:]
+    return digits
+
+
+def normalize_name(value: str) -> str:
+    """'Weihenstephan  H-Milch 1,5 %' -> 'weihenstephan h-milch 1,5 %'"""
+    s = unicodedata.normalize('NFKC', value or '').casefold()
+    return ' '.join(s.split())
+
+
+def alias_key(identifier: str) -> Optional[str]:
+    """Lookup key for any identifier variant: 'ean:<gtin>' or 'name:<normalized>'"""
+    barcode = normalize_barcode(identifier)
+    if barcode:
+        return f"ean:{barcode}"
+    name = normalize_name(identifier)
+    return f"name:{name}"[:200] if name else None
+
+
+def _cached(key: str) -> Optional[int]:
+    return _alias_cache.get(key)
+
+
+def _remember(mapping: Dict[str, int]) -> None:
+    with _cache_lock:
+        if len(_alias_cache) + len(mapping) > ALIAS_CACHE_MAX:
+            _alias_cache.clear()
+        _alias_cache.update(mapping)
+
+
+def lookup_product_ids(session: Session, identifiers: Iterable[str]) -> Dict[str, int]:
+    """{identifier: product_id} for identifiers that already have a product (one query for cache misses)"""
+    keys = {}
+    for ident in identifiers:
+        key = alias_key(ident)
+        if key:
+            keys[ident] = key
+    found = {}
+    missing = set()
+    for ident, key in keys.items():
+        pid = _cached(key)
+        if pid is not None:
+            found[ident] = pid
+        else:
+            missing.add(key)
+    if missing:
+        rows = session.execute(
+            select(ProductAlias.alias, ProductAlias.product_id).where(ProductAlias.alias.in_(missing))
+        ).all()
+        loaded = dict(rows)
+        _remember(loaded)
+        for ident, key in keys.items():
+            if key in loaded:
+                found[ident] = loaded[key]
+    return found
+
+
+def lookup_product_id(session: Session, identifier: str) -> Optional[int]:
+    return lookup_product_ids(session, [identifier]).get(identifier)
+
+
+def _stored_alias(conn, key: str) -> Optional[int]:
+    return conn.execute(select(ProductAlias.product_id).where(ProductAlias.alias == key)).scalar()
+
+
+def _insert_ignoring_conflicts(conn, table):
+    """INSERT ... ON CONFLICT DO NOTHING: concurrent first writes of the same product must not fail"""
+    if conn.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(table).on_conflict_do_nothing()
+
+
+def resolve_product_id(
+    session: Session,
+    identifier: str,
+    barcode: Optional[str] = None,
+    brand: Optional[str] = None,
+    quantity: Optional[str] = None,
+) -> Optional[int]:
+    """
+    product_id for an identifier, creating the product and its aliases if needed.
+    When both a name and a barcode are known, both aliases end up on the same product.
+    Uses the session's connection directly, so it is safe inside flush hooks.
+    """
+    keys = [k for k in (alias_key(barcode) if barcode else None, alias_key(identifier)) if k]
+    if not keys:
+        return None
+    conn = session.connection()
+    known = {}
+    for key in keys:
+        pid = _cached(key)
+        if pid is None:
+            pid = _stored_alias(conn, key)
+        if pid is not None:
+            known[key] = pid
+    created = None
+    if known:
+        product_id = known[keys[0]] if keys[0] in known else next(iter(known.values()))
+    else:
+        canonical_barcode = normalize_barcode(barcode) if barcode else normalize_barcode(identifier)
+        product_id = conn.execute(_insert_ignoring_conflicts(conn, Product.__table__).values(
+            barcode=canonical_barcode,
+            normalized_name=normalize_name(identifier)[:200],
+            display_name=(identifier or '').strip()[:300],
+            brand=(brand or None) and brand[:200],
+            quantity=(quantity or None) and quantity[:100],
+        ).returning(Product.__table__.c.id)).scalar()
+        if product_id is None:
+            # a concurrent writer created the product for this barcode first
+            product_id = conn.execute(select(Product.id).where(Product.barcode == canonical_barcode)).scalar()
+        else:
+            created = product_id
+            # Core insert: not seen by change_tracking's flush hook
+            session.info.setdefault('changed_tables', set()).add(Product.__tablename__)
+    new_aliases = [k for k in keys if k not in known]
+    if new_aliases:
+        conn.execute(_insert_ignoring_conflicts(conn, ProductAlias.__table__),
+                     [{'alias': k, 'product_id': product_id} for k in new_aliases])
+        session.info.setdefault('changed_tables', set()).add(ProductAlias.__tablename__)
+        # a concurrent writer may have inserted some of these aliases first: theirs win
+        known.update(conn.execute(
+            select(ProductAlias.alias, ProductAlias.product_id).where(ProductAlias.alias.in_(new_aliases))
+        ).all())
+        product_id = known[keys[0]]
+        if created is not None and created not in known.values():
+            # lost every alias to the other writer: nothing points at the product just created
+            conn.execute(Product.__table__.delete().where(Product.__table__.c.id == created))
+    # cache only after commit: a rollback would leave ids that do not exist
+    session.info.setdefault('pending_aliases', {}).update(known)
+    return product_id
+
+
+def product_clause(session: Session, model, identifier: str):
+    """
+    Filter for rows of `model` that belong to the same product as `identifier`.
+    Rows not backfilled yet (product_id NULL) still match on the raw string.
+    """
+    pid = lookup_product_id(session, identifier)
+    if pid is None:
+        return model.product_identifier == identifier
+    return or_(model.product_id == pid, and_(model.product_id.is_(None), model.product_identifier == identifier))
+
+
+def _tracked_models():
+    from .product_models import ProductLocation
+    from .rating_models import PriceReport, ProductRating
+    from .store_models import PriceHistory
+    return (ProductLocation, PriceReport, ProductRating, PriceHistory)
+
+
+@event.listens_for(Session, 'before_flush')
+def _assign_product_ids(session, flush_context, instances):
+    models = _tracked_models()
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, models) and obj.product_identifier and (
+            obj.product_id is None or 'product_identifier' in getattr(obj, '_sa_instance_state').committed_state
+        ):
+            obj.product_id = resolve_product_id(session, obj.product_identifier)
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_aliases(session):
+    pending = session.info.pop('pending_aliases', None)
+    if pending:
+        _remember(pending)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _drop_pending_aliases(session):
+    session.info.pop('pending_aliases', None)
+
+
+def backfill_product_ids(session: Session, batch_size: int = 500, progress: Callable[[str], None] = print) -> Dict[str, int]:
+    """Fill product_id on rows written before the column existed, committing per batch"""
+    totals = {}
+    for model in _tracked_models():
+        table = model.__tablename__
+        pending = model.product_id.is_(None), model.product_identifier.isnot(None)
+        total = session.query(model.id).filter(*pending).count()
+        done = 0
+        last_id = 0
+        while True:
+            # keyset on id: rows whose identifier cannot be resolved are not picked up again
+            rows: List = session.query(model.id, model.product_identifier).filter(
+                *pending, model.id > last_id
+            ).order_by(model.id).limit(batch_size).all()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            for row_id, identifier in rows:
+                pid = resolve_product_id(session, identifier)
+                session.query(model).filter(model.id == row_id).update({model.product_id: pid}, synchronize_session=False)
+            session.commit()
+            done += len(rows)
+            progress(f"{table}: {done}/{total} rows backfilled")
+        totals[table] = done
+    return totals
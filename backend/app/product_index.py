@@ -0,0 +1,204 @@
+"""
+Incrementally maintained in-memory indexes over known products.
+
+The shopping list matcher (matcher.MatchIndex) and the receipt parser
+(receipt_parser.ReceiptIndex) index the same things: canonical catalog
+products plus every product_locations identifier, the latter grouped under
+their product when linked. ProductIndex keeps that entry set current and the
+subclasses only decide which words an entry is indexed under and how a query
+is scored.
+
+- entries: catalog products (key = product id) or identifiers not linked to
+  one yet (key = ('identifier', identifier))
+- postings: word -> entry keys; words stay in the sorted vocabulary once seen,
+  so lookups skip empty postings
+- refresh(): the first call loads everything; later calls read changed
+  product locations from the sync_changes log and new products by id, and
+  re-index only the affected entries
+
+SharedIndex refreshes right after this process commits to a product table
+(change_tracking generations) and otherwise at least every RECHECK_SECONDS,
+which picks up writes from other workers and scripts (import_openfoodfacts.py).
+"""
+import bisect
+import os
+import threading
+import time
+from typing import Callable, Dict, Generic, List, Optional, Set, Tuple, TypeVar
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from . import change_tracking, product_models, sync_models
+
+INDEX_TABLES = ('product_locations', 'products')
+# refresh interval for writes this process did not make (a no-op refresh is three indexed queries)
+RECHECK_SECONDS = float(os.getenv('PRODUCT_INDEX_RECHECK_SECONDS', '5'))
+
+
+class IndexEntry:
+    __slots__ = ('key', 'display', 'product_id', 'brand', 'named', 'variants', 'stores', 'tokens', 'category')
+
+    def __init__(self, key, display, product_id=None, brand=None, named=False):
+        self.key = key
+        self.display = display
+        self.product_id = product_id
+        self.brand = brand
+        self.named = named  # display is the catalog name, not one of the identifiers
+        self.variants: Dict[str, int] = {}  # identifier -> number of locations using it
+        self.stores: Dict[str, int] = {}
+        self.tokens: Set[str] = set()
+        self.category: Optional[str] = None
+
+
+class ProductIndex:
+    """Entry bookkeeping and sync_changes tailing; subclasses implement entry_tokens() and querying"""
+
+    def __init__(self):
+        self.entries: Dict[object, IndexEntry] = {}
+        self.postings: Dict[str, Set[object]] = {}
+        self.vocabulary: List[str] = []
+        self.locations: Dict[int, Tuple[object, str, str]] = {}  # location id -> (entry key, identifier, store)
+        self.last_seq = 0
+        self.last_product_id = 0
+        self.built = False
+
+    @classmethod
+    def from_db(cls, db: Session):
+        index = cls()
+        index.refresh(db)
+        return index
+
+    # --- subclass hooks -------------------------------------------------------------------
+
+    def entry_tokens(self, entry: IndexEntry) -> Set[str]:
+        """Words the entry is indexed under; may also set derived entry fields (category)"""
+        raise NotImplementedError
+
+    def word_added(self, word: str) -> None:
+        """A word entered the vocabulary (typo and abbreviation tables hook in here)"""
+
+    # --- building -------------------------------------------------------------------------
+
+    def _add_word(self, word: str, key) -> None:
+        posting = self.postings.get(word)
+        if posting is None:
+            posting = self.postings[word] = set()
+            bisect.insort(self.vocabulary, word)
+            self.word_added(word)
+        posting.add(key)
+
+    def _reindex(self, entry: IndexEntry) -> None:
+        if not entry.named and entry.variants and entry.display not in entry.variants:
+            entry.display = next(iter(entry.variants))
+        alive = bool(entry.variants) or entry.product_id is not None
+        tokens = self.entry_tokens(entry) if alive else set()
+        for word in entry.tokens - tokens:
+            self.postings[word].discard(entry.key)
+        for word in tokens - entry.tokens:
+            self._add_word(word, entry.key)
+        entry.tokens = tokens
+        if not alive:
+            self.entries.pop(entry.key, None)
+
+    def _entry(self, product_id, identifier) -> IndexEntry:
+        key = product_id if product_id is not None else ('identifier', identifier)
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = self.entries[key] = IndexEntry(key, identifier, product_id)
+        return entry
+
+    def _add_location(self, location_id: int, identifier: str, product_id, store: str, dirty: Set[object]) -> None:
+        entry = self._entry(product_id, identifier)
+        entry.variants[identifier] = entry.variants.get(identifier, 0) + 1
+        entry.stores[store] = entry.stores.get(store, 0) + 1
+        self.locations[location_id] = (entry.key, identifier, store)
+        dirty.add(entry.key)
+
+    def _remove_location(self, location_id: int, dirty: Set[object]) -> None:
+        known = self.locations.pop(location_id, None)
+        if not known:
+            return
+        key, identifier, store = known
+        entry = self.entries.get(key)
+        if entry is None:
+            return
+        for counts, value in ((entry.variants, identifier), (entry.stores, store)):
+            counts[value] -= 1
+            if counts[value] <= 0:
+                del counts[value]
+        dirty.add(key)
+
+    def _load_products(self, db: Session, dirty: Set[object]) -> None:
+        P = product_models.Product
+        for pid, display, brand in db.query(P.id, P.display_name, P.brand).filter(P.id > self.last_product_id).order_by(P.id):
+            entry = self.entries.get(pid)
+            if entry is None:
+                entry = self.entries[pid] = IndexEntry(pid, display or '', pid)
+            if display:
+                entry.display, entry.named = display, True
+            entry.brand = brand
+            self.last_product_id = pid
+            dirty.add(pid)
+
+    def refresh(self, db: Session) -> int:
+        """Apply changes since the last refresh; returns the number of re-indexed entries"""
+        SC = sync_models.SyncChange
+        PL = product_models.ProductLocation
+        dirty: Set[object] = set()
+        head = db.query(func.max(SC.seq)).scalar() or 0
+        if not self.built:
+            rows = db.query(PL.id, PL.product_identifier, PL.product_id, PL.store_name)
+        else:
+            changed = {c.entity_id for c in db.query(SC.entity_id).filter(
+                SC.seq > self.last_seq, SC.seq <= head, SC.entity == 'product_location'
+            )}
+            for location_id in changed:
+                self._remove_location(location_id, dirty)
+            rows = db.query(PL.id, PL.product_identifier, PL.product_id, PL.store_name).filter(PL.id.in_(changed)) if changed else []
+        self._load_products(db, dirty)
+        for location_id, identifier, product_id, store in rows:
+            self._add_location(location_id, identifier, product_id, store, dirty)
+        self.last_seq = head
+        self.built = True
+        for key in dirty:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self._reindex(entry)
+        return len(dirty)
+
+
+IndexT = TypeVar('IndexT', bound=ProductIndex)
+
+
+class SharedIndex(Generic[IndexT]):
+    """
+    One index per process, refreshed when this process committed to the product
+    tables or RECHECK_SECONDS have passed since the last refresh.
+
+    refresh() changes the index in place: queries run under `lock` too. Both are
+    pure Python, so under the GIL this costs no parallelism, only the wait for a
+    running (incremental, so short) refresh.
+    """
+
+    def __init__(self, factory: Callable[[], IndexT]):
+        self.factory = factory
+        self.lock = threading.Lock()
+        self.index: Optional[IndexT] = None
+        self.version: Optional[tuple] = None
+        self.refreshed_at = 0.0
+
+    def _stale(self, version: tuple) -> bool:
+        return self.version != version or time.monotonic() - self.refreshed_at >= RECHECK_SECONDS
+
+    def get(self, db: Session) -> IndexT:
+        version = change_tracking.generations(INDEX_TABLES)
+        if self.index is None or self._stale(version):
+            with self.lock:
+                if self.index is None:
+                    self.index = self.factory()
+                if self._stale(version):
+                    self.index.refresh(db)
+                    self.version = version
+                    self.refreshed_at = time.monotonic()
+        return self.index
@@ -1,12 +1,32 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Float, JSON
+from sqlalchemy import Column, Integer, String, Text, DateTime, Float, JSON, Index, ForeignKey
 from .database import Base
 import datetime
 
 
+class Product(Base):
+    """Canonical product; every identifier variant points here via ProductAlias"""
+    __tablename__ = 'products'
+    id = Column(Integer, primary_key=True, index=True)
+    barcode = Column(String(20), nullable=True, unique=True)  # canonical GTIN (8/13/14 digits)
+    normalized_name = Column(String(200), nullable=True, index=True)
+    display_name = Column(String(300), nullable=True)
+    brand = Column(String(200), nullable=True)
+    quantity = Column(String(100), nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+
+class ProductAlias(Base):
+    """Normalized identifier variant ('ean:4001234567890', 'name:weihenstephan h-milch 1l') -> product"""
+    __tablename__ = 'product_aliases'
+    alias = Column(String(200), primary_key=True)
+    product_id = Column(Integer, ForeignKey('products.id'), nullable=False, index=True)
+
+
 class ProductLocation(Base):
     __tablename__ = 'product_locations'
     id = Column(Integer, primary_key=True, index=True)
     product_identifier = Column(String(200), nullable=False)  # ean or name
+    product_id = Column(Integer, ForeignKey('products.id'), nullable=True)  # canonical product, set on flush
     store_name = Column(String(200), nullable=False)
     aisle = Column(String(100), nullable=True)
     shelf_label = Column(String(100), nullable=True)
@@ -28,3 +48,12 @@ class ProductLocation(Base):
     # Regional/Local product flags
     is_regional = Column(Integer, default=0)  # 0=überall, 1=nur in dieser Filiale, 2=nur in dieser Region
     availability_notes = Column(Text, nullable=True)  # z.B. "Nur in Norddeutschland", "Lokale Kartoffeln vom Hof Müller"
+
+    __table_args__ = (
+        # (product, store) lookups: best price, basket optimizer, from_off dedup
+        Index('ix_product_locations_product_store', 'product_identifier', 'store_name'),
+        Index('ix_product_locations_pid_store', 'product_id', 'store_name'),
+        # keyset pagination (newest first), globally and per store
+        Index('ix_product_locations_created_id', 'created_at', 'id'),
+        Index('ix_product_locations_store_created_id', 'store_name', 'created_at', 'id'),
+    )
@@ -0,0 +1,120 @@
+"""
+Search query normalization ahead of the OFF proxy caches.
+
+"Milch", "milch ", "MILCH" and "die Milch" are the same search for OFF, so
+they should share one cache entry and one upstream request. Steps, in order:
+
+    nfkc        Unicode compatibility form ("ﬁ" -> "fi", full-width digits)
+    casefold    "MILCH" -> "milch"
+    umlauts     "käse" -> "kaese" (off by default: OFF indexes the umlaut spelling)
+    whitespace  "milch   1,5%" -> "milch 1,5%"
+    stop_words  "die milch" -> "milch" (articles only, see STOP_WORDS)
+    reorder     "milch hafer" -> "hafer milch" (OFF search terms are a bag of words)
+
+Each step reports whether it changed the query; NormalizationStats counts how
+many requests a step changed and how many cache hits only happened because of it.
+"""
+import os
+import threading
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, Tuple
+
+
+SEEN_RAW_MAX = 20000
+STEPS = ('nfkc', 'casefold', 'umlauts', 'whitespace', 'stop_words', 'reorder')
+FOLD_UMLAUTS = os.getenv('QUERY_FOLD_UMLAUTS', '0').lower() in ('1', 'true', 'yes')
+
+_UMLAUTS = str.maketrans({'ä': 'ae', 'ö': 'oe', 'ü': 'ue', 'ß': 'ss'})
+# Cache-key stop words. Narrower than the matcher's list: "ohne", "mit", "für", "von" etc.
+# change what is searched for ("milch ohne laktose" is not "milch mit laktose") and OFF is
+# sent the normalized text, so only words that never carry meaning are dropped.
+STOP_WORDS = frozenset({'der', 'die', 'das', 'den', 'dem', 'des', 'ein', 'eine', 'einen', 'einem', 'einer'})
+
+
+@dataclass
+class NormalizedQuery:
+    raw: str
+    text: str
+    steps: Tuple[str, ...] = field(default_factory=tuple)  # steps that changed something
+
+
+def _drop_stop_words(text: str) -> str:
+    tokens = text.split(' ')
+    kept = [t for t in tokens if t not in STOP_WORDS]
+    # "die" alone is still a query
+    return ' '.join(kept) if kept else text
+
+
+def normalize_query(query: str, fold_umlauts: bool = None) -> NormalizedQuery:
+    if fold_umlauts is None:
+        fold_umlauts = FOLD_UMLAUTS
+    steps = (
+        ('nfkc', lambda s: unicodedata.normalize('NFKC', s)),
+        ('casefold', str.casefold),
+        ('umlauts', (lambda s: s.translate(_UMLAUTS)) if fold_umlauts else None),
+        ('whitespace', lambda s: ' '.join(s.split())),
+        ('stop_words', _drop_stop_words),
+        ('reorder', lambda s: ' '.join(sorted(s.split(' ')))),
+    )
+    text = query or ''
+    changed = []
+    for name, step in steps:
+        if step is None:
+            continue
+        result = step(text)
+        if result != text:
+            changed.append(name)
+            text = result
+    return NormalizedQuery(raw=query, text=text, steps=tuple(changed))
+
+
+class NormalizationStats:
+    """Per endpoint: requests, cache hits, and per step how often it changed / collapsed a request"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests: Counter = Counter()
+        self._hits: Counter = Counter()
+        self._changed: Dict[str, Counter] = {}
+        self._collapsed: Dict[str, Counter] = {}
+        self._seen_raw = set()
+
+    def record(self, endpoint: str, query: NormalizedQuery, hit: bool, params: tuple = ()) -> None:
+        """`params`: the other cache key parts, so raw keys are compared like the cache compares them"""
+        raw_key = (endpoint, query.raw, params)
+        with self._lock:
+            self._requests[endpoint] += 1
+            self._changed.setdefault(endpoint, Counter()).update(query.steps)
+            if hit:
+                self._hits[endpoint] += 1
+                if raw_key not in self._seen_raw:
+                    # without normalization this spelling would have missed and gone upstream
+                    self._collapsed.setdefault(endpoint, Counter()).update(query.steps)
+            if len(self._seen_raw) >= SEEN_RAW_MAX:
+                self._seen_raw.clear()
+            self._seen_raw.add(raw_key)
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            return {
+                endpoint: {
+                    'requests': self._requests[endpoint],
+                    'cache_hits': self._hits[endpoint],
+                    'changed_by_step': {s: self._changed.get(endpoint, Counter())[s] for s in STEPS},
+                    'collapsed_by_step': {s: self._collapsed.get(endpoint, Counter())[s] for s in STEPS},
+                }
+                for endpoint in self._requests
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._requests.clear()
+            self._hits.clear()
+            self._changed.clear()
+            self._collapsed.clear()
+            self._seen_raw.clear()
+
+
+stats = NormalizationStats()
@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index
 from .database import Base
+from . import product_models  # noqa: F401  products table for the product_id foreign keys
 import datetime
 
 
@@ -9,12 +10,17 @@ class ProductRating(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     product_identifier = Column(String(200), nullable=False, index=True)  # barcode or name
+    product_id = Column(Integer, ForeignKey('products.id'), nullable=True)  # canonical product, set on flush
     store_name = Column(String(200), nullable=True, index=True)  # optional: rating per store
     rating = Column(Integer, nullable=False)  # 1-5 stars
     comment = Column(String(500), nullable=True)  # optional review text
     user_session = Column(String(100), nullable=True)  # simple session tracking (IP hash or cookie)
     created_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
 
+    __table_args__ = (
+        Index('ix_product_ratings_pid_store', 'product_id', 'store_name'),
+    )
+
 
 class PriceReport(Base):
     """Community-reported prices with voting system to prevent abuse"""
@@ -22,6 +28,7 @@ class PriceReport(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     product_identifier = Column(String(200), nullable=False, index=True)
+    product_id = Column(Integer, ForeignKey('products.id'), nullable=True)  # canonical product, set on flush
     store_name = Column(String(200), nullable=False, index=True)
     reported_price = Column(Float, nullable=False)  # EUR
     size_amount = Column(Float, nullable=True)
@@ -36,3 +43,77 @@ class PriceReport(Base):
     # Zusätzliche Felder für bessere Anomalie-Erkennung
     photo_url = Column(String(500), nullable=True)  # Optional: Kassenbon-Foto als Beweis
     confidence_score = Column(Float, default=0.5)  # 0-1: Wie vertrauenswürdig ist die Meldung?
+
+    __table_args__ = (
+        # current-price window query: newest reports per (product, store)
+        Index('ix_price_reports_pid_store_created', 'product_id', 'store_name', 'created_at'),
+    )
+
+
+# ===== ARCHIVE (app/archive.py moves cold rows here) =====
+
+class PriceReportArchive(Base):
+    """
+    price_reports rows moved out of the hot table: rejected reports and reports older than
+    the active window. Same columns and ids; one index for product/store history.
+    """
+    __tablename__ = 'price_reports_archive'
+
+    id = Column(Integer, primary_key=True, autoincrement=False)  # id it had in price_reports
+    product_identifier = Column(String(200), nullable=False)
+    product_id = Column(Integer, nullable=True)
+    store_name = Column(String(200), nullable=False)
+    reported_price = Column(Float, nullable=False)
+    size_amount = Column(Float, nullable=True)
+    size_unit = Column(String(20), nullable=True)
+    user_session = Column(String(100), nullable=True)
+    upvotes = Column(Integer, default=0)
+    downvotes = Column(Integer, default=0)
+    status = Column(String(50))
+    verified_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime)
+    photo_url = Column(String(500), nullable=True)
+    confidence_score = Column(Float)
+    archived_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        Index('ix_price_reports_archive_pid_store_created', 'product_id', 'store_name', 'created_at'),
+    )
+
+
+class ProductRatingArchive(Base):
+    """product_ratings rows older than the active window; their stars live on in ArchivedRatingCount"""
+    __tablename__ = 'product_ratings_archive'
+
+    id = Column(Integer, primary_key=True, autoincrement=False)  # id it had in product_ratings
+    product_identifier = Column(String(200), nullable=False)
+    product_id = Column(Integer, nullable=True)
+    store_name = Column(String(200), nullable=True)
+    rating = Column(Integer, nullable=False)
+    comment = Column(String(500), nullable=True)
+    user_session = Column(String(100), nullable=True)
+    created_at = Column(DateTime)
+    archived_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        Index('ix_product_ratings_archive_pid_store_created', 'product_id', 'store_name', 'created_at'),
+    )
+
+
+class ArchivedRatingCount(Base):
+    """
+    Star counts of archived ratings per (product_identifier, store, rating), so rating stats
+    and sync summaries stay complete without reading the archive.
+    """
+    __tablename__ = 'archived_rating_counts'
+
+    id = Column(Integer, primary_key=True)
+    product_identifier = Column(String(200), nullable=False)
+    product_id = Column(Integer, nullable=True)
+    store_name = Column(String(200), nullable=True)
+    rating = Column(Integer, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index('ix_archived_rating_counts_pid_store', 'product_id', 'store_name'),
+    )
@@ -2,11 +2,16 @@
 API endpoints for product ratings and community price reports
 """
 from fastapi import APIRouter, HTTPException, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, select
 from typing import Optional, List
 from . import rating_models, rating_schemas
-from .database import SessionLocal
+from .database import SessionLocal, get_async_db, get_read_db
+from .db_writer import writer, added
+from .product_catalog import product_clause
+from .pricing import recent_report_prices
+import datetime
 import hashlib
 
 router = APIRouter(prefix="/api/v1", tags=["Ratings & Prices"])
@@ -28,19 +33,13 @@ def get_user_session(ip: str) -> str:
 # ===== RATINGS =====
 
 @router.post("/ratings", response_model=rating_schemas.ProductRating)
-def create_rating(
-    payload: rating_schemas.ProductRatingCreate,
-    db: Session = Depends(get_db)
-):
+def create_rating(payload: rating_schemas.ProductRatingCreate):
     """Submit a product rating (1-5 stars + optional comment)"""
     if payload.rating < 1 or payload.rating > 5:
         raise HTTPException(status_code=400, detail="Rating must be 1-5")
     
     rating = rating_models.ProductRating(**payload.dict())
-    db.add(rating)
-    db.commit()
-    db.refresh(rating)
-    return rating
+    return writer.run(lambda db: added(db, rating))
 
 
 @router.get("/ratings", response_model=List[rating_schemas.ProductRating])
@@ -48,24 +47,26 @@ def list_ratings(
     product_identifier: Optional[str] = None,
     store_name: Optional[str] = None,
     limit: int = Query(50, le=200),
-    db: Session = Depends(get_db)
+    archived: bool = False,
+    db: Session = Depends(get_read_db)
 ):
-    """Get ratings for a product (optionally filtered by store)"""
-    q = db.query(rating_models.ProductRating)
+    """Get ratings for a product (optionally filtered by store); archived=true lists the archive"""
+    R = rating_models.ProductRatingArchive if archived else rating_models.ProductRating
+    q = db.query(R)
     if product_identifier:
-        q = q.filter(rating_models.ProductRating.product_identifier == product_identifier)
+        q = q.filter(product_clause(db, R, product_identifier))
     if store_name:
-        q = q.filter(rating_models.ProductRating.store_name == store_name)
+        q = q.filter(R.store_name == store_name)
     
-    items = q.order_by(rating_models.ProductRating.created_at.desc()).limit(limit).all()
+    items = q.order_by(R.created_at.desc()).limit(limit).all()
     return items
 
 
 @router.get("/ratings/stats", response_model=rating_schemas.ProductRatingStats)
-def get_rating_stats(
+async def get_rating_stats(
     product_identifier: str,
     store_name: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get aggregated rating statistics for a product"""
     # Diagnostic log for debugging missing stats calls
@@ -73,28 +74,36 @@ def get_rating_stats(
         print(f"ratings.stats called with product_identifier={product_identifier!r} store_name={store_name!r}")
     except Exception:
         pass
-    q = db.query(rating_models.ProductRating).filter(
-        rating_models.ProductRating.product_identifier == product_identifier
-    )
+    R = rating_models.ProductRating
+    C = rating_models.ArchivedRatingCount  # ratings the archive mover took out of product_ratings
+    q = select(R.rating, func.count()).where(
+        await db.run_sync(product_clause, R, product_identifier)
+    ).group_by(R.rating)
+    archived = select(C.rating, func.sum(C.count)).where(
+        await db.run_sync(product_clause, C, product_identifier)
+    ).group_by(C.rating)
     if store_name:
-        q = q.filter(rating_models.ProductRating.store_name == store_name)
+        q = q.where(R.store_name == store_name)
+        archived = archived.where(C.store_name == store_name)
     try:
-        ratings = q.all()
+        counts = dict((await db.execute(q)).all())
+        for rating, n in (await db.execute(archived)).all():
+            counts[rating] = counts.get(rating, 0) + n
     except Exception as e:
         print(f"Error querying ratings for stats: {e}")
-        ratings = []
-    if not ratings:
+        counts = {}
+    total = sum(counts.values())
+    dist = {i: counts.get(i, 0) for i in range(1, 6)}
+    if not total:
         # return empty statistics (200) so frontends don't get 404
         return rating_schemas.ProductRatingStats(
             product_identifier=product_identifier,
             store_name=store_name,
             average_rating=0,
             total_ratings=0,
-            rating_distribution={1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
+            rating_distribution=dist
         )
-    total = len(ratings)
-    avg = sum(r.rating for r in ratings) / total
-    dist = {i: len([r for r in ratings if r.rating == i]) for i in range(1, 6)}
+    avg = sum(rating * n for rating, n in counts.items()) / total
     return rating_schemas.ProductRatingStats(
         product_identifier=product_identifier,
         store_name=store_name,
@@ -106,46 +115,112 @@ def get_rating_stats(
 
 # ===== PRICE REPORTS =====
 
+PRICE_MIN = 0.10
+PRICE_MAX = 500
+RECENT_REPORTS = 5  # reports compared against in the plausibility check
+MAX_DEVIATION = 0.5
+
+
+def price_bounds_error(price: float) -> Optional[str]:
+    """PLAUSIBILITÄTS-CHECK 1: Preis ist extrem unrealistisch"""
+    if price <= 0:
+        return "Price must be positive"
+    if price < PRICE_MIN:
+        return "Preis zu niedrig (< 0.10 €) - bitte überprüfen"
+    if price > PRICE_MAX:
+        return "Preis zu hoch (> 500 €) - bitte überprüfen"
+    return None
+
+
+def plausibility_status(price: float, recent_prices: List[float]) -> str:
+    """PLAUSIBILITÄTS-CHECK 2: Vergleich mit bestehenden Preisen für gleiches Produkt"""
+    if recent_prices:
+        avg_price = sum(recent_prices) / len(recent_prices)
+        # Wenn neuer Preis mehr als 50% vom Durchschnitt abweicht → braucht mehr Bestätigungen
+        if abs(price - avg_price) / avg_price > MAX_DEVIATION:
+            return "pending_review"
+    return "pending"
+
+
 @router.post("/price_reports", response_model=rating_schemas.PriceReport)
 def create_price_report(
     payload: rating_schemas.PriceReportCreate,
     db: Session = Depends(get_db)
 ):
     """Submit a price report for community verification"""
-    if payload.reported_price <= 0:
-        raise HTTPException(status_code=400, detail="Price must be positive")
-    
-    # PLAUSIBILITÄTS-CHECK 1: Preis ist extrem unrealistisch
-    if payload.reported_price < 0.10:
-        raise HTTPException(status_code=400, detail="Preis zu niedrig (< 0.10 €) - bitte überprüfen")
-    if payload.reported_price > 500:
-        raise HTTPException(status_code=400, detail="Preis zu hoch (> 500 €) - bitte überprüfen")
-    
-    # PLAUSIBILITÄTS-CHECK 2: Vergleich mit bestehenden Preisen für gleiches Produkt
-    existing = db.query(rating_models.PriceReport).filter(
-        rating_models.PriceReport.product_identifier == payload.product_identifier,
+    error = price_bounds_error(payload.reported_price)
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+
+    existing = db.query(rating_models.PriceReport.reported_price).filter(
+        product_clause(db, rating_models.PriceReport, payload.product_identifier),
         rating_models.PriceReport.store_name == payload.store_name,
         rating_models.PriceReport.status != "rejected"
-    ).order_by(rating_models.PriceReport.created_at.desc()).limit(5).all()
-    
-    if existing:
-        avg_price = sum(r.reported_price for r in existing) / len(existing)
-        # Wenn neuer Preis mehr als 50% vom Durchschnitt abweicht → Warnung setzen
-        deviation = abs(payload.reported_price - avg_price) / avg_price
-        if deviation > 0.5:
-            # Speichern mit Warnung, aber status bleibt pending und braucht mehr Votes
-            report = rating_models.PriceReport(**payload.dict())
-            report.status = "pending_review"  # Braucht mehr Bestätigungen
-            db.add(report)
-            db.commit()
-            db.refresh(report)
-            return report
-    
+    ).order_by(rating_models.PriceReport.created_at.desc()).limit(RECENT_REPORTS).all()
+
     report = rating_models.PriceReport(**payload.dict())
-    db.add(report)
-    db.commit()
-    db.refresh(report)
-    return report
+    report.status = plausibility_status(payload.reported_price, [price for (price,) in existing])
+    return writer.run(lambda db: added(db, report))
+
+
+@router.post("/price_reports:bulk", response_model=rating_schemas.PriceReportBulkResult)
+def create_price_reports_bulk(
+    payload: rating_schemas.PriceReportBulkCreate,
+    db: Session = Depends(get_db)
+):
+    """
+    Submit all lines of a scanned receipt at once.
+    Plausibility is checked for every line with one query, valid lines are
+    stored in a single transaction, and each line gets its own status.
+    Out-of-range prices are reported as rejected instead of failing the receipt.
+    """
+    now = datetime.datetime.utcnow()
+    purchased_at = payload.purchased_at
+    if purchased_at is not None and purchased_at.tzinfo is not None:
+        # created_at is naive UTC
+        purchased_at = purchased_at.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    created_at = min(purchased_at, now) if purchased_at else now
+    recent = recent_report_prices(
+        db, [line.product_identifier for line in payload.lines], payload.store_name, RECENT_REPORTS
+    )
+
+    results: List[rating_schemas.PriceReportBulkLine] = []
+    reports = []
+    for index, line in enumerate(payload.lines):
+        error = price_bounds_error(line.reported_price)
+        if error:
+            results.append(rating_schemas.PriceReportBulkLine(index=index, status="rejected", detail=error))
+            continue
+        report = rating_models.PriceReport(
+            product_identifier=line.product_identifier,
+            store_name=payload.store_name,
+            reported_price=line.reported_price,
+            size_amount=line.size_amount,
+            size_unit=line.size_unit,
+            user_session=payload.user_session,
+            photo_url=payload.photo_url,
+            status=plausibility_status(line.reported_price, recent.get(line.product_identifier, [])),
+            created_at=created_at,
+        )
+        reports.append(report)
+        results.append(rating_schemas.PriceReportBulkLine(index=index, status=report.status))
+
+    if reports:
+        def write(db):
+            db.add_all(reports)
+            db.flush()
+            return [r.id for r in reports]
+
+        ids = iter(writer.run(write))
+        for result in results:
+            if result.status != "rejected":
+                result.id = next(ids)
+
+    return rating_schemas.PriceReportBulkResult(
+        created=len(reports),
+        rejected=len(results) - len(reports),
+        lines=results,
+    )
 
 
 @router.get("/price_reports", response_model=List[rating_schemas.PriceReport])
@@ -154,33 +229,41 @@ def list_price_reports(
     store_name: Optional[str] = None,
     status: Optional[str] = None,
     limit: int = Query(50, le=200),
-    db: Session = Depends(get_db)
+    archived: bool = False,
+    db: Session = Depends(get_read_db)
 ):
-    """Get price reports (optionally filtered)"""
-    q = db.query(rating_models.PriceReport)
+    """Get price reports (optionally filtered); archived=true lists rejected and expired reports"""
+    PR = rating_models.PriceReportArchive if archived else rating_models.PriceReport
+    q = db.query(PR)
     if product_identifier:
-        q = q.filter(rating_models.PriceReport.product_identifier == product_identifier)
+        q = q.filter(product_clause(db, PR, product_identifier))
     if store_name:
-        q = q.filter(rating_models.PriceReport.store_name == store_name)
+        q = q.filter(PR.store_name == store_name)
     if status:
-        q = q.filter(rating_models.PriceReport.status == status)
+        q = q.filter(PR.status == status)
     
-    items = q.order_by(rating_models.PriceReport.created_at.desc()).limit(limit).all()
+    items = q.order_by(PR.created_at.desc()).limit(limit).all()
     return items
 
 
 @router.post("/price_reports/{report_id}/vote")
 def vote_price_report(
     report_id: int,
-    vote: rating_schemas.PriceVote,
-    db: Session = Depends(get_db)
+    vote: rating_schemas.PriceVote
 ):
     """Vote on a price report (up = confirm, down = flag as wrong)"""
+    # read-modify-write on the writer: concurrent votes cannot overwrite each other's counts
+    return writer.run(lambda db: _apply_price_vote(db, report_id, vote))
+
+
+def _apply_price_vote(db: Session, report_id: int, vote: rating_schemas.PriceVote) -> dict:
     report = db.query(rating_models.PriceReport).filter(
         rating_models.PriceReport.id == report_id
     ).first()
     
     if not report:
+        if db.get(rating_models.PriceReportArchive, report_id):
+            raise HTTPException(status_code=410, detail="Price report archived")
         raise HTTPException(status_code=404, detail="Price report not found")
     
     if vote.vote == "up":
@@ -194,7 +277,7 @@ def vote_price_report(
             # Update ProductLocation with verified price
             from . import product_models
             pl = db.query(product_models.ProductLocation).filter(
-                product_models.ProductLocation.product_identifier == report.product_identifier,
+                product_clause(db, product_models.ProductLocation, report.product_identifier),
                 product_models.ProductLocation.store_name == report.store_name
             ).first()
             if pl:
@@ -213,7 +296,6 @@ def vote_price_report(
     else:
         raise HTTPException(status_code=400, detail="Vote must be 'up' or 'down'")
     
-    db.commit()
     return {
         "id": report.id,
         "upvotes": report.upvotes,
@@ -223,10 +305,10 @@ def vote_price_report(
 
 
 @router.get("/price_reports/best_price")
-def get_best_price(
+async def get_best_price(
     product_identifier: str,
     store_name: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get the most trusted current price for a product at a store.
@@ -237,10 +319,10 @@ def get_best_price(
     
     # First check if ProductLocation has a verified price
     from . import product_models
-    pl = db.query(product_models.ProductLocation).filter(
-        product_models.ProductLocation.product_identifier == product_identifier,
+    pl = (await db.execute(select(product_models.ProductLocation).where(
+        await db.run_sync(product_clause, product_models.ProductLocation, product_identifier),
         product_models.ProductLocation.store_name == store_name
-    ).first()
+    ).limit(1))).scalars().first()
     
     if pl and pl.current_price:
         # Prüfe ob price_history existiert und Preis noch aktuell ist
@@ -293,15 +375,16 @@ def get_best_price(
         }
     
     # Otherwise get best community-reported price (nur letzte 30 Tage)
-    reports = db.query(rating_models.PriceReport).filter(
-        rating_models.PriceReport.product_identifier == product_identifier,
+    report_clause = await db.run_sync(product_clause, rating_models.PriceReport, product_identifier)
+    reports = (await db.execute(select(rating_models.PriceReport).where(
+        report_clause,
         rating_models.PriceReport.store_name == store_name,
         rating_models.PriceReport.status != "rejected",
         rating_models.PriceReport.created_at >= thirty_days_ago  # ← WICHTIG!
     ).order_by(
         rating_models.PriceReport.upvotes.desc(),
         rating_models.PriceReport.created_at.desc()
-    ).first()
+    ).limit(1))).scalars().first()
     
     if reports:
         age_days = (datetime.datetime.utcnow() - reports.created_at).days
@@ -321,14 +404,14 @@ def get_best_price(
     # Fallback: Prüfe ob es Preise für die KETTE gibt (nicht nur diesen Standort)
     store_chain = store_name.split()[0] if ' ' in store_name else store_name  # "REWE Drochtersen" → "REWE"
     
-    chain_reports = db.query(rating_models.PriceReport).filter(
-        rating_models.PriceReport.product_identifier == product_identifier,
+    chain_reports = (await db.execute(select(rating_models.PriceReport).where(
+        report_clause,
         rating_models.PriceReport.store_name.like(f"{store_chain}%"),  # Alle REWE-Filialen
         rating_models.PriceReport.status == "verified",
         rating_models.PriceReport.created_at >= thirty_days_ago
     ).order_by(
         rating_models.PriceReport.created_at.desc()
-    ).limit(5).all()
+    ).limit(5))).scalars().all()
     
     if chain_reports:
         # Durchschnittspreis der Kette
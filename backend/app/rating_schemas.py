@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 
 class ProductRatingCreate(BaseModel):
@@ -62,3 +62,32 @@ class PriceReport(BaseModel):
 
 class PriceVote(BaseModel):
     vote: str  # "up" or "down"
+
+
+class ReceiptLine(BaseModel):
+    product_identifier: str
+    reported_price: float
+    size_amount: Optional[float] = None
+    size_unit: Optional[str] = None
+
+
+class PriceReportBulkCreate(BaseModel):
+    """One scanned receipt: shared store/date/photo, many lines"""
+    store_name: str
+    purchased_at: Optional[datetime] = None  # receipt date; defaults to now
+    photo_url: Optional[str] = None
+    user_session: Optional[str] = None
+    lines: List[ReceiptLine] = Field(..., min_length=1, max_length=200)
+
+
+class PriceReportBulkLine(BaseModel):
+    index: int  # position in the request's lines
+    status: str  # pending, pending_review, rejected
+    id: Optional[int] = None  # None if rejected
+    detail: Optional[str] = None
+
+
+class PriceReportBulkResult(BaseModel):
+    created: int
+    rejected: int
+    lines: List[PriceReportBulkLine]
@@ -0,0 +1,258 @@
+"""
+Receipt OCR lines -> prices, quantities and product candidates.
+
+Parsing is plain regex work on German till receipts:
+
+    WEIH.H-MILCH 1,5%          1,19 A     item (tax class suffix ignored)
+    BANANEN                    1,36 A
+      0,456 kg x 2,99 EUR/kg              weight line, belongs to BANANEN
+    JOGHURT                    1,98 B
+      2 Stk x 0,99                        quantity line, belongs to JOGHURT
+    PFAND                      0,25 A     deposit
+    SUMME EUR                 23,45       total
+
+Matching uses an abbreviation index built once from product_locations and the
+canonical product names. Receipt tokens are short ("WEIH", "MLCH"), so a
+token matches vocabulary words exactly, by prefix (bisect on a sorted word
+list) or by consonant skeleton ("mlch" -> "milch"); idf weighting keeps
+"weih" more informative than "h". The index is built once and then updated
+incrementally (product_index.ProductIndex).
+"""
+import bisect
+import math
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy.orm import Session
+
+from .product_index import IndexEntry, ProductIndex, SharedIndex
+
+MAX_PREFIX_EXPANSION = 40
+
+_NUM = r'\d{1,4}[.,]\d{2}'
+# "1,19 A", "-0,50", "0,50-" (some tills print discounts with a trailing minus)
+PRICE_AT_END = re.compile(rf'(?P<price>-?\s?{_NUM})(?P<minus>-)?\s*(?:€|EUR)?\s*(?:[A-D]{{1,2}}|\*)?\s*$', re.I)
+QUANTITY = re.compile(rf'(?P<qty>\d{{1,3}})\s*(?:stk\.?|st\.?)?\s*[x*]\s*(?P<unit>{_NUM})', re.I)
+# Lidl/Aldi style: unit price first ("0,99 x 2")
+QUANTITY_AFTER = re.compile(rf'(?P<unit>{_NUM})\s*[x*]\s*(?P<qty>\d{{1,3}})(?![.,]?\d)', re.I)
+WEIGHT = re.compile(rf'(?P<kg>\d{{1,3}}[.,]\d{{1,3}})\s*kg\s*[x*]\s*(?P<per_kg>{_NUM})\s*(?:€|EUR)?\s*/\s*kg', re.I)
+TOTAL = re.compile(r'\b(summe|gesamt|zu zahlen|total|zwischensumme)\b', re.I)
+DEPOSIT = re.compile(r'\b(pfand|leergut|einweg|mehrweg)\b', re.I)
+DISCOUNT = re.compile(r'\b(rabatt|coupon|preisvorteil|nachlass|aktion)\b', re.I)
+IGNORE = re.compile(
+    r'\b(bar|rückgeld|rueckgeld|gegeben|ec-?karte|girocard|kartenzahlung|visa|mastercard|mwst|steuer|netto|brutto|'
+    r'ust|beleg|bon-?nr|kasse|datum|uhrzeit|tel|ust-?id|vielen dank)\b', re.I)
+
+# VAT summary rows: "A= 7,0%  37,28  2,61  39,89", "B 19%  2,99  0,57  3,56"
+TAX_ROW = re.compile(r'^[A-D]\s*=?\s*\d{1,2}(?:[.,]\d)?\s*%')
+
+_UMLAUTS = str.maketrans({'ä': 'ae', 'ö': 'oe', 'ü': 'ue', 'ß': 'ss'})
+# decimals stay one token so "1,5%" and "3,5%" do not look alike
+_TOKEN = re.compile(r'[a-z]+|\d+(?:[.,]\d+)?')
+_VOWELS = re.compile(r'[aeiouy]')
+
+
+def _to_float(value: str) -> float:
+    return float(value.replace(' ', '').replace(',', '.'))
+
+
+def _price(match) -> float:
+    value = _to_float(match.group('price'))
+    return -abs(value) if match.group('minus') else value
+
+
+def tokenize(text: str) -> List[str]:
+    """'WEIH.H-MILCH 1,5%' -> ['weih', 'h', 'milch', '1.5']; letters and digits are split apart"""
+    return [t.replace(',', '.') for t in _TOKEN.findall((text or '').casefold().translate(_UMLAUTS))]
+
+
+def skeleton(token: str) -> str:
+    """Receipt abbreviations drop vowels: 'milch' and 'mlch' share 'mlch'"""
+    return token[0] + _VOWELS.sub('', token[1:])
+
+
+@dataclass
+class ParsedLine:
+    index: int
+    raw: str
+    kind: str = 'ignore'  # item, quantity, weight, deposit, discount, total, ignore
+    name: Optional[str] = None
+    price: Optional[float] = None  # line total as printed
+    quantity: Optional[int] = None
+    unit_price: Optional[float] = None
+    weight_kg: Optional[float] = None
+    candidates: List[dict] = field(default_factory=list)
+
+
+def parse_line(index: int, raw: str) -> ParsedLine:
+    text = ' '.join((raw or '').split())
+    line = ParsedLine(index=index, raw=raw)
+    if not text or TAX_ROW.match(text):
+        return line
+
+    weight = WEIGHT.search(text)
+    if weight:
+        line.kind = 'weight'
+        line.weight_kg = _to_float(weight.group('kg'))
+        line.unit_price = _to_float(weight.group('per_kg'))
+        line.price = round(line.weight_kg * line.unit_price, 2)
+        return line
+
+    price_match = PRICE_AT_END.search(text)
+    quantity = QUANTITY.search(text) or QUANTITY_AFTER.search(text)
+    if quantity:
+        line.quantity = int(quantity.group('qty'))
+        line.unit_price = _to_float(quantity.group('unit'))
+        name = text[:quantity.start()].strip()
+        if not name or not re.search(r'[A-Za-zÄÖÜäöü]{2}', name):
+            # continuation line ("2 Stk x 0,99 1,98"): belongs to the previous item
+            line.kind = 'quantity'
+            line.price = round(line.quantity * line.unit_price, 2)
+            return line
+        line.name = name
+        line.price = _price(price_match) if price_match and price_match.start() >= quantity.end() \
+            else round(line.quantity * line.unit_price, 2)
+    elif price_match:
+        line.price = _price(price_match)
+        line.name = text[:price_match.start()].strip(' .:*-')
+    else:
+        line.kind = 'ignore'
+        return line
+
+    if TOTAL.search(text):
+        line.kind = 'total'
+    elif IGNORE.search(text) or not line.name:
+        line.kind = 'ignore'
+    elif DEPOSIT.search(text):
+        line.kind = 'deposit'
+    elif DISCOUNT.search(text) or (line.price is not None and line.price < 0):
+        line.kind = 'discount'
+    else:
+        line.kind = 'item'
+    return line
+
+
+def parse_lines(lines: List[str]) -> List[ParsedLine]:
+    """Parse all lines and fold quantity/weight continuation lines into the item above them"""
+    parsed = [parse_line(i, raw) for i, raw in enumerate(lines)]
+    last_item = None
+    for line in parsed:
+        if line.kind == 'item':
+            last_item = line
+        elif line.kind in ('quantity', 'weight') and last_item is not None:
+            if line.kind == 'quantity':
+                last_item.quantity, last_item.unit_price = line.quantity, line.unit_price
+            else:
+                last_item.weight_kg, last_item.unit_price = line.weight_kg, line.unit_price
+            if last_item.price is None:
+                last_item.price = line.price
+            last_item = None
+        elif line.kind != 'ignore':
+            last_item = None
+    return parsed
+
+
+class ReceiptIndex(ProductIndex):
+    """
+    Token/abbreviation index over known product names: an entry is indexed
+    under the tokens of its display name and identifiers, and every word of
+    three or more letters also under its consonant skeleton.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.skeletons: Dict[str, List[str]] = {}
+
+    def word_added(self, word: str) -> None:
+        if len(word) >= 3 and word.isalpha():
+            self.skeletons.setdefault(skeleton(word), []).append(word)
+
+    def entry_tokens(self, entry: IndexEntry) -> Set[str]:
+        if not (entry.variants or entry.named):
+            return set()
+        tokens = set()
+        for text in [entry.display] + list(entry.variants):
+            tokens.update(tokenize(text))
+        return tokens
+
+    # --- querying -------------------------------------------------------------------------
+
+    def _idf(self, word: str) -> float:
+        return math.log(1 + max(len(self.entries), 1) / max(len(self.postings.get(word, ())), 1))
+
+    def _expand(self, token: str) -> Dict[str, float]:
+        """Vocabulary words a receipt token may stand for, with a match weight"""
+        matches = {}
+        if self.postings.get(token):
+            matches[token] = 1.0
+        if not token.isalpha() or len(token) < 2:
+            return matches
+        lo = bisect.bisect_left(self.vocabulary, token)
+        for word in self.vocabulary[lo:lo + MAX_PREFIX_EXPANSION]:
+            if not word.startswith(token):
+                break
+            if self.postings[word]:
+                matches.setdefault(word, 0.6 + 0.4 * len(token) / len(word))
+        if len(token) >= 3:
+            for word in self.skeletons.get(skeleton(token), ()):
+                if self.postings[word]:
+                    matches.setdefault(word, 0.7)
+        return matches
+
+    def match(self, text: str, limit: int = 3, min_score: float = 0.35) -> List[dict]:
+        tokens = list(dict.fromkeys(tokenize(text)))
+        if not tokens or not self.entries:
+            return []
+        scores: Dict[object, float] = {}
+        hits: Dict[object, int] = {}
+        possible = 0.0
+        max_idf = math.log(1 + len(self.entries))
+        expanded = [self._expand(token) for token in tokens]
+        # rare tokens first: they pick the candidates, common ones ("g", "500") only add to them
+        expanded.sort(key=lambda ex: min((len(self.postings[w]) for w in ex), default=0))
+        for expansions in expanded:
+            # unmatched tokens count against every entry
+            possible += max((self._idf(w) for w in expansions), default=max_idf)
+            best: Dict[object, float] = {}
+            for word, weight in expansions.items():
+                value = weight * self._idf(word)
+                postings = self.postings[word]
+                if scores and len(postings) > 4 * len(scores):
+                    postings = [key for key in scores if key in postings]
+                for key in postings:
+                    if value > best.get(key, 0):
+                        best[key] = value
+            for key, value in best.items():
+                scores[key] = scores.get(key, 0.0) + value
+                hits[key] = hits.get(key, 0) + 1
+        ranked = []
+        for key, value in scores.items():
+            entry = self.entries[key]
+            # mostly how much of the receipt text is explained, a little how much of the product name is used
+            score = 0.85 * value / possible + 0.15 * min(hits[key] / len(entry.tokens), 1.0)
+            if score >= min_score:
+                ranked.append((score, entry))
+        ranked.sort(key=lambda x: (-x[0], x[1].display))
+        return [
+            {'product_identifier': entry.display, 'product_id': entry.product_id, 'score': round(score, 3)}
+            for score, entry in ranked[:limit]
+        ]
+
+
+_shared: SharedIndex[ReceiptIndex] = SharedIndex(ReceiptIndex)
+
+
+def get_receipt_index(db: Session) -> ReceiptIndex:
+    """Shared index; brought up to date (incrementally) whenever product tables have new commits"""
+    return _shared.get(db)
+
+
+def parse_receipt(db: Session, lines: List[str], candidates: int = 3) -> List[ParsedLine]:
+    index = get_receipt_index(db)
+    parsed = parse_lines(lines)
+    with _shared.lock:
+        for line in parsed:
+            if line.kind == 'item' and candidates:
+                line.candidates = index.match(line.name, limit=candidates)
+    return parsed
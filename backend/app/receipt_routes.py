@@ -0,0 +1,25 @@
+"""
+Receipt parsing: raw OCR lines in, prices and product candidates out.
+"""
+from dataclasses import asdict
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from . import receipt_schemas
+from .database import get_db
+from .receipt_parser import parse_receipt
+
+router = APIRouter(prefix="/api/v1/receipts", tags=["Receipts"])
+
+
+@router.post("/parse", response_model=receipt_schemas.ReceiptParseResponse)
+def parse_receipt_lines(payload: receipt_schemas.ReceiptParseRequest, db: Session = Depends(get_db)):
+    """Parse a whole receipt in one call; item lines get ranked product candidates"""
+    parsed = parse_receipt(db, payload.lines, payload.candidates)
+    totals = [line.price for line in parsed if line.kind == 'total' and line.price is not None]
+    items_total = sum(line.price for line in parsed if line.kind in ('item', 'deposit', 'discount') and line.price is not None)
+    return receipt_schemas.ReceiptParseResponse(
+        lines=[receipt_schemas.ParsedReceiptLine(**asdict(line)) for line in parsed],
+        items_total=round(items_total, 2),
+        receipt_total=totals[-1] if totals else None,
+    )
@@ -0,0 +1,31 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List
+
+
+class ReceiptParseRequest(BaseModel):
+    lines: List[str] = Field(..., max_length=500)  # raw OCR lines, in receipt order
+    candidates: int = Field(3, ge=0, le=10)  # product candidates per item line
+
+
+class ProductCandidate(BaseModel):
+    product_identifier: str
+    product_id: Optional[int] = None
+    score: float  # 0-1
+
+
+class ParsedReceiptLine(BaseModel):
+    index: int
+    raw: str
+    kind: str  # item, quantity, weight, deposit, discount, total, ignore
+    name: Optional[str] = None
+    price: Optional[float] = None  # line total as printed
+    quantity: Optional[int] = None
+    unit_price: Optional[float] = None  # per piece, or per kg with weight_kg
+    weight_kg: Optional[float] = None
+    candidates: List[ProductCandidate] = []
+
+
+class ReceiptParseResponse(BaseModel):
+    lines: List[ParsedReceiptLine]
+    items_total: float  # items + deposits + discounts
+    receipt_total: Optional[float] = None  # SUMME line, if recognized
@@ -0,0 +1,178 @@
+"""
+Response cache for hot DB-backed GET endpoints.
+
+A cached response is keyed by path and normalized query string and remembers
+the change_tracking generations of the tables the route reads. As long as
+none of them moved, the stored bytes are sent as they are: no session, no
+query, no serialization. Any committed write to one of the tables (ORM
+flushes bump the counters on commit, Core writes register their tables
+themselves) makes the entry stale; the next request rebuilds it.
+
+The generations are read *before* the endpoint runs, so a write that lands
+while a response is being built leaves that response stale, never the other
+way around.
+
+Counters live in this process (see change_tracking). Writes made by other
+processes (a second worker, scripts, a lagging read replica) are not seen,
+so every entry also expires after its route's ttl.
+
+RESPONSE_CACHE=0 turns it off; GET /api/v1/response_cache/stats reports the
+hit ratio per route.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+from starlette.requests import Request
+
+from . import change_tracking
+from .http_cache import is_not_modified
+
+ENABLED = os.getenv('RESPONSE_CACHE', '1').lower() not in ('0', 'false', 'no')
+MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', '2048'))
+MAX_BODY_BYTES = 1024 * 1024
+DEFAULT_TTL = float(os.getenv('RESPONSE_CACHE_TTL', '300'))
+
+# product filters resolve identifiers through the catalog (product_clause)
+CATALOG = ('products', 'product_aliases')
+
+
+@dataclass(frozen=True)
+class CachedRoute:
+    tables: Tuple[str, ...]  # everything the endpoint reads
+    ttl: float = DEFAULT_TTL
+
+
+ROUTES: Dict[str, CachedRoute] = {
+    '/api/v1/product_locations': CachedRoute(('product_locations',) + CATALOG),
+    '/api/v1/ratings/stats': CachedRoute(('product_ratings', 'archived_rating_counts') + CATALOG),
+    # age_days and the 30-day window move with the clock
+    '/api/v1/price_reports/best_price': CachedRoute(('product_locations', 'price_reports') + CATALOG, ttl=60),
+    '/stores': CachedRoute(('stores',)),
+    '/api/v1/donations': CachedRoute(('donations',)),
+}
+
+
+@dataclass
+class _Entry:
+    generations: tuple
+    expires: float
+    status: int
+    headers: List[Tuple[bytes, bytes]]
+    body: bytes
+    etag: Optional[str]
+
+
+def normalized_query(query_string: bytes) -> str:
+    """Same parameters in any order -> same key"""
+    return urlencode(sorted(parse_qsl(query_string.decode('latin-1'), keep_blank_values=True)))
+
+
+class ResponseCache:
+
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, path: str, outcome: str) -> None:
+        stats = self._stats.setdefault(path, {'hits': 0, 'misses': 0, 'stale': 0})
+        stats[outcome] += 1
+
+    def get(self, key: Tuple[str, str], generations: tuple) -> Optional[_Entry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._count(key[0], 'misses')
+                return None
+            if entry.generations != generations or entry.expires <= time.monotonic():
+                del self._entries[key]
+                self._count(key[0], 'misses')
+                self._count(key[0], 'stale')
+                return None
+            self._entries.move_to_end(key)
+            self._count(key[0], 'hits')
+            return entry
+
+    def put(self, key: Tuple[str, str], entry: _Entry) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._stats.clear()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            entries: Dict[str, int] = {}
+            for path, _ in self._entries:
+                entries[path] = entries.get(path, 0) + 1
+            routes = {}
+            for path, stats in self._stats.items():
+                lookups = stats['hits'] + stats['misses']
+                routes[path] = {**stats, 'entries': entries.get(path, 0),
+                                'hit_ratio': round(stats['hits'] / lookups, 3) if lookups else 0.0}
+            return {'enabled': ENABLED, 'entries': len(self._entries), 'max_entries': self.max_entries, 'routes': routes}
+
+
+response_cache = ResponseCache()
+
+
+class ResponseCacheMiddleware:
+    """Pure ASGI: serves ROUTES from response_cache, fills it from 200 responses"""
+
+    def __init__(self, app, routes: Dict[str, CachedRoute] = ROUTES, cache: ResponseCache = response_cache):
+        self.app = app
+        self.routes = routes
+        self.cache = cache
+
+    async def __call__(self, scope, receive, send):
+        route = self.routes.get(scope['path']) if scope['type'] == 'http' and scope['method'] == 'GET' else None
+        if route is None or not ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        key = (scope['path'], normalized_query(scope.get('query_string', b'')))
+        generations = (change_tracking.BOOT_ID,) + change_tracking.generations(route.tables)
+        entry = self.cache.get(key, generations)
+        if entry is not None:
+            await self._send_cached(scope, send, entry)
+            return
+
+        start = {}
+        chunks: List[bytes] = []
+        size = 0
+
+        async def capture(message):
+            nonlocal size
+            if message['type'] == 'http.response.start':
+                start.update(message)
+            elif message['type'] == 'http.response.body' and size <= MAX_BODY_BYTES:
+                chunks.append(message.get('body', b''))
+                size += len(chunks[-1])
+            await send(message)
+
+        await self.app(scope, receive, capture)
+        if start.get('status') == 200 and size <= MAX_BODY_BYTES:
+            headers = list(start.get('headers', []))
+            etag = next((v.decode('latin-1') for k, v in headers if k.lower() == b'etag'), None)
+            self.cache.put(key, _Entry(generations, time.monotonic() + route.ttl, 200, headers, b''.join(chunks), etag))
+
+    @staticmethod
+    async def _send_cached(scope, send, entry: _Entry) -> None:
+        if entry.etag and is_not_modified(Request(scope), entry.etag):
+            headers = [(k, v) for k, v in entry.headers if k.lower() in (b'etag', b'cache-control', b'last-modified', b'vary')]
+            await send({'type': 'http.response.start', 'status': 304, 'headers': headers})
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+        await send({'type': 'http.response.start', 'status': entry.status, 'headers': entry.headers})
+        await send({'type': 'http.response.body', 'body': entry.body})
@@ -0,0 +1,59 @@
+"""
+Schema versioning (Alembic, backend/migrations; README_DB.md).
+
+Workers never migrate: with several of them starting at once that would race, and a
+long backfill must not hold up the first request. `alembic upgrade head` runs once per
+deploy (the Docker image does it before uvicorn starts). At startup init_schema() only
+ - creates an empty database straight from the models and stamps it at head, and
+ - warns when an existing database is behind the code.
+"""
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy import inspect
+
+from .database import Base, engine
+from . import models, product_models, donation_models, rating_models, store_models, sync_models  # noqa: F401
+
+ALEMBIC_INI = Path(__file__).resolve().parents[1] / 'alembic.ini'
+
+
+def alembic_config(connection=None):
+    from alembic.config import Config
+    config = Config(str(ALEMBIC_INI))
+    if connection is not None:
+        config.attributes['connection'] = connection  # migrations/env.py uses it instead of app.database.engine
+    return config
+
+
+def head_revision() -> str:
+    from alembic.script import ScriptDirectory
+    return ScriptDirectory.from_config(alembic_config()).get_current_head()
+
+
+def current_revision(connection) -> Optional[str]:
+    from alembic.runtime.migration import MigrationContext
+    return MigrationContext.configure(connection).get_current_revision()
+
+
+def upgrade(revision: str = 'head', connection=None) -> None:
+    from alembic import command
+    command.upgrade(alembic_config(connection), revision)
+
+
+def init_schema(bind=None) -> None:
+    """Create and stamp an empty database; on an existing one only check the revision"""
+    from alembic import command
+    bind = bind if bind is not None else engine
+    head = head_revision()
+    with bind.connect() as connection:
+        known = set(Base.metadata.tables) & set(inspect(connection).get_table_names())
+        current = current_revision(connection)
+        if not known:
+            Base.metadata.create_all(bind=connection)
+            command.stamp(alembic_config(connection), head)
+            connection.commit()
+            return
+    if current != head:
+        print(f"⚠️  Database schema is at {current or 'an unversioned state'}, the code expects {head}: "
+              f"run `alembic upgrade head` in backend/ (README_DB.md)")
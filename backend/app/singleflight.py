@@ -0,0 +1,88 @@
+"""
+Coalesced upstream calls that stop when nobody is waiting for them anymore.
+
+    result = await flights.run(('search', query, page), lambda: _fetch_search(...), request)
+
+Identical concurrent requests share one upstream task (single flight).
+Every HTTP request waiting on a flight watches its own client connection;
+when the browser goes away (typing on, navigating off) the request stops
+waiting and raises ClientDisconnected. Once the last waiter has left, the
+upstream task itself is cancelled: retries, fallbacks and enrichment
+requests stop, and their scheduler slots are released.
+"""
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from starlette.requests import Request
+
+DISCONNECT_POLL = 0.1
+
+
+class ClientDisconnected(Exception):
+    """The client went away before the result was ready"""
+
+
+@dataclass
+class _Flight:
+    task: asyncio.Task
+    waiters: int = 1
+
+
+class SingleFlight:
+
+    def __init__(self):
+        self.flights: Dict[Hashable, _Flight] = {}
+        self.stats = {'started': 0, 'coalesced': 0, 'disconnected': 0, 'cancelled': 0}
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable[Any]], request: Optional[Request] = None) -> Any:
+        flight = self.flights.get(key)
+        if flight is None or flight.task.done():
+            task = asyncio.ensure_future(factory())
+            flight = self.flights[key] = _Flight(task)
+            task.add_done_callback(lambda t, key=key: self._forget(key, t))
+            self.stats['started'] += 1
+        else:
+            flight.waiters += 1
+            self.stats['coalesced'] += 1
+        try:
+            return await self._wait(flight, request)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # last interested client left (or was cancelled itself): stop the upstream work
+                flight.task.cancel()
+                self.stats['cancelled'] += 1
+
+    async def _wait(self, flight: _Flight, request: Optional[Request]) -> Any:
+        result = asyncio.shield(flight.task)
+        if request is None:
+            return await result
+        watcher = asyncio.ensure_future(_wait_for_disconnect(request))
+        try:
+            done, _ = await asyncio.wait({result, watcher}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            watcher.cancel()
+        if result in done:
+            return result.result()
+        result.cancel()  # only the shield; the flight keeps running for other waiters
+        self.stats['disconnected'] += 1
+        raise ClientDisconnected()
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        flight = self.flights.get(key)
+        if flight is not None and flight.task is task:
+            del self.flights[key]
+        if not task.cancelled():
+            task.exception()  # retrieved here so abandoned failures are not logged as "never retrieved"
+
+    def snapshot(self) -> Dict[str, int]:
+        return {**self.stats, 'in_flight': len(self.flights)}
+
+
+async def _wait_for_disconnect(request: Request) -> None:
+    while not await request.is_disconnected():
+        await asyncio.sleep(DISCONNECT_POLL)
+
+
+flights = SingleFlight()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Text
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Text, Index
 from .database import Base
 import datetime
 
@@ -28,6 +28,11 @@ class Store(Base):
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
 
+    __table_args__ = (
+        # Bounding-box prefilter for radius searches
+        Index('ix_stores_lat_lng', 'latitude', 'longitude'),
+    )
+
 
 class PriceHistory(Base):
     """
@@ -40,6 +45,7 @@ class PriceHistory(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     product_identifier = Column(String(200), nullable=False, index=True)
+    product_id = Column(Integer, nullable=True, index=True)  # products.id, set on flush
     store_id = Column(Integer, nullable=False, index=True)  # FK zu stores
     store_chain = Column(String(100), nullable=False, index=True)  # Denormalisiert für Performance
     
@@ -1,8 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from . import store_models, store_schemas
-from .database import get_db
+from .database import get_async_db, get_db
+from .db_writer import writer, added
+from .geocoding import resolve_location, bounding_box, haversine_km
 
 router = APIRouter(prefix="/stores", tags=["stores"])
 
@@ -22,53 +26,52 @@ def create_store(
         return existing  # Return existing instead of error
     
     store = store_models.Store(**payload.dict())
-    db.add(store)
-    db.commit()
-    db.refresh(store)
-    return store
+    return writer.run(lambda db: added(db, store))
 
 
 @router.get("", response_model=List[store_schemas.Store])
-def list_stores(
+async def list_stores(
     chain: Optional[str] = None,
     city: Optional[str] = None,
+    postal_code: Optional[str] = None,
     lat: Optional[float] = None,
     lng: Optional[float] = None,
     radius_km: Optional[float] = 50,
     limit: int = Query(100, le=500),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get list of stores, optionally filtered and sorted by distance"""
-    q = db.query(store_models.Store).filter(store_models.Store.is_active == True)
+    """Get list of stores, optionally filtered and sorted by distance.
+    Without lat/lng, postal_code or city are resolved offline to a centroid."""
+    q = select(store_models.Store).where(store_models.Store.is_active == True)
     
     if chain:
-        q = q.filter(store_models.Store.chain == chain)
-    if city:
-        q = q.filter(store_models.Store.city.like(f"%{city}%"))
-    
-    stores = q.limit(limit).all()
-    
-    # Sort by distance if lat/lng provided
-    if lat and lng:
-        import math
-        
-        def haversine_distance(store):
-            if not store.latitude or not store.longitude:
-                return float('inf')
-            
-            R = 6371  # Earth radius in km
-            dLat = math.radians(store.latitude - lat)
-            dLng = math.radians(store.longitude - lng)
-            a = (math.sin(dLat/2) ** 2 + 
-                 math.cos(math.radians(lat)) * math.cos(math.radians(store.latitude)) * 
-                 math.sin(dLng/2) ** 2)
-            c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-            return R * c
-        
-        stores = [s for s in stores if haversine_distance(s) <= radius_km]
-        stores.sort(key=haversine_distance)
-    
-    return stores
+        q = q.where(store_models.Store.chain == chain)
+
+    if (lat is None or lng is None) and (postal_code or city):
+        point = resolve_location(postal_code=postal_code, city=city)
+        if point:
+            lat, lng = point.lat, point.lng
+
+    if lat is None or lng is None:
+        # No spatial anchor: plain text filter
+        if city:
+            q = q.where(store_models.Store.city.like(f"%{city}%"))
+        return (await db.execute(q.limit(limit))).scalars().all()
+
+    # Spatial path: bounding box prefilter uses ix_stores_lat_lng, exact radius check afterwards
+    radius_km = radius_km or 50
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+    q = q.where(
+        store_models.Store.latitude.between(min_lat, max_lat),
+        store_models.Store.longitude.between(min_lng, max_lng),
+    )
+    with_distance = []
+    for store in (await db.execute(q)).scalars():
+        d = haversine_km(lat, lng, store.latitude, store.longitude)
+        if d <= radius_km:
+            with_distance.append((d, store))
+    with_distance.sort(key=lambda x: x[0])
+    return [store for _, store in with_distance[:limit]]
 
 
 @router.get("/{store_id}", response_model=store_schemas.Store)
@@ -81,12 +84,13 @@ def get_store(store_id: int, db: Session = Depends(get_db)):
 
 
 @router.delete("/{store_id}")
-def delete_store(store_id: int, db: Session = Depends(get_db)):
+def delete_store(store_id: int):
     """Soft-delete a store (set is_active=False)"""
-    store = db.query(store_models.Store).filter(store_models.Store.id == store_id).first()
-    if not store:
-        raise HTTPException(status_code=404, detail="Store not found")
-    
-    store.is_active = False
-    db.commit()
+    def write(db):
+        store = db.query(store_models.Store).filter(store_models.Store.id == store_id).first()
+        if not store:
+            raise HTTPException(status_code=404, detail="Store not found")
+        store.is_active = False
+
+    writer.run(write)
     return {"message": "Store deactivated"}
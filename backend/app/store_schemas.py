@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 from typing import Optional
+import datetime
 
 
 class StoreCreate(BaseModel):
@@ -16,7 +17,7 @@ class StoreCreate(BaseModel):
 class Store(StoreCreate):
     id: int
     is_active: bool
-    created_at: str
+    created_at: datetime.datetime
 
     class Config:
         from_attributes = True
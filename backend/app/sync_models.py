@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, String, DateTime, Index
+from .database import Base
+import datetime
+
+
+class SyncChange(Base):
+    """
+    Append-only change log for delta sync (GET /api/v1/sync).
+    Written in the same transaction as the change itself (see change_tracking),
+    so seq is the sync token: everything with seq > token is news for the client.
+    That needs seqs to commit in order; on PostgreSQL change_tracking serializes
+    the log writers (advisory lock) to guarantee it.
+    """
+    __tablename__ = 'sync_changes'
+
+    seq = Column(Integer, primary_key=True)
+    entity = Column(String(30), nullable=False)  # product_location, price, rating_summary
+    entity_id = Column(Integer, nullable=True)  # product_location id
+    product_identifier = Column(String(200), nullable=True)  # price / rating_summary key
+    store_name = Column(String(200), nullable=True)  # '' = product-wide rating summary
+    op = Column(String(10), nullable=False, default='upsert')  # upsert, delete
+    changed_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        Index('ix_sync_changes_changed_at', 'changed_at'),
+        # AUTOINCREMENT: never reuse a seq, even after the newest row was deleted
+        {'sqlite_autoincrement': True},
+    )
@@ -0,0 +1,140 @@
+"""
+Delta sync for offline-capable clients.
+
+GET /api/v1/sync             -> full snapshot + token
+GET /api/v1/sync?since=TOKEN -> only what changed since TOKEN + next token
+"""
+import itertools
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable, Optional, Tuple
+from . import product_models, product_schemas, rating_models, sync_models
+from .database import get_read_db
+from .pricing import current_prices
+
+router = APIRouter(prefix="/api/v1", tags=["Sync"])
+
+SYNC_BATCH_MAX = 5000
+
+
+def _rating_summaries(db: Session, product_identifiers: Optional[Iterable[str]]) -> Dict[Tuple[str, str], dict]:
+    """{(product_identifier, store_name or ''): summary} from one grouped query; '' is the product-wide summary"""
+    R = rating_models.ProductRating
+    C = rating_models.ArchivedRatingCount  # ratings the archive mover took out of product_ratings
+    q = db.query(R.product_identifier, R.store_name, R.rating, func.count(R.id)).group_by(
+        R.product_identifier, R.store_name, R.rating
+    )
+    archived = db.query(C.product_identifier, C.store_name, C.rating, func.sum(C.count)).group_by(
+        C.product_identifier, C.store_name, C.rating
+    )
+    if product_identifiers is not None:
+        products = list(set(product_identifiers))
+        if not products:
+            return {}
+        q = q.filter(R.product_identifier.in_(products))
+        archived = archived.filter(C.product_identifier.in_(products))
+    dists: Dict[Tuple[str, str], Dict[int, int]] = {}
+    for pid, store, rating, count in itertools.chain(q, archived):
+        for key in {(pid, ''), (pid, store or '')}:
+            dist = dists.setdefault(key, {i: 0 for i in range(1, 6)})
+            if rating in dist:
+                dist[rating] += count
+    summaries = {}
+    for (pid, store), dist in dists.items():
+        total = sum(dist.values())
+        summaries[(pid, store)] = {
+            "product_identifier": pid,
+            "store_name": store or None,
+            "average_rating": round(sum(r * c for r, c in dist.items()) / total, 2) if total else 0,
+            "total_ratings": total,
+            "rating_distribution": dist,
+        }
+    return summaries
+
+
+def _price_entry(key, prices):
+    return {"product_identifier": key[0], "store_name": key[1], "price": prices.get(key)}
+
+
+def _empty_rating(key):
+    return {"product_identifier": key[0], "store_name": key[1] or None, "average_rating": 0, "total_ratings": 0,
+            "rating_distribution": {i: 0 for i in range(1, 6)}}
+
+
+def _snapshot(db: Session, token: int) -> dict:
+    locations = db.query(product_models.ProductLocation).order_by(product_models.ProductLocation.id).all()
+    prices = current_prices(db, None)
+    return {
+        "reset": True,
+        "next_token": str(token),
+        "has_more": False,
+        "product_locations": {
+            "upserts": [product_schemas.ProductLocation.model_validate(pl, from_attributes=True) for pl in locations],
+            "deletes": [],
+        },
+        "prices": [_price_entry(key, prices) for key in prices],
+        "rating_summaries": list(_rating_summaries(db, None).values()),
+    }
+
+
+@router.get("/sync")
+def sync(
+    since: Optional[str] = Query(None, description="Token from the previous sync; omit for a full snapshot"),
+    limit: int = Query(1000, ge=1, le=SYNC_BATCH_MAX, description="Max change-log entries per call"),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Changes to product locations, current prices and rating summaries since `since`.
+    Entities are deduplicated, so a location edited ten times is sent once.
+    Keep calling with next_token while has_more is true.
+    """
+    head = db.query(func.max(sync_models.SyncChange.seq)).scalar() or 0
+    if not since:
+        return jsonable_encoder(_snapshot(db, head))
+    try:
+        since_seq = int(since)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid sync token")
+    if since_seq > head:
+        # token from another database (reset / restore): start over
+        return jsonable_encoder(_snapshot(db, head))
+
+    changes = db.query(sync_models.SyncChange).filter(
+        sync_models.SyncChange.seq > since_seq
+    ).order_by(sync_models.SyncChange.seq).limit(limit).all()
+    has_more = len(changes) == limit and changes[-1].seq < head
+    next_token = changes[-1].seq if changes else since_seq
+
+    # last op per entity wins
+    location_ops: Dict[int, str] = {}
+    price_keys = set()
+    rating_keys = set()
+    for c in changes:
+        if c.entity == 'product_location' and c.entity_id is not None:
+            location_ops[c.entity_id] = c.op
+        elif c.entity == 'price':
+            price_keys.add((c.product_identifier, c.store_name))
+        elif c.entity == 'rating_summary':
+            rating_keys.add((c.product_identifier, c.store_name or ''))
+
+    upserts, deletes = [], [i for i, op in location_ops.items() if op == 'delete']
+    wanted = [i for i, op in location_ops.items() if op != 'delete']
+    if wanted:
+        found = db.query(product_models.ProductLocation).filter(product_models.ProductLocation.id.in_(wanted)).all()
+        upserts = [product_schemas.ProductLocation.model_validate(pl, from_attributes=True) for pl in found]
+        deletes.extend(sorted(set(wanted) - {pl.id for pl in found}))
+
+    prices = current_prices(db, {k[0] for k in price_keys}, {k[1] for k in price_keys}) if price_keys else {}
+    summaries = _rating_summaries(db, {k[0] for k in rating_keys}) if rating_keys else {}
+
+    return jsonable_encoder({
+        "reset": False,
+        "next_token": str(next_token),
+        "has_more": has_more,
+        "product_locations": {"upserts": upserts, "deletes": deletes},
+        # price None: no current price any more
+        "prices": [_price_entry(key, prices) for key in sorted(price_keys)],
+        "rating_summaries": [summaries.get(key) or _empty_rating(key) for key in sorted(rating_keys)],
+    })
@@ -0,0 +1,193 @@
+"""
+Streaming, content-addressed image uploads.
+
+The multipart body is parsed as it arrives (python-multipart), and the file
+part is copied chunk by chunk into a temp file next to its final location
+while it is hashed and size-checked. Nothing is spooled first: a declared
+Content-Length above the limit is rejected before the body is read, and any
+other oversized upload as soon as it crosses the limit. Memory stays flat.
+The image type comes from the file's magic bytes, not the client's
+Content-Type or filename. Files are stored as <sha256><ext>: the same photo
+uploaded twice is written once. All disk I/O runs in the threadpool, never
+on the event loop.
+"""
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from fastapi import HTTPException, Request
+from python_multipart.multipart import MultipartParser, parse_options_header
+from starlette.concurrency import run_in_threadpool
+
+# boundaries, part headers and small form fields around the file
+MULTIPART_OVERHEAD = 64 * 1024
+
+# magic-byte prefix -> extension
+IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', '.jpg'),
+    (b'\x89PNG\r\n\x1a\n', '.png'),
+    (b'GIF87a', '.gif'),
+    (b'GIF89a', '.gif'),
+)
+
+
+@dataclass
+class StoredUpload:
+    filename: str  # <sha256><ext>
+    sha256: str
+    size: int
+    created: bool  # False if identical content was already stored
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """Extension for a supported image type from its first bytes, or None"""
+    for signature, ext in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return ext
+    if len(head) >= 12 and head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return '.webp'
+    return None
+
+
+def _open_temp(directory: Path):
+    return tempfile.NamedTemporaryFile(dir=directory, prefix='.upload-', suffix='.part', delete=False)
+
+
+def _discard(tmp) -> None:
+    tmp.close()
+    try:
+        os.unlink(tmp.name)
+    except FileNotFoundError:
+        pass
+
+
+def _publish(tmp, target: Path) -> bool:
+    """Move the finished temp file into place; False if the content already existed"""
+    tmp.close()
+    if target.exists():
+        os.unlink(tmp.name)
+        return False
+    os.chmod(tmp.name, 0o644)
+    # same directory, so this is an atomic rename; a concurrent identical upload just overwrites with equal bytes
+    os.replace(tmp.name, target)
+    return True
+
+
+class _ImageSink:
+    """Receives the file part's bytes: sniffs the type, enforces the limit, hashes and writes them"""
+
+    def __init__(self, tmp, max_bytes: int):
+        self.tmp = tmp
+        self.max_bytes = max_bytes
+        self.digest = hashlib.sha256()
+        self.size = 0
+        self.ext: Optional[str] = None
+        self.head = b''  # held back until there are enough bytes to sniff
+
+    async def feed(self, data: bytes, final: bool = False) -> None:
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            raise HTTPException(status_code=413, detail=f'File too large (max {self.max_bytes // (1024 * 1024)} MiB)')
+        if self.ext is None:
+            self.head += data
+            if len(self.head) < 12 and not final:
+                return
+            if not self.head:
+                return
+            self.ext = sniff_image_type(self.head)
+            if self.ext is None:
+                raise HTTPException(status_code=400, detail='Unsupported image type (JPEG, PNG, WebP or GIF only)')
+            data, self.head = self.head, b''
+        if data:
+            self.digest.update(data)
+            await run_in_threadpool(self.tmp.write, data)
+
+
+def _multipart_boundary(request: Request) -> bytes:
+    content_type, params = parse_options_header(request.headers.get('content-type', ''))
+    if content_type != b'multipart/form-data' or not params.get(b'boundary'):
+        raise HTTPException(status_code=400, detail='Expected multipart/form-data')
+    return params[b'boundary']
+
+
+def _check_declared_length(request: Request, max_bytes: int) -> None:
+    try:
+        declared = int(request.headers.get('content-length', ''))
+    except ValueError:
+        return  # chunked: counted while reading
+    if declared > max_bytes + MULTIPART_OVERHEAD:
+        raise HTTPException(status_code=413, detail=f'File too large (max {max_bytes // (1024 * 1024)} MiB)')
+
+
+async def store_image_upload(request: Request, upload_dir: Path, max_bytes: int, field: str = 'file') -> StoredUpload:
+    """Stream the `field` part of a multipart request into `upload_dir` under its content hash (400 for non-images, 413 above max_bytes)"""
+    _check_declared_length(request, max_bytes)
+    boundary = _multipart_boundary(request)
+    upload_dir.mkdir(parents=True, exist_ok=True)
+    tmp = await run_in_threadpool(_open_temp, upload_dir)
+    sink = _ImageSink(tmp, max_bytes)
+    # parser callbacks are synchronous: collect events per chunk, then act on them
+    events = []
+    header_field = b''
+    part_headers = {}
+
+    def on_header_field(data, start, end):
+        nonlocal header_field
+        header_field += data[start:end]
+
+    def on_header_value(data, start, end):
+        nonlocal header_field
+        part_headers[header_field.lower()] = part_headers.get(header_field.lower(), b'') + data[start:end]
+
+    def on_header_end():
+        nonlocal header_field
+        header_field = b''
+
+    def on_headers_finished():
+        _, options = parse_options_header(part_headers.get(b'content-disposition', b''))
+        events.append(('part', options.get(b'name', b'').decode('latin-1')))
+        part_headers.clear()
+
+    parser = MultipartParser(boundary, {
+        'on_header_field': on_header_field,
+        'on_header_value': on_header_value,
+        'on_header_end': on_header_end,
+        'on_headers_finished': on_headers_finished,
+        'on_part_data': lambda data, start, end: events.append(('data', data[start:end])),
+        'on_part_end': lambda: events.append(('end', None)),
+    })
+    received = 0
+    current = None
+    found = False
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > max_bytes + MULTIPART_OVERHEAD:
+                raise HTTPException(status_code=413, detail=f'File too large (max {max_bytes // (1024 * 1024)} MiB)')
+            parser.write(chunk)
+            for kind, value in events:
+                if kind == 'part':
+                    current = value
+                    found = found or value == field
+                elif kind == 'data' and current == field:
+                    await sink.feed(value)
+                elif kind == 'end' and current == field:
+                    await sink.feed(b'', final=True)
+                    current = None
+            events.clear()
+        parser.finalize()
+        if not found:
+            raise HTTPException(status_code=422, detail=f"Missing form field '{field}'")
+        if sink.ext is None:
+            raise HTTPException(status_code=400, detail='Empty upload')
+    except BaseException:
+        await run_in_threadpool(_discard, tmp)
+        raise
+
+    sha256 = sink.digest.hexdigest()
+    filename = f"{sha256}{sink.ext}"
+    created = await run_in_threadpool(_publish, tmp, upload_dir / filename)
+    return StoredUpload(filename=filename, sha256=sha256, size=sink.size, created=created)
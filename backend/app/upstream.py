@@ -0,0 +1,314 @@
+"""
+One scheduler for all outbound HTTP traffic (Open Food Facts, Overpass).
+
+Every upstream request first takes a slot:
+
+    async with upstream.scheduler.slot(url, deadline=5.0):
+        resp = await client.get(url)
+
+A slot needs
+- a free connection under the host's concurrency cap, and
+- a token from the rate limit of the URL's lane. OFF publishes 100 req/min
+  for product reads and 10 req/min for search, so those are separate lanes.
+
+Waiters are served by priority class (INTERACTIVE before ENRICHMENT before
+PREFETCH before BATCH), FIFO within a class, so a keystroke never queues
+behind a burst of enrichment lookups. Low priorities also leave a reserve of
+tokens in the bucket for interactive traffic, and a class can be capped to a
+number of connections per host (PRIORITY_CONCURRENCY: prefetch never holds
+more than a couple of OFF connections). Waiting is bounded by a
+deadline (UpstreamDeadlineExceeded) and can be cancelled like any await.
+A 429 from upstream empties the lane's bucket for the Retry-After period.
+
+The priority is taken from the `priority` context variable unless passed
+explicitly, so callers deep in a call chain (prefetch jobs, enrichment
+fan-out) only set it once.
+"""
+import asyncio
+import contextlib
+import contextvars
+import heapq
+import itertools
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+INTERACTIVE, ENRICHMENT, PREFETCH, BATCH = 0, 1, 2, 3
+PRIORITY_NAMES = {INTERACTIVE: 'interactive', ENRICHMENT: 'enrichment', PREFETCH: 'prefetch', BATCH: 'batch'}
+# share of the bucket a priority class must leave for the classes above it
+RESERVE = {INTERACTIVE: 0.0, ENRICHMENT: 0.0, PREFETCH: 0.5, BATCH: 0.5}
+# connections per host a class may hold at once (unlisted classes: up to the host cap)
+PRIORITY_CONCURRENCY = {PREFETCH: int(os.getenv('OFF_PREFETCH_CONCURRENCY', '2'))}
+# queue wait bound when the caller passes no deadline (seconds)
+DEFAULT_DEADLINE = {INTERACTIVE: 15.0, ENRICHMENT: 20.0, PREFETCH: 10.0, BATCH: None}
+
+THROTTLE_PAUSE = 30.0  # after a 429 without Retry-After
+
+priority: contextvars.ContextVar[int] = contextvars.ContextVar('upstream_priority', default=INTERACTIVE)
+
+
+class UpstreamDeadlineExceeded(Exception):
+    """No upstream slot became free before the caller's deadline"""
+
+
+class TokenBucket:
+    """`rate` tokens per second up to `capacity`; time-based refill, no background task"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        if now < self.paused_until:
+            self.updated = now
+            return
+        start = max(self.updated, self.paused_until)
+        self.tokens = min(self.capacity, self.tokens + (now - start) * self.rate)
+        self.updated = now
+
+    def try_take(self, reserve: float = 0.0, now: Optional[float] = None) -> bool:
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        if self.tokens - 1 >= reserve * self.capacity - 1e-9:
+            self.tokens -= 1
+            return True
+        return False
+
+    def delay(self, reserve: float = 0.0, now: Optional[float] = None) -> float:
+        """Seconds until try_take(reserve) can succeed"""
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        missing = reserve * self.capacity + 1 - self.tokens
+        wait = max(0.0, missing / self.rate)
+        return max(wait, self.paused_until - now)
+
+    def pause(self, seconds: float) -> None:
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens = 0.0
+        self.paused_until = max(self.paused_until, now + seconds)
+
+    def wait_blocking(self, reserve: float = 0.0) -> None:
+        """For synchronous scripts (importer): sleep until a token is available, then take it"""
+        while not self.try_take(reserve):
+            time.sleep(self.delay(reserve))
+
+
+@dataclass
+class LaneConfig:
+    host: str
+    path_prefixes: Tuple[str, ...]
+    per_minute: float
+    burst: float
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    seq: int
+    future: asyncio.Future = field(compare=False)
+    enqueued: float = field(compare=False)
+
+
+# OFF limits: https://openfoodfacts.github.io/openfoodfacts-server/api/#rate-limits
+LANES: Dict[str, LaneConfig] = {
+    'off-search': LaneConfig('world.openfoodfacts.org', ('/api/v2/search', '/cgi/search.pl'), per_minute=10, burst=5),
+    'off-product': LaneConfig('world.openfoodfacts.org', ('/api/v0/product', '/api/v2/product'), per_minute=100, burst=20),
+    'off-other': LaneConfig('world.openfoodfacts.org', ('/',), per_minute=60, burst=10),
+    'overpass': LaneConfig('overpass-api.de', ('/',), per_minute=30, burst=2),
+}
+HOST_CONCURRENCY = {'world.openfoodfacts.org': 8, 'overpass-api.de': 2}
+DEFAULT_HOST_CONCURRENCY = 4
+
+
+def lane_for(url: str, lanes: Dict[str, LaneConfig] = None) -> str:
+    parts = urlsplit(url)
+    for name, config in (LANES if lanes is None else lanes).items():
+        if parts.hostname == config.host and parts.path.startswith(config.path_prefixes):
+            return name
+    return f"host:{parts.hostname}"
+
+
+class _Stats:
+    """Wait times per priority class (last WINDOW samples) and outcome counters per lane"""
+    WINDOW = 512
+
+    def __init__(self):
+        self.waits: Dict[int, List[float]] = {p: [] for p in PRIORITY_NAMES}
+        self.counters: Dict[str, Dict[str, int]] = {}
+
+    def count(self, lane: str, outcome: str) -> None:
+        lane_counters = self.counters.setdefault(lane, {'granted': 0, 'expired': 0, 'cancelled': 0, 'throttled': 0})
+        lane_counters[outcome] += 1
+
+    def wait(self, prio: int, seconds: float) -> None:
+        samples = self.waits[prio]
+        samples.append(seconds)
+        if len(samples) > self.WINDOW:
+            del samples[:len(samples) - self.WINDOW]
+
+
+class Scheduler:
+
+    def __init__(self, lanes: Dict[str, LaneConfig] = None, host_concurrency: Dict[str, int] = None,
+                 priority_concurrency: Dict[int, int] = None):
+        self.lanes = dict(LANES if lanes is None else lanes)
+        self.host_concurrency = dict(HOST_CONCURRENCY if host_concurrency is None else host_concurrency)
+        self.priority_concurrency = dict(PRIORITY_CONCURRENCY if priority_concurrency is None else priority_concurrency)
+        self.buckets: Dict[str, TokenBucket] = {
+            name: TokenBucket(c.per_minute / 60.0, c.burst) for name, c in self.lanes.items()
+        }
+        self.queues: Dict[str, List[_Waiter]] = {}
+        self.inflight: Dict[str, int] = {}
+        self.inflight_by_priority: Dict[Tuple[str, int], int] = {}
+        self._seq = itertools.count()
+        self._timers: Dict[str, Tuple[asyncio.AbstractEventLoop, asyncio.TimerHandle]] = {}
+        self.stats = _Stats()
+
+    def _host(self, lane: str, url: str) -> str:
+        config = self.lanes.get(lane)
+        return config.host if config else urlsplit(url).hostname or ''
+
+    def _pump(self, lane: str, host: str) -> None:
+        """Hand out slots to queued waiters while capacity and tokens allow"""
+        queue = self.queues.get(lane)
+        bucket = self.buckets.get(lane)
+        cap = self.host_concurrency.get(host, DEFAULT_HOST_CONCURRENCY)
+        while queue:
+            waiter = queue[0]
+            if waiter.future.done():  # cancelled or timed out while queued
+                heapq.heappop(queue)
+                continue
+            if self.inflight.get(host, 0) >= cap:
+                return  # release() pumps again
+            class_cap = self.priority_concurrency.get(waiter.priority)
+            if class_cap is not None and self.inflight_by_priority.get((host, waiter.priority), 0) >= class_cap:
+                return  # class at its share; only the same or lower classes queue behind it
+            if bucket is not None and not bucket.try_take(RESERVE[waiter.priority]):
+                self._schedule_pump(lane, host, bucket.delay(RESERVE[waiter.priority]))
+                return
+            heapq.heappop(queue)
+            self.inflight[host] = self.inflight.get(host, 0) + 1
+            key = (host, waiter.priority)
+            self.inflight_by_priority[key] = self.inflight_by_priority.get(key, 0) + 1
+            waiter.future.set_result(None)
+
+    def _schedule_pump(self, lane: str, host: str, delay: float) -> None:
+        loop = asyncio.get_running_loop()
+        loop_and_timer = self._timers.get(lane)
+        if loop_and_timer is not None:
+            timer_loop, timer = loop_and_timer
+            if timer_loop is loop and not timer.cancelled() and timer.when() <= loop.time() + delay:
+                return  # an earlier wake-up is already scheduled
+            timer.cancel()
+        self._timers[lane] = (loop, loop.call_later(delay, self._on_timer, lane, host))
+
+    def _on_timer(self, lane: str, host: str) -> None:
+        self._timers.pop(lane, None)
+        self._pump_all_for(host)
+
+    def _pump_all_for(self, host: str) -> None:
+        lanes = [lane for lane in self.queues if self._host(lane, '') == host or lane == f"host:{host}"]
+        # lanes share the host's connections: the lane with the most urgent waiter goes first
+        lanes.sort(key=lambda lane: self.queues[lane][0].priority if self.queues[lane] else BATCH + 1)
+        for lane in lanes:
+            self._pump(lane, host)
+
+    def _release(self, host: str, prio: int) -> None:
+        self.inflight[host] -= 1
+        self.inflight_by_priority[(host, prio)] -= 1
+        self._pump_all_for(host)
+
+    async def acquire(self, url: str, prio: Optional[int] = None, deadline: Optional[float] = None) -> Tuple[str, str]:
+        prio = priority.get() if prio is None else prio
+        if deadline is None:
+            deadline = DEFAULT_DEADLINE[prio]
+        lane = lane_for(url, self.lanes)
+        host = self._host(lane, url)
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(prio, next(self._seq), loop.create_future(), time.monotonic())
+        heapq.heappush(self.queues.setdefault(lane, []), waiter)
+        self._pump(lane, host)
+        if not waiter.future.done():
+            self.stats.count(lane, 'throttled')
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout=deadline)
+        except asyncio.TimeoutError:
+            if not self._abandon(waiter, host):
+                return lane, host  # granted in the same tick as the timeout: keep the slot
+            self.stats.count(lane, 'expired')
+            raise UpstreamDeadlineExceeded(f"no upstream slot for {lane} within {deadline:.1f}s")
+        except asyncio.CancelledError:
+            if self._abandon(waiter, host):
+                self.stats.count(lane, 'cancelled')
+            else:
+                self._release(host, prio)
+            raise
+        self.stats.count(lane, 'granted')
+        self.stats.wait(prio, time.monotonic() - waiter.enqueued)
+        return lane, host
+
+    def _abandon(self, waiter: _Waiter, host: str) -> bool:
+        """Give up a queued waiter; False if its slot was already granted (the caller then owns it)"""
+        if waiter.future.done() and not waiter.future.cancelled():
+            return False
+        waiter.future.cancel()
+        self._pump_all_for(host)
+        return True
+
+    @contextlib.asynccontextmanager
+    async def slot(self, url: str, prio: Optional[int] = None, deadline: Optional[float] = None):
+        prio = priority.get() if prio is None else prio
+        lane, host = await self.acquire(url, prio, deadline)
+        try:
+            yield lane
+        finally:
+            self._release(host, prio)
+
+    def throttled(self, url: str, retry_after: Optional[float]) -> None:
+        """Upstream answered 429: stop handing out tokens for the lane for a while"""
+        bucket = self.buckets.get(lane_for(url, self.lanes))
+        if bucket is not None:
+            bucket.pause(retry_after if retry_after is not None else THROTTLE_PAUSE)
+
+    def snapshot(self) -> Dict[str, object]:
+        lanes = {}
+        for name in sorted(set(self.queues) | set(self.buckets)):
+            queue = self.queues.get(name, [])
+            bucket = self.buckets.get(name)
+            if bucket is not None:
+                bucket._refill(time.monotonic())
+            depth = {PRIORITY_NAMES[p]: 0 for p in PRIORITY_NAMES}
+            for waiter in queue:
+                if not waiter.future.done():
+                    depth[PRIORITY_NAMES[waiter.priority]] += 1
+            lanes[name] = {
+                'queue_depth': depth,
+                'tokens': round(bucket.tokens, 2) if bucket else None,
+                **self.stats.counters.get(name, {}),
+            }
+        waits = {}
+        for prio, samples in self.stats.waits.items():
+            ordered = sorted(samples)
+            waits[PRIORITY_NAMES[prio]] = {
+                'samples': len(ordered),
+                'p50_ms': round(ordered[len(ordered) // 2] * 1000, 1) if ordered else None,
+                'p95_ms': round(ordered[int(len(ordered) * 0.95)] * 1000, 1) if ordered else None,
+                'max_ms': round(ordered[-1] * 1000, 1) if ordered else None,
+            }
+        return {'lanes': lanes, 'inflight': dict(self.inflight), 'wait': waits}
+
+
+scheduler = Scheduler()
+
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
@@ -0,0 +1,28 @@
+"""
+Move rejected/expired price reports and old ratings into the archive tables (app/archive.py).
+Run periodically, e.g. nightly from cron: python backend/archive_reports.py [batch_size]
+Safe to re-run; the app can keep running meanwhile.
+"""
+import sys
+from pathlib import Path
+
+# Add backend to path
+backend_path = Path(__file__).resolve().parent
+sys.path.insert(0, str(backend_path))
+
+from app.archive import ARCHIVE_BATCH_SIZE, archive_cold_rows
+from app.db_writer import writer
+
+
+def main():
+    batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else ARCHIVE_BATCH_SIZE
+    try:
+        totals = archive_cold_rows(batch_size=batch_size)
+    finally:
+        writer.stop()
+    for table, count in totals.items():
+        print(f"✅ {table}: {count} rows archived")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+"""
+Mixed-load benchmark: async DB endpoints vs. the same queries on the sync (threadpool) path.
+Run: python backend/benchmarks/bench_async_db.py
+Uses a throwaway sqlite DB (BENCH_DATABASE_URL to override).
+
+Load: CONCURRENCY clients in-process (httpx ASGITransport), each looping over a mix of
+the best_price, ratings/stats, product_locations and stores queries. In the second scenario half
+of the calls go to a sync endpoint that blocks a threadpool slot for 200 ms (like the sync
+OFF lookup does), which is where sync DB endpoints start queueing for threads.
+"""
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+backend_path = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(backend_path))
+os.environ['DATABASE_URL'] = os.getenv(
+    'BENCH_DATABASE_URL', f"sqlite:///{Path(tempfile.mkdtemp()) / 'bench_async_db.db'}"
+)
+
+import httpx  # noqa: E402
+from fastapi import APIRouter, Depends  # noqa: E402
+from sqlalchemy import func, select  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+from app.main import app, init_schema  # noqa: E402
+from app.database import SessionLocal, async_engine, get_async_db, get_db  # noqa: E402
+from app import store_models, product_models, rating_models  # noqa: E402
+from app.product_catalog import product_clause  # noqa: E402
+
+PRODUCTS = 300
+STORES = 40
+CONCURRENCY = 100
+DURATION = 5.0
+# (share of calls that block a threadpool slot, for how long): DB only, then the threadpool
+# (40 slots by default) kept busy by sync work such as the OFF client lookups
+SCENARIOS = ((0.0, 0), (0.5, 200))
+
+# The ported endpoints reduced to their queries, once per path, so the comparison is
+# sync `def` (threadpool + SessionLocal) vs. `async def` (AsyncSession) and nothing else.
+sync_router = APIRouter(prefix='/bench/sync')
+async_router = APIRouter(prefix='/bench/async')
+
+
+@sync_router.get('/best_price')
+def sync_best_price(product_identifier: str, store_name: str, db: Session = Depends(get_db)):
+    PL = product_models.ProductLocation
+    pl = db.query(PL).filter(product_clause(db, PL, product_identifier), PL.store_name == store_name).first()
+    if pl and pl.current_price:
+        return {'source': 'database', 'price': pl.current_price}
+    PR = rating_models.PriceReport
+    report = db.query(PR).filter(product_clause(db, PR, product_identifier), PR.store_name == store_name) \
+        .order_by(PR.upvotes.desc(), PR.created_at.desc()).first()
+    return {'source': 'community', 'price': report.reported_price} if report else {'source': 'none'}
+
+
+@sync_router.get('/stats')
+def sync_stats(product_identifier: str, db: Session = Depends(get_db)):
+    R = rating_models.ProductRating
+    counts = dict(db.query(R.rating, func.count()).filter(product_clause(db, R, product_identifier)).group_by(R.rating).all())
+    return {'total_ratings': sum(counts.values())}
+
+
+@sync_router.get('/product_locations')
+def sync_product_locations(store_name: str, db: Session = Depends(get_db)):
+    PL = product_models.ProductLocation
+    rows = db.query(PL).filter(PL.store_name == store_name).order_by(PL.created_at.desc(), PL.id.desc()).limit(50).all()
+    return [{'id': r.id, 'product_identifier': r.product_identifier} for r in rows]
+
+
+@sync_router.get('/stores')
+def sync_stores(chain: str, db: Session = Depends(get_db)):
+    S = store_models.Store
+    return [{'id': s.id, 'full_name': s.full_name} for s in db.query(S).filter(S.is_active == True, S.chain == chain).limit(100)]
+
+
+@async_router.get('/best_price')
+async def async_best_price(product_identifier: str, store_name: str, db: AsyncSession = Depends(get_async_db)):
+    PL = product_models.ProductLocation
+    pl = (await db.execute(select(PL).where(
+        await db.run_sync(product_clause, PL, product_identifier), PL.store_name == store_name).limit(1))).scalars().first()
+    if pl and pl.current_price:
+        return {'source': 'database', 'price': pl.current_price}
+    PR = rating_models.PriceReport
+    report = (await db.execute(select(PR).where(await db.run_sync(product_clause, PR, product_identifier), PR.store_name == store_name)
+                               .order_by(PR.upvotes.desc(), PR.created_at.desc()).limit(1))).scalars().first()
+    return {'source': 'community', 'price': report.reported_price} if report else {'source': 'none'}
+
+
+@async_router.get('/stats')
+async def async_stats(product_identifier: str, db: AsyncSession = Depends(get_async_db)):
+    R = rating_models.ProductRating
+    q = select(R.rating, func.count()).where(await db.run_sync(product_clause, R, product_identifier)).group_by(R.rating)
+    counts = dict((await db.execute(q)).all())
+    return {'total_ratings': sum(counts.values())}
+
+
+@async_router.get('/product_locations')
+async def async_product_locations(store_name: str, db: AsyncSession = Depends(get_async_db)):
+    PL = product_models.ProductLocation
+    rows = (await db.execute(select(PL).where(PL.store_name == store_name)
+                             .order_by(PL.created_at.desc(), PL.id.desc()).limit(50))).scalars().all()
+    return [{'id': r.id, 'product_identifier': r.product_identifier} for r in rows]
+
+
+@async_router.get('/stores')
+async def async_stores(chain: str, db: AsyncSession = Depends(get_async_db)):
+    S = store_models.Store
+    rows = (await db.execute(select(S).where(S.is_active == True, S.chain == chain).limit(100))).scalars()
+    return [{'id': s.id, 'full_name': s.full_name} for s in rows]
+
+
+@sync_router.get('/slow')
+def slow_sync_call(ms: int):
+    time.sleep(ms / 1000)
+    return {}
+
+
+app.include_router(sync_router)
+app.include_router(async_router)
+
+
+def seed():
+    rnd = random.Random(3)
+    db = SessionLocal()
+    products = [f"Bench Artikel {i} 500 g" for i in range(PRODUCTS)]
+    stores = [f"BENCH Markt {s}" for s in range(STORES)]
+    for s, name in enumerate(stores):
+        db.add(store_models.Store(chain='BENCH', location=f'Markt {s}', full_name=name,
+                                  latitude=53.5 + rnd.uniform(-0.1, 0.1), longitude=10.0 + rnd.uniform(-0.1, 0.1)))
+    for product in products:
+        for name in rnd.sample(stores, 8):
+            db.add(product_models.ProductLocation(product_identifier=product, store_name=name,
+                                                  current_price=round(rnd.uniform(0.5, 5), 2) if rnd.random() < 0.5 else None))
+            db.add(rating_models.PriceReport(product_identifier=product, store_name=name,
+                                             reported_price=round(rnd.uniform(0.5, 5), 2), upvotes=rnd.randint(0, 5)))
+            db.add(rating_models.ProductRating(product_identifier=product, store_name=name, rating=rnd.randint(1, 5)))
+    db.commit()
+    db.close()
+    return products, stores
+
+
+def request_for(variant, products, stores, rnd):
+    product, store = rnd.choice(products), rnd.choice(stores)
+    return rnd.choice([
+        (f'/bench/{variant}/best_price', {'product_identifier': product, 'store_name': store}),
+        (f'/bench/{variant}/stats', {'product_identifier': product}),
+        (f'/bench/{variant}/product_locations', {'store_name': store}),
+        (f'/bench/{variant}/stores', {'chain': 'BENCH'}),
+    ])
+
+
+async def run(variant, products, stores, slow_share, slow_ms):
+    rnd = random.Random(11)
+    latencies = []
+    slow = 0
+    deadline = time.perf_counter() + DURATION
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+        async def worker():
+            nonlocal slow
+            while time.perf_counter() < deadline:
+                if rnd.random() < slow_share:
+                    await client.get('/bench/sync/slow', params={'ms': slow_ms})
+                    slow += 1
+                    continue
+                path, params = request_for(variant, products, stores, rnd)
+                t0 = time.perf_counter()
+                resp = await client.get(path, params=params)
+                latencies.append((time.perf_counter() - t0) * 1000)
+                assert resp.status_code == 200, (path, resp.status_code, resp.text[:200])
+        await asyncio.gather(*(worker() for _ in range(CONCURRENCY)))
+    await async_engine.dispose()  # pooled aiosqlite connections belong to this event loop
+    latencies.sort()
+    print(f"  {variant:5s}: {len(latencies) / DURATION:7.1f} DB req/s, median {statistics.median(latencies):6.1f} ms, "
+          f"p95 {latencies[int(len(latencies) * 0.95)]:6.1f} ms  ({slow} slow sync calls alongside)")
+
+
+def main():
+    init_schema()  # ASGITransport does not run the lifespan
+    products, stores = seed()
+    for slow_share, slow_ms in SCENARIOS:
+        print(f"{CONCURRENCY} clients, {DURATION:.0f} s per run, {slow_share:.0%} of calls block a thread for {slow_ms} ms")
+        for variant in ('sync', 'async'):
+            asyncio.run(run(variant, products, stores, slow_share, slow_ms))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""
+Benchmark local autocomplete lookups (prefix, short prefix, typo fallback) on a generated catalog.
+Run: python backend/benchmarks/bench_autocomplete.py
+Pure in-memory: builds an AutocompleteIndex directly, no database or OFF needed.
+"""
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.autocomplete import AutocompleteIndex, _Entry  # noqa: E402
+
+CATALOG_SIZE = 50000
+RUNS = 2000
+WORDS = ("Bio Vollkorn Frisch Classic Original Mild Extra Fein Natur Kräuter Tomaten Käse Joghurt Milch "
+         "Brot Wurst Saft Tee Kaffee Schokolade Müsli Nudeln Reis Sauce Creme Quark Salami Schinken").split()
+BRANDS = ("Gut&Günstig ja! Milsani Milbona K-Classic REWE EDEKA Alnatura dmBio Zott Ehrmann Alpro "
+          "Bahlsen Leibniz Haribo Funny-Frisch Lorenz Iglo Frosta Maggi Knorr Hengstenberg Kühne").split()
+QUERIES = {
+    'short prefix': ['mi', 'jo', 'kä', 'sch', 'bio'],
+    'prefix': ['joghu', 'milsani mil', 'schokol', 'hengstenberg', 'kaffee ex'],
+    'typo': ['joghrt', 'schokloade', 'hengstenbreg', 'leibnitz'],
+}
+
+
+def main():
+    rnd = random.Random(7)
+    entries = [
+        _Entry(f"{rnd.choice(BRANDS)} {' '.join(rnd.sample(WORDS, 2))} {rnd.choice([100, 200, 250, 500])} g",
+               popularity=rnd.random() * 10)
+        for _ in range(CATALOG_SIZE)
+    ]
+    t0 = time.perf_counter()
+    index = AutocompleteIndex(entries)
+    print(f"index: {len(entries)} entries, {len(index.keys)} keys, built in {(time.perf_counter() - t0) * 1000:.0f} ms")
+    for label, queries in QUERIES.items():
+        timings = []
+        for i in range(RUNS):
+            q = queries[i % len(queries)]
+            t0 = time.perf_counter()
+            index.suggest(q, 10)
+            timings.append((time.perf_counter() - t0) * 1000)
+        timings.sort()
+        print(f"{label:13s} median {statistics.median(timings):.3f} ms  p95 {timings[int(len(timings) * 0.95)]:.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Benchmark POST /api/v1/basket/optimize with 50 items x 30 stores.
+Run: python backend/benchmarks/bench_basket.py
+Uses a throwaway sqlite DB (BENCH_DATABASE_URL to override).
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+backend_path = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(backend_path))
+os.environ['DATABASE_URL'] = os.getenv(
+    'BENCH_DATABASE_URL', f"sqlite:///{Path(tempfile.mkdtemp()) / 'bench_basket.db'}"
+)
+
+from fastapi.testclient import TestClient  # noqa: E402
+from app.main import app  # noqa: E402
+from app.database import SessionLocal  # noqa: E402
+from app import store_models, product_models, rating_models  # noqa: E402
+
+ITEMS = 50
+STORES = 30
+RUNS = 50
+
+
+def seed():
+    rnd = random.Random(42)
+    db = SessionLocal()
+    items = [f"Bench Produkt {i} 500 g" for i in range(ITEMS)]
+    for s in range(STORES):
+        name = f"BENCH Filiale {s}"
+        db.add(store_models.Store(chain='BENCH', location=f'Filiale {s}', full_name=name,
+                                  latitude=53.70 + rnd.uniform(-0.05, 0.05), longitude=9.38 + rnd.uniform(-0.05, 0.05)))
+        for item in items:
+            r = rnd.random()
+            if r < 0.5:
+                db.add(product_models.ProductLocation(product_identifier=item, store_name=name,
+                                                      current_price=round(rnd.uniform(0.5, 5), 2)))
+            elif r < 0.85:
+                for _ in range(3):
+                    db.add(rating_models.PriceReport(product_identifier=item, store_name=name,
+                                                     reported_price=round(rnd.uniform(0.5, 5), 2), upvotes=rnd.randint(0, 5)))
+    db.commit()
+    db.close()
+    return items
+
+
+def main():
+    with TestClient(app) as client:
+        items = seed()
+        payload = {'product_identifiers': items, 'lat': 53.70, 'lng': 9.38, 'radius_km': 15}
+        client.post('/api/v1/basket/optimize', json=payload)  # warm-up
+        timings = []
+        for _ in range(RUNS):
+            t0 = time.perf_counter()
+            resp = client.post('/api/v1/basket/optimize', json=payload)
+            timings.append((time.perf_counter() - t0) * 1000)
+            assert resp.status_code == 200, resp.text
+        data = resp.json()
+        print(f"{ITEMS} items x {len(data['stores'])} stores, {RUNS} runs")
+        print(f"median {statistics.median(timings):.1f} ms, p95 {sorted(timings)[int(RUNS * 0.95) - 1]:.1f} ms")
+        if data.get('best_split'):
+            print('best split:', data['best_split']['store_names'], data['best_split']['total'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark receipt parsing + product matching on the sample receipts in benchmarks/receipts.
+Run: python backend/benchmarks/bench_receipts.py
+Uses a throwaway sqlite DB (BENCH_DATABASE_URL to override) with the products from
+the receipts plus CATALOG_SIZE generated ones, so matching runs against a realistic index.
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+backend_path = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(backend_path))
+os.environ['DATABASE_URL'] = os.getenv(
+    'BENCH_DATABASE_URL', f"sqlite:///{Path(tempfile.mkdtemp()) / 'bench_receipts.db'}"
+)
+
+from fastapi.testclient import TestClient  # noqa: E402
+from app.main import app  # noqa: E402
+from app.database import SessionLocal  # noqa: E402
+from app import product_models  # noqa: E402
+from app.receipt_parser import ReceiptIndex, parse_receipt  # noqa: E402
+
+CORPUS = Path(__file__).resolve().parent / 'receipts'
+CATALOG_SIZE = 5000
+RUNS = 50
+
+KNOWN_PRODUCTS = [
+    "Weihenstephan H-Milch 1,5% 1 l", "Weihenstephan H-Milch 3,5% 1 l", "Weihenstephan Frische Milch 3,5% 1 l",
+    "Bananen", "ja! Joghurt Natur 500 g", "Müller Milchreis Klassik 200 g", "Harry Sonntagsbrötchen 8 Stück",
+    "Kerrygold Original Irische Butter 250 g", "Gouda jung in Scheiben 400 g", "Bio Eier 10 Stück",
+    "Barilla Spaghetti No. 5 500 g", "Mutti Passata 500 g", "REWE Bio Tomaten 500 g", "Gurke", "Paprika rot",
+    "Coca-Cola 1,5 l", "Gerolsteiner Medium 12 x 1 l", "Nutella 450 g", "Knorr Fix Spaghetti Bolognese",
+    "Dr. Oetker Ristorante Pizza Salame", "Milbona H-Milch 1,5% 1 l", "Milbona Griechischer Joghurt 400 g",
+    "Toastbrötchen", "Deutsche Markenbutter 250 g", "Eier Freilandhaltung 10 Stück", "Combino Spaghetti 500 g",
+    "Freeway Cola 1,5 l", "Saskia Mineralwasser 6 x 1,5 l", "Bellarom Kaffee 500 g", "Rispentomaten",
+    "Paprika Mix 500 g", "Milsani H-Milch 3,5% 1 l", "Milsani Joghurt 3,5% 150 g", "Golden Toast Vollkorn",
+    "Landmark Butter 250 g", "Trauben hell 500 g", "Zwiebeln 2 kg", "Kartoffeln festkochend 2,5 kg",
+    "Cucina Penne 500 g", "Cucina Tomatenmark 200 g", "Rio d'Oro Apfelsaft 1 l", "Moser Roth Schokolade 125 g",
+    "Küchenrolle 4 Rollen", "Gut & Günstig H-Milch 1,5% 1 l", "Andechser Bio Joghurt mild 500 g",
+    "Landliebe Grießbrei 150 g", "Äpfel Elstar", "Harry 1688 Korn an Korn", "Meggle Kräuterbutter 125 g",
+    "Leerdammer Original Scheiben", "EDEKA Bio Eier 6 Stück", "De Cecco Fusilli 500 g",
+    "Original Wagner Steinofen Pizza", "Coca-Cola Zero 1 l", "Volvic Naturelle 1,5 l", "Spüli Zitrone 500 ml",
+    "Tempo Taschentücher 10 x 9",
+]
+WORDS = ("Bio Vollkorn Frisch Classic Original Mild Extra Fein Natur Kräuter Tomaten Käse Joghurt Milch "
+         "Brot Wurst Saft Tee Kaffee Schokolade Müsli Nudeln Reis Sauce Creme Quark Salami Schinken").split()
+BRANDS = ("Gut&Günstig ja! Milsani Milbona K-Classic REWE EDEKA Alnatura dmBio Zott Ehrmann Alpro "
+          "Bahlsen Leibniz Haribo Funny-Frisch Lorenz Iglo Frosta Maggi Knorr Hengstenberg Kühne").split()
+
+
+def seed():
+    rnd = random.Random(7)
+    db = SessionLocal()
+    names = list(KNOWN_PRODUCTS)
+    while len(names) < len(KNOWN_PRODUCTS) + CATALOG_SIZE:
+        names.append(f"{rnd.choice(BRANDS)} {' '.join(rnd.sample(WORDS, 2))} {rnd.choice([100, 150, 200, 250, 400, 500, 1000])} g")
+    for name in dict.fromkeys(names):
+        db.add(product_models.ProductLocation(product_identifier=name, store_name='BENCH Markt'))
+    db.commit()
+    db.close()
+
+
+def main():
+    with TestClient(app) as client:
+        seed()
+        receipts = {p.name: p.read_text(encoding='utf-8').splitlines() for p in sorted(CORPUS.glob('*.txt'))}
+
+        db = SessionLocal()
+        t0 = time.perf_counter()
+        index = ReceiptIndex.from_db(db)
+        print(f"index: {len(index.entries)} products, {len(index.vocabulary)} words, built in {(time.perf_counter() - t0) * 1000:.0f} ms")
+        parse_receipt(db, ['warm up 1,00'])  # builds the cached index
+        for name, lines in receipts.items():
+            timings = []
+            for _ in range(RUNS):
+                t0 = time.perf_counter()
+                parsed = parse_receipt(db, lines)
+                timings.append((time.perf_counter() - t0) * 1000)
+            items = [line for line in parsed if line.kind == 'item']
+            matched = sum(1 for line in items if line.candidates)
+            print(f"{name}: {len(lines)} lines, {len(items)} items, {matched} with candidates, "
+                  f"median {statistics.median(timings):.2f} ms, p95 {sorted(timings)[int(RUNS * 0.95) - 1]:.2f} ms")
+        db.close()
+
+        lines = receipts['rewe.txt']
+        timings = []
+        for _ in range(RUNS):
+            t0 = time.perf_counter()
+            resp = client.post('/api/v1/receipts/parse', json={'lines': lines})
+            timings.append((time.perf_counter() - t0) * 1000)
+            assert resp.status_code == 200, resp.text
+        print(f"POST /api/v1/receipts/parse (rewe.txt): median {statistics.median(timings):.2f} ms")
+        for line in resp.json()['lines']:
+            if line['kind'] == 'item':
+                top = line['candidates'][0]['product_identifier'] if line['candidates'] else '-'
+                print(f"  {line['name']:<24} {line['price']:>6}  -> {top}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""
+Hot GET endpoints with and without the generation-counter response cache (app/response_cache.py).
+Run: python backend/benchmarks/bench_response_cache.py
+Uses throwaway sqlite DBs; each mode runs in its own interpreter (RESPONSE_CACHE is read at import).
+
+Load: CONCURRENCY in-process clients (httpx ASGITransport) for DURATION seconds. Reads pick
+products and stores with a skewed distribution (a few are popular, like real traffic) across
+product_locations, ratings/stats, best_price, stores and donations; WRITE_SHARE of the calls
+post a rating, which makes the ratings/stats entries stale.
+"""
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+backend_path = Path(__file__).resolve().parents[1]
+
+PRODUCTS = 200
+STORES = 20
+CONCURRENCY = 50
+DURATION = 5.0
+WRITE_SHARE = 0.02
+
+
+def seed(SessionLocal, product_models, rating_models, store_models):
+    rnd = random.Random(3)
+    db = SessionLocal()
+    products = [f"Cache Bench Artikel {i}" for i in range(PRODUCTS)]
+    stores = [f"CACHEBENCH Markt {s}" for s in range(STORES)]
+    for s, name in enumerate(stores):
+        db.add(store_models.Store(chain='CACHEBENCH', location=str(s), full_name=name, city='Hamburg',
+                                  latitude=53.55 + s * 0.01, longitude=9.99))
+    for product in products:
+        for name in rnd.sample(stores, 5):
+            db.add(product_models.ProductLocation(product_identifier=product, store_name=name))
+            db.add(rating_models.PriceReport(product_identifier=product, store_name=name,
+                                             reported_price=round(rnd.uniform(0.5, 5), 2)))
+            db.add(rating_models.ProductRating(product_identifier=product, store_name=name, rating=rnd.randint(1, 5)))
+    db.commit()
+    db.close()
+    return products, stores
+
+
+def call(products, stores, rnd):
+    # skewed: index ~ exponential, so the first few products/stores get most of the traffic
+    product = products[min(int(rnd.expovariate(1 / 10)), len(products) - 1)]
+    store = stores[min(int(rnd.expovariate(1 / 3)), len(stores) - 1)]
+    if rnd.random() < WRITE_SHARE:
+        return ('rating (write)', 'POST', '/api/v1/ratings',
+                {'json': {'product_identifier': product, 'store_name': store, 'rating': rnd.randint(1, 5)}})
+    return rnd.choice([
+        ('product_locations', 'GET', '/api/v1/product_locations', {'params': {'store_name': store, 'limit': 50}}),
+        ('ratings/stats', 'GET', '/api/v1/ratings/stats', {'params': {'product_identifier': product}}),
+        ('best_price', 'GET', '/api/v1/price_reports/best_price', {'params': {'product_identifier': product, 'store_name': store}}),
+        ('stores', 'GET', '/stores', {'params': {'chain': 'CACHEBENCH'}}),
+        ('donations', 'GET', '/api/v1/donations', {'params': {'limit': 50}}),
+    ])
+
+
+async def load(app, products, stores):
+    import httpx
+    rnd = random.Random(11)
+    latencies = defaultdict(list)
+    errors = 0
+    deadline = time.perf_counter() + DURATION
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://bench') as client:
+        async def worker():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                name, method, path, kwargs = call(products, stores, rnd)
+                t0 = time.perf_counter()
+                resp = await client.request(method, path, **kwargs)
+                latencies[name].append((time.perf_counter() - t0) * 1000)
+                errors += resp.status_code != 200
+        await asyncio.gather(*(worker() for _ in range(CONCURRENCY)))
+    return latencies, errors
+
+
+def child():
+    sys.path.insert(0, str(backend_path))
+    from app.main import app, init_schema
+    from app.database import SessionLocal, async_engine
+    from app.db_writer import writer
+    from app.response_cache import response_cache
+    from app import product_models, rating_models, store_models
+
+    init_schema()  # ASGITransport does not run the lifespan
+    products, stores = seed(SessionLocal, product_models, rating_models, store_models)
+
+    async def main():
+        try:
+            return await load(app, products, stores)
+        finally:
+            await async_engine.dispose()
+
+    latencies, errors = asyncio.run(main())
+    writer.stop()
+    print(json.dumps({'latencies': latencies, 'errors': errors, 'cache': response_cache.snapshot()}))
+
+
+def report(name, result):
+    latencies = result['latencies']
+    total = sum(len(v) for v in latencies.values())
+    print(f"{name}: {total / DURATION:7.1f} req/s, {result['errors']} errors")
+    routes = result['cache']['routes']
+    paths = {'product_locations': '/api/v1/product_locations', 'ratings/stats': '/api/v1/ratings/stats',
+             'best_price': '/api/v1/price_reports/best_price', 'stores': '/stores', 'donations': '/api/v1/donations'}
+    for op, values in sorted(latencies.items()):
+        values.sort()
+        hits = routes.get(paths.get(op), {}).get('hit_ratio')
+        ratio = f", hit ratio {hits:.0%}" if result['cache']['enabled'] and hits is not None else ''
+        print(f"  {op:18s} {len(values):6d} calls, median {statistics.median(values):6.1f} ms, "
+              f"p95 {values[int(len(values) * 0.95)]:6.1f} ms{ratio}")
+
+
+def main():
+    print(f"{CONCURRENCY} clients, {DURATION:.0f} s, {WRITE_SHARE:.0%} writes")
+    for name, enabled in (('no response cache', '0'), ('response cache', '1')):
+        env = {**os.environ, 'RESPONSE_CACHE': enabled,
+               'DATABASE_URL': f"sqlite:///{Path(tempfile.mkdtemp()) / 'bench_response_cache.db'}"}
+        env.pop('ASYNC_DATABASE_URL', None)
+        env.pop('DATABASE_READ_URL', None)
+        out = subprocess.run([sys.executable, __file__, '--child'], env=env, capture_output=True, text=True)
+        if out.returncode != 0:
+            print(f"{name}: failed\n{out.stderr[-2000:]}")
+            continue
+        report(name, json.loads(out.stdout.strip().splitlines()[-1]))
+
+
+if __name__ == '__main__':
+    child() if '--child' in sys.argv else main()
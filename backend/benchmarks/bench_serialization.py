@@ -0,0 +1,103 @@
+"""
+OFF search responses (50 and 500 transformed products) through the old and the new serialization path.
+Run: python backend/benchmarks/bench_serialization.py
+In-memory: the search result sits in search_cache, so neither OFF nor the database is involved.
+
+before: stdlib JSONResponse, untyped Dict[str, Any] route, products carry the __fairScore/__ecoNumeric/
+        __nutriNumeric/__ethicsNumeric sort helpers (the previous search endpoint)
+after:  products validated against OFFSearchResponse once when cached, sent through orjson, no helpers
+fields: after, with fields=barcode,product_name,brand,image_small_url (list view)
+"""
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.responses import ORJSONResponse  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import openfoodfacts_routes as off  # noqa: E402
+from app.openfoodfacts_schemas import OFFSearchResponse  # noqa: E402
+
+RUNS = 200
+SIZES = (50, 500)
+QUERY = 'benchmilch'
+FIELDS = 'barcode,product_name,brand,image_small_url'
+BRANDS = "Milsani Alnatura Zott Ehrmann Alpro Weihenstephan Landliebe Arla Bärenmarke".split()
+
+
+def raw_product(rnd, i):
+    return {
+        'code': f'40{i:011d}', 'product_name': f'Bench Milch {i}', 'product_name_de': f'Bench Vollmilch {i}',
+        'brands': rnd.choice(BRANDS), 'quantity': rnd.choice(['1 l', '500 ml', '6 x 200 ml']),
+        'image_url': f'https://images.openfoodfacts.org/images/products/{i}/front_de.400.jpg',
+        'image_small_url': f'https://images.openfoodfacts.org/images/products/{i}/front_de.200.jpg',
+        'stores_tags': ['rewe', 'edeka'], 'categories': 'Milchprodukte, Milch, Vollmilch',
+        'categories_tags': ['en:dairies', 'en:milks', 'en:whole-milks'],
+        'nutriscore_grade': rnd.choice('abcde'), 'ecoscore_grade': rnd.choice('abcde'),
+        'ingredients_text_de': 'Vollmilch, 3,5 % Fett, ultrahocherhitzt, homogenisiert.' * 2,
+        'allergens_tags': ['en:milk'], 'labels_tags': ['en:organic', 'de:ohne-gentechnik'],
+        'manufacturing_places': 'Deutschland', 'origins': 'Deutschland',
+    }
+
+
+def legacy_result(products):
+    helpers = []
+    for t in products:
+        t = dict(t)
+        t['__fairScore'] = off.compute_fair_score_for_product(t)
+        t['__ecoNumeric'] = off._grade_score(t.get('ecoscore'))
+        t['__nutriNumeric'] = off._grade_score(t.get('nutriscore'))
+        t['__ethicsNumeric'] = off._ethics_score(t)
+        helpers.append(t)
+    return {'count': len(products), 'page': 1, 'page_size': len(products), 'products': helpers}
+
+
+def measure(client, url, params):
+    timings = []
+    size = 0
+    for _ in range(RUNS):
+        t0 = time.perf_counter()
+        resp = client.get(url, params=params)
+        timings.append((time.perf_counter() - t0) * 1000)
+        size = len(resp.content)
+        assert resp.status_code == 200, resp.text
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95)], size
+
+
+def main():
+    rnd = random.Random(5)
+    for n in SIZES:
+        products = [off.transform_off_product(raw_product(rnd, i)) for i in range(n)]
+        result = OFFSearchResponse.model_validate({'count': n, 'page': 1, 'page_size': n, 'products': products}).model_dump(mode='json')
+        legacy = legacy_result(products)
+        params = {'query': QUERY, 'page_size': n}
+        off.search_cache.set(result, QUERY, 'de', 1, n, 'fair', None)
+
+        before_app = FastAPI()
+
+        @before_app.get('/search')
+        def legacy_search() -> Dict[str, Any]:
+            return legacy
+
+        after_app = FastAPI(default_response_class=ORJSONResponse)
+        after_app.include_router(off.router)
+
+        modes = [
+            ('before', TestClient(before_app), '/search', {}),
+            ('after', TestClient(after_app), '/api/v1/openfoodfacts/search', params),
+            ('fields', TestClient(after_app), '/api/v1/openfoodfacts/search', {**params, 'fields': FIELDS}),
+        ]
+        for label, client, url, p in modes:
+            median, p95, size = measure(client, url, p)
+            print(f"{n:4d} products  {label:7s} median {median:7.2f} ms  p95 {p95:7.2f} ms  {size / 1024:7.1f} KiB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Concurrent small writes on SQLite: one transaction per request (rollback journal, default
+pragmas) vs. the production profile (WAL + single writer with group commit).
+Run: python backend/benchmarks/bench_sqlite_writes.py
+Uses throwaway sqlite DBs.
+
+Load: WRITERS threads each inserting ratings, READERS threads running a product aggregate
+meanwhile. Reports writes/s, failed writes ("database is locked", lost alias races)
+and read latency.
+"""
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+backend_path = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(backend_path))
+tmp = Path(tempfile.mkdtemp())
+os.environ['DATABASE_URL'] = f"sqlite:///{tmp / 'bench_wal.db'}"
+
+from sqlalchemy import create_engine, func  # noqa: E402
+from sqlalchemy.exc import IntegrityError, OperationalError  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from app.database import Base, SessionLocal  # noqa: E402
+from app.db_writer import added, writer  # noqa: E402
+from app import rating_models  # noqa: E402
+from app.main import init_schema  # noqa: E402
+
+WRITERS = 16
+READERS = int(os.getenv('BENCH_READERS', '4'))
+DURATION = 3.0
+
+
+def per_request_commit():
+    # what the endpoints did before: own session, own transaction, default journal mode
+    # (product names differ per run: the alias cache is per process, the databases are not)
+    engine = create_engine(f"sqlite:///{tmp / 'bench_default.db'}", connect_args={'check_same_thread': False, 'timeout': 1})
+    Base.metadata.create_all(bind=engine)
+    sessions = sessionmaker(bind=engine)
+
+    def write(n):
+        db = sessions()
+        try:
+            db.add(rating_models.ProductRating(product_identifier=f"Bench A{n % 50}", store_name='BENCH', rating=3))
+            db.commit()
+        finally:
+            db.close()
+    return write, sessions
+
+
+def single_writer():
+    def write(n):
+        writer.run(lambda db: added(db, rating_models.ProductRating(
+            product_identifier=f"Bench B{n % 50}", store_name='BENCH', rating=3)))
+    return write, SessionLocal
+
+
+def run(name, write, sessions):
+    stop = time.perf_counter() + DURATION
+    counts = {'writes': 0, 'failed': 0}
+    read_ms = []
+    lock = threading.Lock()
+
+    def write_loop(seed):
+        n = seed
+        while time.perf_counter() < stop:
+            try:
+                write(n)
+                key = 'writes'
+            except (OperationalError, IntegrityError):
+                key = 'failed'
+            with lock:
+                counts[key] += 1
+            n += WRITERS
+
+    def read_loop():
+        R = rating_models.ProductRating
+        while time.perf_counter() < stop:
+            db = sessions()
+            t0 = time.perf_counter()
+            try:
+                db.query(R.rating, func.count()).filter(R.store_name == 'BENCH', R.rating == 3).group_by(R.rating).all()
+            finally:
+                db.close()
+            read_ms.append((time.perf_counter() - t0) * 1000)
+
+    threads = [threading.Thread(target=write_loop, args=(i,)) for i in range(WRITERS)]
+    threads += [threading.Thread(target=read_loop) for _ in range(READERS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    read_ms.sort()
+    reads = f", {len(read_ms) / DURATION:6.0f} reads/s, median {statistics.median(read_ms):7.2f} ms, p99 {read_ms[int(len(read_ms) * 0.99)]:7.2f} ms" \
+        if read_ms else ''
+    print(f"  {name:18s}: {counts['writes'] / DURATION:7.0f} writes/s, {counts['failed']:4d} failed{reads}")
+
+
+def main():
+    init_schema()
+    print(f"{WRITERS} writer threads, {READERS} reader threads, {DURATION:.0f} s per run")
+    run('per-request commit', *per_request_commit())
+    run('WAL single writer', *single_writer())
+    print(f"  writer: {writer.snapshot()}")
+    writer.stop()
+
+
+if __name__ == '__main__':
+    main()
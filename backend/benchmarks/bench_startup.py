@@ -0,0 +1,66 @@
+"""
+Worker boot time: what a uvicorn/gunicorn worker (or a test run) pays before its first request.
+Run: python backend/benchmarks/bench_startup.py
+Uses throwaway sqlite DBs.
+
+Each sample is a fresh interpreter, like a new worker, timing
+  import    `import app.main` (module imports + create_app())
+  startup   lifespan startup (schema check, upload dir, shared clients)
+  first     first request (GET /api/v1/signups)
+once against an empty database (first deploy: tables are created) and once against an
+existing one (every later worker spawn).
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+backend_path = Path(__file__).resolve().parents[1]
+RUNS = 7
+
+PROBE = '''
+import json, time
+t0 = time.perf_counter()
+from app.main import app
+t1 = time.perf_counter()
+from fastapi.testclient import TestClient
+client = TestClient(app)
+t2 = time.perf_counter()
+client.__enter__()
+t3 = time.perf_counter()
+assert client.get('/api/v1/signups').status_code == 200
+t4 = time.perf_counter()
+client.__exit__(None, None, None)
+print(json.dumps({'import': t1 - t0, 'startup': t3 - t2, 'first': t4 - t3}))
+'''
+
+
+def sample(db_url):
+    out = subprocess.run([sys.executable, '-c', PROBE], cwd=backend_path, capture_output=True, text=True,
+                         env={**os.environ, 'DATABASE_URL': db_url}, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def report(name, samples):
+    parts = []
+    for key in ('import', 'startup', 'first'):
+        parts.append(f"{key} {statistics.median(s[key] for s in samples) * 1000:6.1f} ms")
+    total = statistics.median(sum(s.values()) for s in samples) * 1000
+    print(f"  {name:14s} {', '.join(parts)}  | boot to first response {total:6.1f} ms")
+
+
+def main():
+    tmp = Path(tempfile.mkdtemp())
+    sample(f"sqlite:///{tmp / 'warmup.db'}")  # fill the bytecode cache
+    print(f"median of {RUNS} fresh interpreters")
+    report('empty database', [sample(f"sqlite:///{tmp / f'empty{i}.db'}") for i in range(RUNS)])
+    existing = f"sqlite:///{tmp / 'existing.db'}"
+    sample(existing)
+    report('existing db', [sample(existing) for _ in range(RUNS)])
+
+
+if __name__ == '__main__':
+    main()
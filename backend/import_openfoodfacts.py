@@ -15,11 +15,14 @@ sys.path.insert(0, str(backend_path))
 
 from app.database import SessionLocal
 from app.product_models import ProductLocation
+from app.product_catalog import product_clause, resolve_product_id
+from app.upstream import LANES, TokenBucket
 import datetime
 
 # Open Food Facts API
 OFF_API_BASE = "https://world.openfoodfacts.org/api/v2"
 OFF_SEARCH = f"{OFF_API_BASE}/search"
+_search_bucket = TokenBucket(LANES['off-search'].per_minute / 60.0, 1)
 
 def search_products(query: str, country: str = "de", page: int = 1, page_size: int = 20) -> Dict[str, Any]:
     """Search products on Open Food Facts"""
@@ -32,6 +35,8 @@ def search_products(query: str, country: str = "de", page: int = 1, page_size: i
     }
     
     try:
+        # OFF allows 10 search requests per minute; the importer is batch traffic and simply waits
+        _search_bucket.wait_blocking()
         response = requests.get(OFF_SEARCH, params=params, timeout=10)
         response.raise_for_status()
         return response.json()
@@ -146,8 +151,9 @@ def import_product_from_off(product: Dict[str, Any], db, store_name: str = None,
         store_name = map_store_name(stores)
     
     # Check if already exists
+    catalog_id = resolve_product_id(db, product_id, barcode=barcode, brand=brand, quantity=quantity)
     existing = db.query(ProductLocation).filter(
-        ProductLocation.product_identifier == product_id,
+        product_clause(db, ProductLocation, product_id),
         ProductLocation.store_name == store_name
     ).first()
     
@@ -157,6 +163,7 @@ def import_product_from_off(product: Dict[str, Any], db, store_name: str = None,
     # Create new product
     new_product = ProductLocation(
         product_identifier=product_id,
+        product_id=catalog_id,
         store_name=store_name,
         aisle=aisle or f"Gang {hash(barcode) % 7 + 1}",  # Random aisle 1-7
         shelf_label=None,
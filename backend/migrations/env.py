@@ -0,0 +1,65 @@
+"""
+Alembic environment: the app's engine and models.
+
+Migrations run on app.database.engine, so SQLite gets the same pragmas (WAL, busy_timeout)
+as the app and a migration never blocks readers. Every revision runs in its own transaction;
+revisions that need to commit in batches or build indexes online use
+op.get_context().autocommit_block() through app.migration_ops.
+"""
+import sys
+from logging.config import fileConfig
+from pathlib import Path
+
+from alembic import context
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import database  # noqa: E402
+from app import models, product_models, donation_models, rating_models, store_models, sync_models  # noqa: E402,F401
+
+config = context.config
+if config.config_file_name and 'connection' not in config.attributes:
+    # command line only: the app (app.schema) keeps its own logging
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+target_metadata = database.Base.metadata
+
+
+def run_migrations_offline() -> None:
+    """Emit SQL instead of running it: alembic upgrade head --sql"""
+    context.configure(
+        url=database.DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        render_as_batch=database.DATABASE_URL.startswith('sqlite'),
+        transaction_per_migration=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    # a caller (app.schema) may hand over its own connection
+    connection = config.attributes.get('connection')
+    if connection is not None:
+        _run(connection)
+        return
+    with database.engine.connect() as connection:
+        _run(connection)
+
+
+def _run(connection) -> None:
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        # SQLite cannot ALTER most things: autogenerate move-and-copy batches there
+        render_as_batch=connection.dialect.name == 'sqlite',
+        transaction_per_migration=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,153 @@
+"""baseline: the tables every deployed database has
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+
+Databases from before versioned migrations already have some or all of these
+tables (create_all), so each one is only created when it is missing. Columns and
+indexes added later live in the following revisions.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.migration_ops import create_table_if_missing
+
+revision: str = '0001'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ('product_ratings', 'price_reports', 'product_locations', 'price_history', 'stores', 'donations', 'signups')
+
+
+def upgrade() -> None:
+    if create_table_if_missing(
+        'signups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=200), nullable=False),
+        sa.Column('email', sa.String(length=200), nullable=False),
+        sa.Column('role', sa.String(length=50), nullable=False),
+        sa.Column('notes', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    ):
+        op.create_index('ix_signups_id', 'signups', ['id'])
+
+    if create_table_if_missing(
+        'donations',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('amount', sa.Float(), nullable=False),
+        sa.Column('currency', sa.String(length=10), nullable=True),
+        sa.Column('donor_name', sa.String(length=200), nullable=True),
+        sa.Column('donor_email', sa.String(length=200), nullable=True),
+        sa.Column('provider', sa.String(length=50), nullable=True),
+        sa.Column('provider_tx', sa.String(length=500), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    ):
+        op.create_index('ix_donations_id', 'donations', ['id'])
+
+    if create_table_if_missing(
+        'stores',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('chain', sa.String(length=100), nullable=False),
+        sa.Column('location', sa.String(length=200), nullable=True),
+        sa.Column('full_name', sa.String(length=300), nullable=False),
+        sa.Column('address', sa.String(length=300), nullable=True),
+        sa.Column('postal_code', sa.String(length=20), nullable=True),
+        sa.Column('city', sa.String(length=100), nullable=True),
+        sa.Column('latitude', sa.Float(), nullable=True),
+        sa.Column('longitude', sa.Float(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    ):
+        op.create_index('ix_stores_id', 'stores', ['id'])
+        op.create_index('ix_stores_chain', 'stores', ['chain'])
+        op.create_index('ix_stores_location', 'stores', ['location'])
+        op.create_index('ix_stores_full_name', 'stores', ['full_name'], unique=True)
+
+    if create_table_if_missing(
+        'price_history',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('product_identifier', sa.String(length=200), nullable=False),
+        sa.Column('store_id', sa.Integer(), nullable=False),
+        sa.Column('store_chain', sa.String(length=100), nullable=False),
+        sa.Column('price', sa.Float(), nullable=False),
+        sa.Column('currency', sa.String(length=10), nullable=True),
+        sa.Column('valid_from', sa.DateTime(), nullable=False),
+        sa.Column('valid_until', sa.DateTime(), nullable=True),
+        sa.Column('source', sa.String(length=50), nullable=True),
+        sa.Column('report_id', sa.Integer(), nullable=True),
+        sa.Column('verified_by', sa.String(length=200), nullable=True),
+        sa.Column('confidence', sa.Float(), nullable=True),
+        sa.Column('upvotes', sa.Integer(), nullable=True),
+        sa.Column('downvotes', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    ):
+        for column in ('id', 'product_identifier', 'store_id', 'store_chain', 'valid_from', 'valid_until', 'created_at'):
+            op.create_index(f'ix_price_history_{column}', 'price_history', [column])
+
+    if create_table_if_missing(
+        'product_locations',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('product_identifier', sa.String(length=200), nullable=False),
+        sa.Column('store_name', sa.String(length=200), nullable=False),
+        sa.Column('aisle', sa.String(length=100), nullable=True),
+        sa.Column('shelf_label', sa.String(length=100), nullable=True),
+        sa.Column('photo_url', sa.String(length=1000), nullable=True),
+        sa.Column('contributor', sa.String(length=200), nullable=True),
+        sa.Column('status', sa.String(length=50), nullable=True),
+        sa.Column('upvotes', sa.Integer(), nullable=True),
+        sa.Column('downvotes', sa.Integer(), nullable=True),
+        sa.Column('verified_by', sa.String(length=200), nullable=True),
+        sa.Column('verified_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('current_price', sa.Float(), nullable=True),
+        sa.Column('price_currency', sa.String(length=10), nullable=True),
+        sa.Column('price_history', sa.JSON(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    ):
+        op.create_index('ix_product_locations_id', 'product_locations', ['id'])
+
+    if create_table_if_missing(
+        'price_reports',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('product_identifier', sa.String(length=200), nullable=False),
+        sa.Column('store_name', sa.String(length=200), nullable=False),
+        sa.Column('reported_price', sa.Float(), nullable=False),
+        sa.Column('size_amount', sa.Float(), nullable=True),
+        sa.Column('size_unit', sa.String(length=20), nullable=True),
+        sa.Column('user_session', sa.String(length=100), nullable=True),
+        sa.Column('upvotes', sa.Integer(), nullable=True),
+        sa.Column('downvotes', sa.Integer(), nullable=True),
+        sa.Column('status', sa.String(length=50), nullable=True),
+        sa.Column('verified_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    ):
+        for column in ('id', 'product_identifier', 'store_name', 'created_at'):
+            op.create_index(f'ix_price_reports_{column}', 'price_reports', [column])
+
+    if create_table_if_missing(
+        'product_ratings',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('product_identifier', sa.String(length=200), nullable=False),
+        sa.Column('store_name', sa.String(length=200), nullable=True),
+        sa.Column('rating', sa.Integer(), nullable=False),
+        sa.Column('comment', sa.String(length=500), nullable=True),
+        sa.Column('user_session', sa.String(length=100), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    ):
+        for column in ('id', 'product_identifier', 'store_name', 'created_at'):
+            op.create_index(f'ix_product_ratings_{column}', 'product_ratings', [column])
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.drop_table(table)
@@ -0,0 +1,44 @@
+"""columns added after the baseline (was fix_sqlite_schema.py / migrate_add_size_fields.py)
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+
+The old scripts added is_regional and confidence_score with a column DEFAULT, which
+rewrote every existing row inside one ALTER. Here the columns are added empty and the
+defaults are filled in batches afterwards.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.migration_ops import add_column_if_missing, backfill_in_batches
+
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    add_column_if_missing('product_locations', sa.Column('size_amount', sa.Float(), nullable=True))
+    add_column_if_missing('product_locations', sa.Column('size_unit', sa.String(length=20), nullable=True))
+    add_column_if_missing('product_locations', sa.Column('is_regional', sa.Integer(), nullable=True))
+    add_column_if_missing('product_locations', sa.Column('availability_notes', sa.Text(), nullable=True))
+    add_column_if_missing('price_reports', sa.Column('photo_url', sa.String(length=500), nullable=True))
+    add_column_if_missing('price_reports', sa.Column('confidence_score', sa.Float(), nullable=True))
+
+    backfill_in_batches('product_locations', 'is_regional = 0', 'is_regional IS NULL')
+    backfill_in_batches('price_reports', 'confidence_score = 0.5', 'confidence_score IS NULL')
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('price_reports') as batch_op:
+        batch_op.drop_column('confidence_score')
+        batch_op.drop_column('photo_url')
+    with op.batch_alter_table('product_locations') as batch_op:
+        batch_op.drop_column('availability_notes')
+        batch_op.drop_column('is_regional')
+        batch_op.drop_column('size_unit')
+        batch_op.drop_column('size_amount')
@@ -0,0 +1,62 @@
+"""canonical product catalog: products, product_aliases and product_id on the hot tables
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+
+product_id stays NULL on existing rows here; 0006 fills it in.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.migration_ops import add_column_if_missing, create_index_online, create_table_if_missing
+
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# price_history.product_id is a plain integer in the model (no foreign key)
+LINKED = ('product_locations', 'price_reports', 'product_ratings')
+
+
+def upgrade() -> None:
+    if create_table_if_missing(
+        'products',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('barcode', sa.String(length=20), nullable=True),
+        sa.Column('normalized_name', sa.String(length=200), nullable=True),
+        sa.Column('display_name', sa.String(length=300), nullable=True),
+        sa.Column('brand', sa.String(length=200), nullable=True),
+        sa.Column('quantity', sa.String(length=100), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('barcode'),
+    ):
+        op.create_index('ix_products_id', 'products', ['id'])
+        op.create_index('ix_products_normalized_name', 'products', ['normalized_name'])
+
+    if create_table_if_missing(
+        'product_aliases',
+        sa.Column('alias', sa.String(length=200), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id']),
+        sa.PrimaryKeyConstraint('alias'),
+    ):
+        op.create_index('ix_product_aliases_product_id', 'product_aliases', ['product_id'])
+
+    for table in LINKED:
+        add_column_if_missing(table, sa.Column('product_id', sa.Integer(), sa.ForeignKey('products.id'), nullable=True))
+    add_column_if_missing('price_history', sa.Column('product_id', sa.Integer(), nullable=True))
+    create_index_online('ix_price_history_product_id', 'price_history', ['product_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_price_history_product_id', table_name='price_history')
+    for table in LINKED + ('price_history',):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('product_id')
+    op.drop_table('product_aliases')
+    op.drop_table('products')
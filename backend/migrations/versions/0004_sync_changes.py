@@ -0,0 +1,37 @@
+"""change log for delta sync
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.migration_ops import create_table_if_missing
+
+revision: str = '0004'
+down_revision: Union[str, Sequence[str], None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if create_table_if_missing(
+        'sync_changes',
+        sa.Column('seq', sa.Integer(), nullable=False),
+        sa.Column('entity', sa.String(length=30), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=True),
+        sa.Column('product_identifier', sa.String(length=200), nullable=True),
+        sa.Column('store_name', sa.String(length=200), nullable=True),
+        sa.Column('op', sa.String(length=10), nullable=False),
+        sa.Column('changed_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('seq'),
+        sqlite_autoincrement=True,
+    ):
+        op.create_index('ix_sync_changes_changed_at', 'sync_changes', ['changed_at'])
+
+
+def downgrade() -> None:
+    op.drop_table('sync_changes')
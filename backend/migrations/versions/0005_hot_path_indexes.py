@@ -0,0 +1,37 @@
+"""composite indexes for the hot read paths, built online
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19
+
+PostgreSQL builds them with CREATE INDEX CONCURRENTLY, so the tables stay writable
+while a large one is indexed.
+"""
+from typing import Sequence, Union
+
+from app.migration_ops import create_index_online, drop_index_online
+
+revision: str = '0005'
+down_revision: Union[str, Sequence[str], None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ('ix_stores_lat_lng', 'stores', ['latitude', 'longitude']),
+    ('ix_product_locations_product_store', 'product_locations', ['product_identifier', 'store_name']),
+    ('ix_product_locations_created_id', 'product_locations', ['created_at', 'id']),
+    ('ix_product_locations_store_created_id', 'product_locations', ['store_name', 'created_at', 'id']),
+    ('ix_product_locations_pid_store', 'product_locations', ['product_id', 'store_name']),
+    ('ix_price_reports_pid_store_created', 'price_reports', ['product_id', 'store_name', 'created_at']),
+    ('ix_product_ratings_pid_store', 'product_ratings', ['product_id', 'store_name']),
+]
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        create_index_online(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        drop_index_online(name, table)
@@ -0,0 +1,41 @@
+"""fill product_id on rows written before the catalog existed (was backfill_products.py)
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19
+
+Identifiers are resolved by the catalog code (normalization, aliases), so this runs
+through app.product_catalog rather than one UPDATE. Outside the migration transaction,
+committed per batch: the app keeps writing in between, and an interrupted run picks up
+where it stopped (only rows with product_id NULL are touched).
+"""
+import os
+from typing import Sequence, Union
+
+from alembic import op
+from sqlalchemy.orm import Session
+
+from app.product_catalog import backfill_product_ids
+
+revision: str = '0006'
+down_revision: Union[str, Sequence[str], None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = int(os.getenv('BACKFILL_BATCH_SIZE', '500'))
+
+
+def upgrade() -> None:
+    if op.get_context().as_sql:
+        print('-- 0006: product_id backfill needs a live database, run `alembic upgrade head` without --sql')
+        return
+    with op.get_context().autocommit_block():
+        session = Session(bind=op.get_bind())
+        try:
+            backfill_product_ids(session, batch_size=BATCH_SIZE)
+        finally:
+            session.close()
+
+
+def downgrade() -> None:
+    pass
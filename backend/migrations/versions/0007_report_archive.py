@@ -0,0 +1,76 @@
+"""archive tables for price_reports and product_ratings (app/archive.py)
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.migration_ops import create_table_if_missing
+
+revision: str = '0007'
+down_revision: Union[str, Sequence[str], None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if create_table_if_missing(
+        'price_reports_archive',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('product_identifier', sa.String(length=200), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=True),
+        sa.Column('store_name', sa.String(length=200), nullable=False),
+        sa.Column('reported_price', sa.Float(), nullable=False),
+        sa.Column('size_amount', sa.Float(), nullable=True),
+        sa.Column('size_unit', sa.String(length=20), nullable=True),
+        sa.Column('user_session', sa.String(length=100), nullable=True),
+        sa.Column('upvotes', sa.Integer(), nullable=True),
+        sa.Column('downvotes', sa.Integer(), nullable=True),
+        sa.Column('status', sa.String(length=50), nullable=True),
+        sa.Column('verified_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('photo_url', sa.String(length=500), nullable=True),
+        sa.Column('confidence_score', sa.Float(), nullable=True),
+        sa.Column('archived_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    ):
+        op.create_index('ix_price_reports_archive_pid_store_created', 'price_reports_archive',
+                        ['product_id', 'store_name', 'created_at'])
+
+    if create_table_if_missing(
+        'product_ratings_archive',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('product_identifier', sa.String(length=200), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=True),
+        sa.Column('store_name', sa.String(length=200), nullable=True),
+        sa.Column('rating', sa.Integer(), nullable=False),
+        sa.Column('comment', sa.String(length=500), nullable=True),
+        sa.Column('user_session', sa.String(length=100), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('archived_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    ):
+        op.create_index('ix_product_ratings_archive_pid_store_created', 'product_ratings_archive',
+                        ['product_id', 'store_name', 'created_at'])
+
+    if create_table_if_missing(
+        'archived_rating_counts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('product_identifier', sa.String(length=200), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=True),
+        sa.Column('store_name', sa.String(length=200), nullable=True),
+        sa.Column('rating', sa.Integer(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    ):
+        op.create_index('ix_archived_rating_counts_pid_store', 'archived_rating_counts', ['product_id', 'store_name'])
+
+
+def downgrade() -> None:
+    op.drop_table('archived_rating_counts')
+    op.drop_table('product_ratings_archive')
+    op.drop_table('price_reports_archive')
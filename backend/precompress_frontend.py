@@ -0,0 +1,68 @@
+"""
+Write .br/.gz siblings for the compressible files under frontend/ (app/compression.py).
+Run after changing frontend files and before deploying: python backend/precompress_frontend.py [frontend_dir]
+Only stale or missing siblings are rewritten; siblings of deleted files are removed.
+.br needs the optional brotli package (gzip only without it).
+"""
+import mimetypes
+import os
+import sys
+from pathlib import Path
+
+# Add backend to path
+backend_path = Path(__file__).resolve().parent
+sys.path.insert(0, str(backend_path))
+
+from app.compression import MIN_BYTES, STATIC_LEVELS, SUFFIXES, available_encodings, compress, compressible
+
+FRONTEND_DIR = backend_path.parent / 'frontend'
+
+
+def precompress(root: Path, progress=print) -> dict:
+    totals = {'files': 0, 'written': 0, 'removed': 0, 'bytes': 0, **{encoding: 0 for encoding in available_encodings()}}
+    sibling_suffixes = tuple(SUFFIXES.values())
+    for path in sorted(p for p in root.rglob('*') if p.is_file()):
+        if path.name.endswith(sibling_suffixes):
+            if not path.with_suffix('').exists():
+                path.unlink()
+                totals['removed'] += 1
+            continue
+        if not compressible(mimetypes.guess_type(path.name)[0]):
+            continue
+        size = path.stat().st_size
+        if size < MIN_BYTES:
+            continue
+        totals['files'] += 1
+        totals['bytes'] += size
+        data = None
+        for encoding in available_encodings():
+            sibling = path.with_name(path.name + SUFFIXES[encoding])
+            if sibling.exists() and sibling.stat().st_mtime >= path.stat().st_mtime:
+                totals[encoding] += sibling.stat().st_size
+                continue
+            data = path.read_bytes() if data is None else data
+            encoded = compress(data, encoding, STATIC_LEVELS[encoding])
+            if len(encoded) >= size:
+                # no gain: serve the file itself
+                sibling.unlink(missing_ok=True)
+                totals[encoding] += size
+                continue
+            tmp = sibling.with_name(sibling.name + '.tmp')
+            tmp.write_bytes(encoded)
+            os.replace(tmp, sibling)
+            totals['written'] += 1
+            totals[encoding] += len(encoded)
+            progress(f"{path.relative_to(root)}{SUFFIXES[encoding]}: {size} -> {len(encoded)} bytes")
+    return totals
+
+
+def main():
+    root = Path(sys.argv[1]) if len(sys.argv) > 1 else FRONTEND_DIR
+    totals = precompress(root)
+    sizes = ', '.join(f"{encoding} {totals[encoding] / 1024:.0f} KiB" for encoding in available_encodings())
+    print(f"✅ {totals['files']} files ({totals['bytes'] / 1024:.0f} KiB): {sizes}; "
+          f"{totals['written']} siblings written, {totals['removed']} removed")
+
+
+if __name__ == '__main__':
+    main()
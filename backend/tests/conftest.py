@@ -0,0 +1,14 @@
+import os
+import sys
+
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from fastapi.testclient import TestClient
+from app.main import app
+
+
+@pytest.fixture(scope='session', autouse=True)
+def app_lifespan():
+    """Schema, upload dir and shared clients for the module-level clients of the test files"""
+    with TestClient(app):
+        yield
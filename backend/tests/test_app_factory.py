@@ -0,0 +1,32 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+backend_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def test_import_is_side_effect_free_and_lifespan_sets_up_and_tears_down(tmp_path):
+    db = tmp_path / 'factory.db'
+    script = textwrap.dedent('''
+        import os
+        from sqlalchemy import inspect
+        from fastapi.testclient import TestClient
+        from app import http_clients
+        from app.database import engine
+        from app.main import app, create_app
+
+        assert not inspect(engine).get_table_names(), 'tables created at import'
+        assert create_app() is not app
+        with TestClient(app) as client:
+            tables = set(inspect(engine).get_table_names())
+            assert {'signups', 'product_locations', 'price_reports', 'stores', 'sync_changes'} <= tables, tables
+            assert http_clients._loop is not None
+            assert client.get('/api/v1/signups').status_code == 200
+        assert http_clients._loop is None and not http_clients._clients
+        print('ok')
+    ''')
+    result = subprocess.run([sys.executable, '-c', script], cwd=backend_path, capture_output=True, text=True,
+                            env={**os.environ, 'DATABASE_URL': f"sqlite:///{db}"}, timeout=120)
+    assert result.returncode == 0, result.stderr[-2000:]
+    assert result.stdout.strip().endswith('ok')
@@ -0,0 +1,60 @@
+import datetime
+import os
+import sys
+import uuid
+# ensure backend package is on path for tests
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from fastapi.testclient import TestClient
+from app.main import app
+from app.database import SessionLocal
+from app import rating_models
+from app.archive import archive_cold_rows
+
+client = TestClient(app)
+
+
+def test_cold_reports_and_ratings_move_to_the_archive():
+    suffix = uuid.uuid4().hex[:8]
+    product, store = f'Archiv Kaffee {suffix} 500g', f'Archiv Markt {suffix}'
+    now = datetime.datetime.utcnow()
+    db = SessionLocal()
+    try:
+        for days in range(90, 98):
+            db.add(rating_models.PriceReport(product_identifier=product, store_name=store, reported_price=5.99,
+                                             created_at=now - datetime.timedelta(days=days)))
+        db.add(rating_models.PriceReport(product_identifier=product, store_name=store, reported_price=6.49, created_at=now))
+        rejected = rating_models.PriceReport(product_identifier=product, store_name=store, reported_price=0.99,
+                                             status='rejected', created_at=now)
+        db.add(rejected)
+        for stars in (5, 4, 4):
+            db.add(rating_models.ProductRating(product_identifier=product, store_name=store, rating=stars,
+                                               created_at=now - datetime.timedelta(days=400)))
+        db.add(rating_models.ProductRating(product_identifier=product, store_name=store, rating=2, created_at=now))
+        db.commit()
+        rejected_id = rejected.id
+    finally:
+        db.close()
+
+    stats_before = client.get('/api/v1/ratings/stats', params={'product_identifier': product, 'store_name': store}).json()
+    assert stats_before['total_ratings'] == 4
+
+    totals = archive_cold_rows(progress=lambda msg: None)
+    assert totals['price_reports'] >= 5 and totals['product_ratings'] >= 3
+
+    # the newest 5 non-rejected reports stay for the plausibility check, however old
+    hot = client.get('/api/v1/price_reports', params={'product_identifier': product, 'store_name': store}).json()
+    assert len(hot) == 5 and all(r['status'] != 'rejected' for r in hot)
+    archived = client.get('/api/v1/price_reports', params={
+        'product_identifier': product, 'store_name': store, 'archived': True}).json()
+    assert len(archived) == 5 and rejected_id in {r['id'] for r in archived}
+    assert client.post(f'/api/v1/price_reports/{rejected_id}/vote', json={'vote': 'up'}).status_code == 410
+
+    ratings = client.get('/api/v1/ratings', params={'product_identifier': product, 'store_name': store}).json()
+    assert [r['rating'] for r in ratings] == [2]
+    stats_after = client.get('/api/v1/ratings/stats', params={'product_identifier': product, 'store_name': store}).json()
+    assert stats_after == stats_before
+    summaries = client.get('/api/v1/sync').json()['rating_summaries']
+    assert {'product_identifier': product, 'store_name': store, 'average_rating': 3.75, 'total_ratings': 4,
+            'rating_distribution': {'1': 0, '2': 1, '3': 0, '4': 2, '5': 1}} in summaries
+
+    assert archive_cold_rows(progress=lambda msg: None) == {'price_reports': 0, 'product_ratings': 0}
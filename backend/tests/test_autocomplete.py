@@ -0,0 +1,50 @@
+import os
+import sys
+import uuid
+# ensure backend package is on path for tests
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from fastapi.testclient import TestClient
+from app.main import app
+from app import autocomplete
+from app.autocomplete import AutocompleteIndex, _Entry
+
+client = TestClient(app)
+
+
+def _displays(results):
+    return [r['display'] for r in results]
+
+
+def test_prefix_word_start_and_popularity():
+    index = AutocompleteIndex([
+        _Entry('Weihenstephan H-Milch 1,5%', popularity=5),
+        _Entry('Milchreis Klassik', popularity=1),
+        _Entry('Müller Milchreis', popularity=3),
+        _Entry('Hafermilch Barista', popularity=9),
+    ])
+    # any word may start the match, more popular first; "hafermilch" does not start with "milch"
+    assert _displays(index.suggest('milch', 10)) == ['Weihenstephan H-Milch 1,5%', 'Müller Milchreis', 'Milchreis Klassik']
+    assert _displays(index.suggest('mül', 10)) == ['Müller Milchreis']
+    assert _displays(index.suggest('Weihenstephan h', 10)) == ['Weihenstephan H-Milch 1,5%']
+
+
+def test_typo_tolerance_only_fills_up():
+    index = AutocompleteIndex([_Entry('Joghurt Natur', popularity=2), _Entry('Jogurt Griechisch', popularity=1)])
+    assert _displays(index.suggest('joghrt', 10)) == ['Joghurt Natur', 'Jogurt Griechisch']
+    assert _displays(index.suggest('natru', 10)) == ['Joghurt Natur']
+    # exact prefix hits come before edit-distance-1 hits
+    assert _displays(index.suggest('jogurt', 10)) == ['Jogurt Griechisch', 'Joghurt Natur']
+
+
+def test_endpoint_answers_locally_without_off(monkeypatch):
+    name = f'Zwetschgenmus{uuid.uuid4().hex[:8]} 450 g'
+    assert client.post('/api/v1/product_locations', json={'product_identifier': name, 'store_name': 'AC Markt'}).status_code == 200
+    monkeypatch.setattr(autocomplete, '_index', None)
+
+    async def offline(*args, **kwargs):
+        raise AssertionError('OFF must not be queried when the local index fills the list')
+    monkeypatch.setattr('app.openfoodfacts_routes.http_get_with_retry', offline)
+
+    resp = client.get('/api/v1/openfoodfacts/autocomplete', params={'query': name[:16], 'limit': 1})
+    assert resp.status_code == 200
+    assert resp.json() == [{'barcode': None, 'display': name, 'image_url': None, 'source': 'local'}]
@@ -0,0 +1,58 @@
+import os
+import sys
+import uuid
+# ensure backend package is on path for tests
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from fastapi.testclient import TestClient
+from app.main import app
+
+client = TestClient(app)
+
+
+def test_basket_totals_coverage_and_split():
+    suffix = uuid.uuid4().hex[:8]
+    # far away from every other test store so the radius only sees these two
+    store_a = {'chain': 'A', 'full_name': f'A Insel {suffix}', 'latitude': 54.90, 'longitude': 8.30}
+    store_b = {'chain': 'B', 'full_name': f'B Insel {suffix}', 'latitude': 54.91, 'longitude': 8.31}
+    for s in (store_a, store_b):
+        assert client.post('/stores', json=s).status_code == 200
+
+    milk, bread, cheese = (f'{name} {suffix}' for name in ('Milch', 'Brot', 'Käse'))
+    locations = [
+        (milk, store_a, 1.00), (bread, store_a, 3.00),
+        (milk, store_b, 1.50), (bread, store_b, 2.00), (cheese, store_b, 4.00),
+    ]
+    for product, store, price in locations:
+        resp = client.post('/api/v1/product_locations', json={
+            'product_identifier': product, 'store_name': store['full_name'], 'current_price': price,
+        })
+        assert resp.status_code == 200
+    # community report only counts where no stored price exists
+    resp = client.post('/api/v1/price_reports', json={
+        'product_identifier': cheese, 'store_name': store_a['full_name'], 'reported_price': 5.00,
+    })
+    assert resp.status_code == 200
+
+    resp = client.post('/api/v1/basket/optimize', json={
+        'product_identifiers': [milk, bread, cheese, f'Unbekannt {suffix}'],
+        'lat': 54.905, 'lng': 8.305, 'radius_km': 5,
+    })
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data['items'] == 4
+    by_name = {s['store_name']: s for s in data['stores']}
+    assert by_name[store_a['full_name']]['total'] == 9.00
+    assert by_name[store_b['full_name']]['total'] == 7.50
+    assert by_name[store_b['full_name']]['coverage'] == 0.75
+    assert data['stores'][0]['store_name'] == store_b['full_name']
+
+    split = data['best_split']
+    assert split['total'] == 7.00
+    assert split['assignment'][store_a['full_name']] == [milk]
+    assert split['missing'] == [f'Unbekannt {suffix}']
+    assert split['savings_vs_best_single'] == 0.50
+
+
+def test_basket_requires_location():
+    resp = client.post('/api/v1/basket/optimize', json={'product_identifiers': ['x']})
+    assert resp.status_code == 400
@@ -0,0 +1,82 @@
+import os
+import sys
+# ensure backend package is on path for tests
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
+from fastapi.testclient import TestClient
+from app.main import app
+from app.compression import CompressionMiddleware, PrecompressedStaticFiles, accepted_encodings
+from precompress_frontend import precompress
+
+client = TestClient(app)
+
+
+def test_accepted_encodings():
+    assert 'gzip' in accepted_encodings('gzip, deflate, br')
+    assert accepted_encodings('gzip;q=0, identity') == []
+    assert accepted_encodings('') == []
+
+
+def test_json_is_compressed_above_threshold():
+    resp = client.get('/openapi.json', headers={'Accept-Encoding': 'gzip'})
+    assert resp.status_code == 200 and resp.headers['content-encoding'] in ('gzip', 'br')
+    assert 'accept-encoding' in resp.headers['vary'].lower()
+    assert resp.json()['info']['title'] == 'WirkaufenFair API'
+
+    plain = client.get('/openapi.json', headers={'Accept-Encoding': 'identity'})
+    assert 'content-encoding' not in plain.headers and plain.json() == resp.json()
+
+    small = client.get('/api/v1/response_cache/stats', headers={'Accept-Encoding': 'gzip'})
+    assert 'content-encoding' not in small.headers
+
+
+def test_compressed_etag_is_weak_and_still_revalidates():
+    mini = FastAPI()
+
+    @mini.get('/big')
+    def big():
+        return JSONResponse({'items': ['Hafermilch'] * 500}, headers={'ETag': '"v1"'})
+
+    @mini.get('/text')
+    def text():
+        return PlainTextResponse('Brot ' * 500, headers={'Content-Encoding': 'identity'})
+
+    mini.add_middleware(CompressionMiddleware)
+    c = TestClient(mini)
+    resp = c.get('/big', headers={'Accept-Encoding': 'gzip'})
+    assert resp.headers['content-encoding'] == 'gzip' and resp.headers['etag'] == 'W/"v1"'
+    assert int(resp.headers['content-length']) < 1000
+    # bodies that already carry an encoding are left alone
+    assert c.get('/text', headers={'Accept-Encoding': 'gzip'}).headers['content-encoding'] == 'identity'
+
+
+def test_static_files_serve_precompressed_siblings(tmp_path):
+    script = 'function add(a, b) { return a + b; }\n' * 200
+    (tmp_path / 'app.js').write_text(script)
+    (tmp_path / 'logo.png').write_bytes(b'\x89PNG' + b'\0' * 4000)
+    totals = precompress(tmp_path, progress=lambda msg: None)
+    assert totals['files'] == 1 and (tmp_path / 'app.js.gz').exists()
+    assert not (tmp_path / 'logo.png.gz').exists()
+
+    mini = FastAPI()
+    mini.mount('/static', PrecompressedStaticFiles(directory=str(tmp_path)), name='static')
+    mini.add_middleware(CompressionMiddleware)
+    c = TestClient(mini)
+    resp = c.get('/static/app.js', headers={'Accept-Encoding': 'gzip'})
+    assert resp.headers['content-encoding'] == 'gzip'
+    assert int(resp.headers['content-length']) == (tmp_path / 'app.js.gz').stat().st_size
+    assert resp.text == script
+    assert c.get('/static/app.js', headers={'Accept-Encoding': 'gzip', 'If-None-Match': resp.headers['etag']}).status_code == 304
+
+    plain = c.get('/static/app.js', headers={'Accept-Encoding': 'identity'})
+    assert 'content-encoding' not in plain.headers and plain.text == script
+    assert plain.headers['vary'] == 'Accept-Encoding'
+
+    # a stale sibling is ignored until the next precompress run
+    (tmp_path / 'app.js').write_text(script + '// changed\n')
+    os.utime(tmp_path / 'app.js.gz', (0, 0))
+    stale = c.get('/static/app.js', headers={'Accept-Encoding': 'gzip'})
+    assert 'content-encoding' not in stale.headers and stale.text.endswith('// changed\n')
+    (tmp_path / 'app.js').unlink()
+    assert precompress(tmp_path, progress=lambda msg: None)['removed'] == 1
@@ -0,0 +1,114 @@
+import os
+import subprocess
+import sys
+import textwrap
+import uuid
+
+import pytest
+backend_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, backend_path)
+from app.database import (async_url, engine, normalize_url, pool_options, read_engine, read_only_connect_args,
+                          DATABASE_READ_URL)
+
+
+def run_app_script(script: str, **env) -> subprocess.CompletedProcess:
+    """Engines are created at import, so other database settings need a fresh interpreter"""
+    return subprocess.run(
+        [sys.executable, '-c', textwrap.dedent(script)],
+        cwd=backend_path, env={**os.environ, **env}, capture_output=True, text=True, timeout=120,
+    )
+
+
+def test_postgres_urls_and_pool_settings():
+    assert normalize_url('postgres://u:p@db:5432/wkf') == 'postgresql://u:p@db:5432/wkf'
+    assert async_url('postgresql+psycopg2://u:p@db/wkf') == 'postgresql+asyncpg://u:p@db/wkf'
+    pool = pool_options('postgresql://u:p@db/wkf')
+    assert pool['pool_size'] + pool['max_overflow'] < 40  # below the AnyIO threadpool
+    assert pool['pool_recycle'] and pool['pool_use_lifo']
+    assert pool_options('sqlite://') == {}
+    assert read_only_connect_args('postgresql+psycopg2://u:p@replica/wkf') == {
+        'options': '-c default_transaction_read_only=on'}
+
+
+@pytest.mark.skipif(bool(DATABASE_READ_URL), reason='read replica configured for this run')
+def test_read_sessions_use_the_primary_by_default():
+    assert read_engine is engine
+
+
+def test_read_routes_go_to_the_read_database(tmp_path):
+    result = run_app_script('''
+        from fastapi.testclient import TestClient
+        from app.main import app
+        from app.database import Base, engine, read_engine
+        assert read_engine is not engine
+        Base.metadata.create_all(bind=read_engine)
+        with TestClient(app) as client:
+            r = client.post('/api/v1/signup', json={'name': 'Primary', 'email': 'p@example.org', 'role': 'shopper'})
+            assert r.status_code == 200, r.text
+            # written to the primary, listed from the (empty) replica
+            assert client.get('/api/v1/signups').json() == []
+            assert client.get('/api/v1/sync').json()['next_token'] == '0'
+            print('ok')
+    ''', DATABASE_URL=f"sqlite:///{tmp_path / 'primary.db'}", DATABASE_READ_URL=f"sqlite:///{tmp_path / 'replica.db'}")
+    assert result.returncode == 0, result.stderr[-2000:]
+    assert result.stdout.strip().endswith('ok')
+
+
+@pytest.mark.skipif(not os.getenv('TEST_POSTGRES_URL'), reason='set TEST_POSTGRES_URL (see README_DB.md)')
+def test_postgres_smoke():
+    product = f"PG Smoke {uuid.uuid4().hex[:8]}"
+    result = run_app_script(f'''
+        from fastapi.testclient import TestClient
+        from app.main import app
+        with TestClient(app) as client:
+            token = client.get('/api/v1/sync').json()['next_token']
+            r = client.post('/api/v1/price_reports', json={{
+                'product_identifier': {product!r}, 'store_name': 'PG Markt', 'reported_price': 2.49}})
+            assert r.status_code == 200, r.text
+            assert client.post(f"/api/v1/price_reports/{{r.json()['id']}}/vote", json={{'vote': 'up'}}).status_code == 200
+            assert client.post('/api/v1/ratings', json={{
+                'product_identifier': {product!r}, 'store_name': 'PG Markt', 'rating': 5}}).status_code == 200
+            stats = client.get('/api/v1/ratings/stats', params={{'product_identifier': {product!r}}}).json()
+            assert stats['total_ratings'] == 1, stats
+            best = client.get('/api/v1/price_reports/best_price', params={{
+                'product_identifier': {product!r}, 'store_name': 'PG Markt'}}).json()
+            assert best['price'] == 2.49, best
+            delta = client.get('/api/v1/sync', params={{'since': token}}).json()
+            assert any(s['product_identifier'] == {product!r} for s in delta['rating_summaries'])
+            print('ok')
+    ''', DATABASE_URL=os.environ['TEST_POSTGRES_URL'])
+    assert result.returncode == 0, result.stderr[-2000:]
+    assert result.stdout.strip().endswith('ok')
+
+
+@pytest.mark.skipif(not os.getenv('TEST_POSTGRES_URL'), reason='set TEST_POSTGRES_URL (see README_DB.md)')
+def test_postgres_sync_seqs_commit_in_order():
+    product = f"PG Reihenfolge {uuid.uuid4().hex[:8]}"
+    result = run_app_script(f'''
+        import threading
+        from fastapi.testclient import TestClient
+        from app.main import app
+        from app.database import SessionLocal
+        from app.product_models import ProductLocation
+        with TestClient(app):
+            first, second = SessionLocal(), SessionLocal()
+            first.add(ProductLocation(product_identifier={product!r} + ' 1', store_name='PG Markt'))
+            first.flush()  # holds the lower seq, not committed yet
+            committed = threading.Event()
+
+            def write_second():
+                second.add(ProductLocation(product_identifier={product!r} + ' 2', store_name='PG Markt'))
+                second.commit()
+                committed.set()
+
+            writer = threading.Thread(target=write_second)
+            writer.start()
+            # a higher seq must not become visible (and end up in a sync token) before the lower one
+            assert not committed.wait(1.0)
+            first.commit()
+            writer.join(10)
+            assert committed.is_set()
+            print('ok')
+    ''', DATABASE_URL=os.environ['TEST_POSTGRES_URL'])
+    assert result.returncode == 0, result.stderr[-2000:]
+    assert result.stdout.strip().endswith('ok')
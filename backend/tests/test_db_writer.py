@@ -0,0 +1,108 @@
+import os
+import sys
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from app.main import app
+from app.database import SessionLocal, SQLITE_PRODUCTION
+from app.db_writer import SingleWriter, added, writer
+from app import rating_models
+from app.product_catalog import lookup_product_id
+
+client = TestClient(app)
+
+pytestmark = pytest.mark.skipif(not SQLITE_PRODUCTION, reason='needs the sqlite file profile')
+
+
+def test_read_connections_use_wal():
+    db = SessionLocal()
+    try:
+        assert db.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+        assert db.execute(text('PRAGMA synchronous')).scalar() == 1  # NORMAL
+        assert db.execute(text('PRAGMA busy_timeout')).scalar() >= 1000
+    finally:
+        db.close()
+
+
+def test_concurrent_votes_are_not_lost():
+    product = f"Writer Test {uuid.uuid4().hex[:8]}"
+    r = client.post('/api/v1/price_reports', json={
+        'product_identifier': product, 'store_name': 'REWE Writer', 'reported_price': 1.99})
+    assert r.status_code == 200
+    report_id = r.json()['id']
+
+    def vote(_):
+        return client.post(f'/api/v1/price_reports/{report_id}/vote', json={'vote': 'down'}).status_code
+
+    with ThreadPoolExecutor(8) as pool:
+        assert set(pool.map(vote, range(40))) == {200}
+    db = SessionLocal()
+    try:
+        assert db.get(rating_models.PriceReport, report_id).downvotes == 40
+    finally:
+        db.close()
+
+
+def test_concurrent_off_selections_create_one_location():
+    product = f"Writer OFF {uuid.uuid4().hex[:8]}"
+
+    def select(_):
+        r = client.post('/api/v1/product_locations/from_off', json={'product_identifier': product, 'store_name': 'REWE Writer'})
+        assert r.status_code == 200
+        return r.json()['id']
+
+    with ThreadPoolExecutor(8) as pool:
+        assert len(set(pool.map(select, range(16)))) == 1
+
+
+def test_queued_jobs_commit_as_one_batch_and_failures_stay_isolated():
+    w = SingleWriter()
+    gate = threading.Event()
+    product = f"Writer Batch {uuid.uuid4().hex[:8]}"
+
+    def blocker(db):
+        gate.wait(5)
+
+    def insert(n):
+        return lambda db: added(db, rating_models.ProductRating(
+            product_identifier=f"{product} {n}", store_name='EDEKA Writer', rating=4))
+
+    def broken(db):
+        # new product + alias are written, then the job fails: nothing of it may survive the batch
+        added(db, rating_models.ProductRating(product_identifier=f"{product} broken", store_name='x', rating=1))
+        raise ValueError('bad row')
+
+    first = w._enqueue(blocker)
+    futures = [w._enqueue(insert(n)) for n in range(10)]
+    failing = w._enqueue(broken)
+    futures += [w._enqueue(insert(n)) for n in range(10, 15)]
+    gate.set()
+
+    assert first.result(5) is None
+    rows = [f.result(5) for f in futures]
+    with pytest.raises(ValueError):
+        failing.result(5)
+    w.stop()
+
+    assert len({r.id for r in rows}) == 15
+    # everything queued behind the blocker shared one commit (the blocker may have been alone)
+    assert w.stats['jobs'] == 17 and w.stats['batches'] <= 2 and w.stats['max_batch'] >= 16
+    assert w.stats['failed'] == 1
+    db = SessionLocal()
+    try:
+        stored = db.query(rating_models.ProductRating).filter(
+            rating_models.ProductRating.product_identifier.like(f"{product}%")).count()
+        assert stored == 15
+        assert lookup_product_id(db, f"{product} broken") is None
+    finally:
+        db.close()
+
+
+def test_writer_restarts_after_stop():
+    writer.stop()
+    assert writer.run(lambda db: db.execute(text('SELECT 1')).scalar()) == 1
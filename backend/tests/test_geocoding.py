@@ -0,0 +1,55 @@
+import os
+import sys
+import uuid
+# ensure backend package is on path for tests
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from fastapi.testclient import TestClient
+from app.main import app
+from app.geocoding import PostalIndex, resolve_location
+
+client = TestClient(app)
+
+
+def test_resolve_postal_code_and_place_names():
+    exact = resolve_location(postal_code='21706')
+    assert exact.place == 'Drochtersen'
+    # unknown code inside a known area falls back to the 3-digit prefix
+    assert resolve_location(postal_code='21799') is not None
+    # umlaut folding, prefix and typo tolerance
+    assert resolve_location(city='Muenchen').place == 'München'
+    assert resolve_location(city='frankfurt').place == 'Frankfurt am Main'
+    assert resolve_location(city='hambrug').place == 'Hamburg'
+    assert resolve_location(city='xyzzy') is None
+
+
+def test_place_names_resolve_only_with_confidence(tmp_path):
+    assert resolve_location(city='Frankfurt (Oder)').lat > 52
+    assert resolve_location(city='Halle').place == 'Halle (Saale)'
+    for city in ('Hamm', 'Oberhausen', 'Mülheim', 'Fürth', 'Offenbach', 'Bergisch Gladbach'):
+        assert resolve_location(city=city) is not None, city
+
+    rows = [('60311', 'Frankfurt am Main', 50.11, 8.68), ('48366', 'Laer', 52.05, 7.36), ('77933', 'Lahr', 48.34, 7.87)]
+    path = tmp_path / 'extract.tsv'
+    path.write_text(''.join(f'DE\t{code}\t{place}\t\t\t\t\t\t\t{lat}\t{lng}\t4\n' for code, place, lat, lng in rows),
+                    encoding='utf-8')
+    index = PostalIndex.from_file(path)
+    # a qualified name missing from the dataset does not turn into another Frankfurt
+    assert index.lookup_place('Frankfurt (Oder)') is None
+    assert index.lookup_place('Frankfurt').place == 'Frankfurt am Main'
+    # typos need a single closest name: "Lahrr" is one edit from Lahr only, "Lar" one from Laer and Lahr
+    assert index.lookup_place('Lahrr').place == 'Lahr'
+    assert index.lookup_place('Lar') is None
+
+
+def test_list_stores_by_postal_code_uses_radius():
+    suffix = uuid.uuid4().hex[:8]
+    near = {'chain': 'REWE', 'full_name': f'REWE Stade {suffix}', 'city': 'Stade', 'latitude': 53.60, 'longitude': 9.47}
+    far = {'chain': 'REWE', 'full_name': f'REWE München {suffix}', 'city': 'München', 'latitude': 48.14, 'longitude': 11.58}
+    for payload in (near, far):
+        assert client.post('/stores', json=payload).status_code == 200
+
+    resp = client.get('/stores', params={'postal_code': '21706', 'radius_km': 30, 'limit': 500})
+    assert resp.status_code == 200
+    names = [s['full_name'] for s in resp.json()]
+    assert near['full_name'] in names
+    assert far['full_name'] not in names
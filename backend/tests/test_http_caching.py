@@ -0,0 +1,59 @@
+import os
+import sys
+import uuid
+# ensure backend package is on path for tests
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from app.main import app
+from app.http_cache import ConditionalGetMiddleware, cache_policy, content_etag
+from app.openfoodfacts_routes import product_cache
+
+client = TestClient(app)
+
+
+def test_cache_policy_matches_routes():
+    assert 'stale-while-revalidate' in cache_policy('/api/v1/openfoodfacts/product/4000417025005')
+    assert cache_policy('/api/v1/ratings/stats').startswith('public')
+    assert cache_policy('/api/v1/ratings') is None
+    assert cache_policy('/stores/1') is None
+
+
+def test_rating_stats_revalidate_until_a_new_rating():
+    product = f'ETag Tee {uuid.uuid4().hex[:8]}'
+    params = {'product_identifier': product}
+    first = client.get('/api/v1/ratings/stats', params=params)
+    assert first.status_code == 200
+    assert first.headers['etag'] == content_etag(first.content)
+    assert 'stale-while-revalidate' in first.headers['cache-control']
+
+    revalidated = client.get('/api/v1/ratings/stats', params=params, headers={'If-None-Match': first.headers['etag']})
+    assert revalidated.status_code == 304 and revalidated.content == b''
+    assert revalidated.headers['etag'] == first.headers['etag']
+
+    assert client.post('/api/v1/ratings', json={'product_identifier': product, 'rating': 4}).status_code == 200
+    changed = client.get('/api/v1/ratings/stats', params=params, headers={'If-None-Match': first.headers['etag']})
+    assert changed.status_code == 200 and changed.json()['total_ratings'] == 1
+    assert changed.headers['etag'] != first.headers['etag']
+
+
+def test_off_product_proxy_answers_304():
+    barcode = '99' + str(uuid.uuid4().int)[:11]
+    product_cache.set({'barcode': barcode, 'product_name': 'ETag Senf'}, barcode)
+    first = client.get(f'/api/v1/openfoodfacts/product/{barcode}')
+    assert first.status_code == 200 and 'max-age=1800' in first.headers['cache-control']
+    again = client.get(f'/api/v1/openfoodfacts/product/{barcode}', headers={'If-None-Match': first.headers['etag']})
+    assert again.status_code == 304
+
+
+def test_errors_get_no_validators():
+    mini = FastAPI()
+
+    @mini.get('/api/v1/openfoodfacts/product/{barcode}')
+    def missing(barcode: str):
+        raise HTTPException(status_code=404, detail='Product not found')
+
+    mini.add_middleware(ConditionalGetMiddleware)
+    response = TestClient(mini).get('/api/v1/openfoodfacts/product/123')
+    assert response.status_code == 404
+    assert 'etag' not in response.headers and 'cache-control' not in response.headers
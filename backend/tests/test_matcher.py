@@ -0,0 +1,101 @@
+import datetime
+import os
+import sys
+import threading
+import uuid
+# ensure backend package is on path for tests
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from fastapi.testclient import TestClient
+from app.main import app
+from app.database import SessionLocal, engine
+from app import product_index, product_models, sync_models
+from app.matcher import match_items
+
+client = TestClient(app)
+
+
+def _match(items, **kwargs):
+    resp = client.post('/api/v1/match', json={'items': items, **kwargs})
+    assert resp.status_code == 200
+    return {r['query']: [m['product_identifier'] for m in r['matches']] for r in resp.json()['results']}
+
+
+def test_match_synonyms_typos_and_exclusions():
+    store = f'Match Markt {uuid.uuid4().hex[:8]}'
+    for name in ('Zottarella Frische Vollmilch 3,5% 1 l', 'Zottarella Süßrahmbutter 250 g', 'Zottarella Jogurt Natur 500 g'):
+        assert client.post('/api/v1/product_locations', json={'product_identifier': name, 'store_name': store}).status_code == 200
+
+    found = _match(['2x Milch 1l', 'Zottarela Joghurt', 'Butter'], store_name=store)
+    # compound "Vollmilch" answers "Milch"; butter is excluded for milk queries
+    assert found['2x Milch 1l'][0] == 'Zottarella Frische Vollmilch 3,5% 1 l'
+    assert 'Zottarella Süßrahmbutter 250 g' not in found['2x Milch 1l']
+    # typo in the brand, spelling variant of the product
+    assert found['Zottarela Joghurt'][0] == 'Zottarella Jogurt Natur 500 g'
+    assert found['Butter'][0] == 'Zottarella Süßrahmbutter 250 g'
+
+
+def test_match_index_updates_incrementally():
+    suffix = uuid.uuid4().hex[:8]
+    store = f'Match Laden {suffix}'
+    assert _match([f'Quinoa{suffix}'], store_name=store)[f'Quinoa{suffix}'] == []
+    resp = client.post('/api/v1/product_locations', json={'product_identifier': f'Bio Quinoa{suffix} 500 g', 'store_name': store})
+    assert resp.status_code == 200
+    assert _match([f'Quinoa{suffix}'], store_name=store)[f'Quinoa{suffix}'] == [f'Bio Quinoa{suffix} 500 g']
+    db = SessionLocal()
+    try:
+        db.delete(db.get(product_models.ProductLocation, resp.json()['id']))
+        db.commit()
+    finally:
+        db.close()
+    assert _match([f'Quinoa{suffix}'], store_name=store)[f'Quinoa{suffix}'] == []
+
+
+def test_match_while_the_index_refreshes():
+    suffix = uuid.uuid4().hex[:8]
+    stop = threading.Event()
+    errors = []
+
+    def reader():
+        db = SessionLocal()
+        try:
+            while not stop.is_set():
+                match_items(db, ['milch', f'Milch Bio {suffix}'])
+        except Exception as e:
+            errors.append(e)
+        finally:
+            db.close()
+
+    readers = [threading.Thread(target=reader) for _ in range(4)]
+    for t in readers:
+        t.start()
+    db = SessionLocal()
+    try:
+        for i in range(30):
+            pl = product_models.ProductLocation(product_identifier=f'Milch Bio {suffix} {i}', store_name=f'Match Race {suffix}')
+            db.add(pl)
+            db.commit()
+            match_items(db, ['milch'])
+            db.delete(pl)
+            db.commit()
+            match_items(db, ['milch'])
+    finally:
+        db.close()
+        stop.set()
+        for t in readers:
+            t.join()
+    assert errors == []
+
+
+def test_match_index_sees_writes_from_other_processes(monkeypatch):
+    suffix = uuid.uuid4().hex[:8]
+    store = f'Match Fremd {suffix}'
+    assert _match([f'Hirse{suffix}'], store_name=store)[f'Hirse{suffix}'] == []
+    # another worker or an import script: committed, but this process's generations do not move
+    with engine.begin() as conn:
+        location_id = conn.execute(product_models.ProductLocation.__table__.insert().values(
+            product_identifier=f'Bio Hirse{suffix} 500 g', store_name=store, created_at=datetime.datetime.utcnow(),
+        )).inserted_primary_key[0]
+        conn.execute(sync_models.SyncChange.__table__.insert().values(
+            entity='product_location', entity_id=location_id, op='upsert'))
+    monkeypatch.setattr(product_index, 'RECHECK_SECONDS', 0)
+    assert _match([f'Hirse{suffix}'], store_name=store)[f'Hirse{suffix}'] == [f'Bio Hirse{suffix} 500 g']
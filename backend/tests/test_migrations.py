@@ -0,0 +1,88 @@
+import os
+import sys
+import uuid
+
+from sqlalchemy import create_engine, inspect, text
+backend_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, backend_path)
+from alembic.autogenerate import compare_metadata
+from alembic.runtime.migration import MigrationContext
+from app.database import Base
+from app.schema import current_revision, head_revision, init_schema, upgrade
+
+# a database from before versioned migrations: no product catalog, no sync log,
+# none of the columns the old patch scripts added, no alembic_version
+LEGACY_DDL = [
+    """CREATE TABLE product_locations (id INTEGER PRIMARY KEY, product_identifier VARCHAR(200) NOT NULL,
+       store_name VARCHAR(200) NOT NULL, aisle VARCHAR(100), shelf_label VARCHAR(100), photo_url VARCHAR(1000),
+       contributor VARCHAR(200), status VARCHAR(50), upvotes INTEGER, downvotes INTEGER, verified_by VARCHAR(200),
+       verified_at DATETIME, created_at DATETIME, current_price FLOAT, price_currency VARCHAR(10), price_history JSON)""",
+    """CREATE TABLE price_reports (id INTEGER PRIMARY KEY, product_identifier VARCHAR(200) NOT NULL,
+       store_name VARCHAR(200) NOT NULL, reported_price FLOAT NOT NULL, size_amount FLOAT, size_unit VARCHAR(20),
+       user_session VARCHAR(100), upvotes INTEGER, downvotes INTEGER, status VARCHAR(50), verified_at DATETIME,
+       created_at DATETIME)""",
+    """CREATE TABLE signups (id INTEGER PRIMARY KEY, name VARCHAR(200) NOT NULL, email VARCHAR(200) NOT NULL,
+       role VARCHAR(50) NOT NULL, notes TEXT, created_at DATETIME)""",
+]
+
+
+def sqlite_engine(tmp_path, name):
+    return create_engine(f"sqlite:///{tmp_path / name}")
+
+
+def test_fresh_database_is_created_and_stamped(tmp_path):
+    engine = sqlite_engine(tmp_path, 'fresh.db')
+    init_schema(engine)
+    with engine.connect() as conn:
+        assert current_revision(conn) == head_revision()
+    init_schema(engine)  # at head: nothing to do
+
+
+def test_migrations_build_the_model_schema(tmp_path):
+    engine = sqlite_engine(tmp_path, 'migrated.db')
+    with engine.connect() as conn:
+        upgrade(connection=conn)
+        conn.commit()
+    with engine.connect() as conn:
+        assert current_revision(conn) == head_revision()
+        assert compare_metadata(MigrationContext.configure(conn), Base.metadata) == []
+
+
+def test_legacy_database_upgrades_in_place(tmp_path, capsys):
+    product = f"Migrationstest Hafermilch {uuid.uuid4().hex[:8]}"
+    engine = sqlite_engine(tmp_path, 'legacy.db')
+    with engine.begin() as conn:
+        for ddl in LEGACY_DDL:
+            conn.execute(text(ddl))
+        for i in range(5):
+            conn.execute(text("INSERT INTO product_locations (product_identifier, store_name) VALUES (:p, :s)"),
+                         {'p': product, 's': f"Markt {i}"})
+            conn.execute(text("INSERT INTO price_reports (product_identifier, store_name, reported_price) VALUES (:p, :s, 1.29)"),
+                         {'p': product, 's': f"Markt {i}"})
+        conn.execute(text("INSERT INTO signups (name, email, role) VALUES ('Alt', 'alt@example.org', 'shopper')"))
+
+    init_schema(engine)
+    assert 'alembic upgrade head' in capsys.readouterr().out
+    with engine.connect() as conn:
+        upgrade(connection=conn)
+        conn.commit()
+
+    with engine.connect() as conn:
+        assert current_revision(conn) == head_revision()
+        columns = {c['name'] for c in inspect(conn).get_columns('product_locations')}
+        assert {'is_regional', 'availability_notes', 'size_amount', 'size_unit', 'product_id'} <= columns
+        indexes = {i['name'] for i in inspect(conn).get_indexes('price_reports')}
+        assert 'ix_price_reports_pid_store_created' in indexes
+        assert conn.execute(text("SELECT COUNT(*) FROM price_reports WHERE confidence_score = 0.5")).scalar() == 5
+        assert conn.execute(text("SELECT COUNT(*) FROM product_locations WHERE is_regional = 0")).scalar() == 5
+        # every row linked to one canonical product
+        assert conn.execute(text(
+            "SELECT COUNT(DISTINCT product_id) FROM product_locations WHERE product_id IS NOT NULL")).scalar() == 1
+        assert conn.execute(text("SELECT COUNT(*) FROM price_reports WHERE product_id IS NULL")).scalar() == 0
+        assert conn.execute(text("SELECT name FROM signups")).scalar() == 'Alt'
+    out = capsys.readouterr().out
+    assert 'product_locations: 5/5 rows backfilled' in out
+
+    # re-running is a no-op
+    with engine.connect() as conn:
+        upgrade(connection=conn)
@@ -0,0 +1,77 @@
+import os
+import sys
+# ensure backend package is on path for tests
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from fastapi.testclient import TestClient
+from app.main import app
+from app import off_prefetch, openfoodfacts_routes as off, upstream
+
+client = TestClient(app)
+
+
+class _FakeResponse:
+    status_code = 200
+    text = ''
+
+    def __init__(self, payload):
+        self.payload = payload
+
+    def json(self):
+        return self.payload
+
+
+def _fake_off(calls):
+    async def fake_get(url, params=None, **kwargs):
+        if url.startswith(off.OFF_PRODUCT):
+            code = url.rsplit('/', 1)[1].split('.')[0]
+            calls.append(('product', code, upstream.priority.get() == upstream.PREFETCH))
+            return _FakeResponse({'status': 1, 'product': {'code': code, 'product_name': f'Vorab {code}', 'quantity': '1 l'}})
+        calls.append(('search', params['page'], upstream.priority.get() == upstream.PREFETCH))
+        products = [{'code': f"40{params['page']}{i:04d}", 'product_name': f'Vorab {i}', 'quantity': '1 l',
+                     'nutriscore_grade': 'b', 'ecoscore_grade': 'b'} for i in range(3)]
+        return _FakeResponse({'count': 120, 'page': params['page'], 'page_size': params['page_size'], 'products': products})
+    return fake_get
+
+
+def through_scheduler(fake_get):
+    """The fake replaces the HTTP call only; upstream scheduling stays in place"""
+    async def get(url, params=None, deadline=None, **kwargs):
+        async with upstream.scheduler.slot(url, deadline=deadline):
+            return await fake_get(url, params=params, **kwargs)
+    return get
+
+
+def test_prefetches_next_page_and_details(monkeypatch):
+    calls = []
+    monkeypatch.setattr(off, 'http_get_with_retry', through_scheduler(_fake_off(calls)))
+    monkeypatch.setattr(upstream, 'scheduler', upstream.Scheduler())
+    monkeypatch.setattr(off_prefetch, 'ENABLED', True)
+    client.post('/api/v1/openfoodfacts/cache/clear')
+
+    resp = client.get('/api/v1/openfoodfacts/search', params={'query': 'Vorabmilch', 'page_size': 3})
+    assert resp.status_code == 200
+    # user-facing request first, prefetch afterwards, flagged as such
+    assert calls[0] == ('search', 1, False)
+    assert ('search', 2, True) in calls
+    assert {c[1] for c in calls if c[0] == 'product' and c[2]} == {'4010000', '4010001', '4010002'}
+
+    calls.clear()
+    assert client.get('/api/v1/openfoodfacts/search', params={'query': 'vorabmilch', 'page': 2, 'page_size': 3}).status_code == 200
+    assert client.get('/api/v1/openfoodfacts/product/4010001').json()['product_name'] == 'Vorab 4010001'
+    assert ('search', 2, False) not in calls and ('product', '4010001', False) not in calls
+
+
+def test_prefetch_yields_to_user_requests(monkeypatch):
+    calls = []
+    monkeypatch.setattr(off, 'http_get_with_retry', through_scheduler(_fake_off(calls)))
+    # the user's request still has the connections; prefetch gets none and gives up at its deadline
+    monkeypatch.setattr(upstream, 'scheduler', upstream.Scheduler(priority_concurrency={upstream.PREFETCH: 0}))
+    monkeypatch.setitem(upstream.DEFAULT_DEADLINE, upstream.PREFETCH, 0.1)
+    monkeypatch.setattr(off_prefetch, 'ENABLED', True)
+    client.post('/api/v1/openfoodfacts/cache/clear')
+    skipped = off_prefetch.stats['skipped']
+
+    assert client.get('/api/v1/openfoodfacts/search', params={'query': 'Vorabbutter', 'page_size': 3}).status_code == 200
+    assert [c for c in calls if c[2]] == []
+    assert off_prefetch.stats['skipped'] > skipped
+
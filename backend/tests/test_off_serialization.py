@@ -0,0 +1,75 @@
+import os
+import sys
+# ensure backend package is on path for tests
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from fastapi.testclient import TestClient
+from app.main import app
+from app import openfoodfacts_routes as off
+from app.openfoodfacts_schemas import OFF_PRODUCT_FIELDS
+
+client = TestClient(app)
+
+
+class _FakeResponse:
+    status_code = 200
+    text = ''
+
+    def json(self):
+        return {'count': 3, 'page': 1, 'page_size': 50, 'products': [
+            {'code': f'4099{i}', 'product_name': f'Serial Hafer {grade}', 'brands': 'Testhof', 'quantity': 500,
+             'nutriscore_grade': 'c', 'ecoscore_grade': grade}
+            for i, grade in enumerate('cab')
+        ]}
+
+
+def _search(monkeypatch, **params):
+    async def fake_get(url, params=None, **kwargs):
+        return _FakeResponse()
+    monkeypatch.setattr(off, 'http_get_with_retry', fake_get)
+    return client.get('/api/v1/openfoodfacts/search', params={'query': 'Serialhafer', 'sort_by': 'green', **params})
+
+
+def test_search_payload_has_no_sort_helpers(monkeypatch):
+    resp = _search(monkeypatch)
+    assert resp.status_code == 200
+    products = resp.json()['products']
+    assert [p['ecoscore'] for p in products] == ['A', 'B', 'C']
+    assert all(set(p) == OFF_PRODUCT_FIELDS for p in products)
+    # numeric quantity from OFF still validates
+    assert products[0]['quantity'] == '500'
+
+
+def test_search_fields_projection(monkeypatch):
+    resp = _search(monkeypatch, fields='barcode, product_name')
+    assert resp.status_code == 200
+    assert resp.json()['products'][0] == {'barcode': '40991', 'product_name': 'Serial Hafer a'}
+    # the cached result keeps the full products
+    assert set(_search(monkeypatch).json()['products'][0]) == OFF_PRODUCT_FIELDS
+
+    assert _search(monkeypatch, fields='barcode,__fairScore').status_code == 400
+
+
+def test_barcode_lookup_goes_through_the_off_proxy(monkeypatch):
+    calls = []
+
+    class _ProductResponse:
+        status_code = 200
+        text = ''
+
+        def json(self):
+            return {'status': 1, 'product': {'code': '4099777', 'product_name': 'Lookup Hafer', 'brands': 'Testhof, Mühle',
+                                             'categories': 'Getreide', 'nutriscore_grade': 'a'}}
+
+    async def fake_get(url, params=None, **kwargs):
+        calls.append(url)
+        return _ProductResponse()
+    monkeypatch.setattr(off, 'http_get_with_retry', fake_get)
+    off.product_cache.cache.clear()
+
+    for _ in range(2):
+        resp = client.get('/api/v1/products/lookup/4099777')
+        assert resp.status_code == 200
+    assert resp.json() == {'barcode': '4099777', 'product_name': 'Lookup Hafer', 'brands': 'Testhof',
+                           'categories': 'Getreide', 'image_url': None, 'nutriscore_grade': 'a', 'ecoscore_grade': None}
+    # one upstream call (the scheduled proxy helper), the second lookup is a product cache hit
+    assert calls == [f'{off.OFF_PRODUCT}/4099777.json']
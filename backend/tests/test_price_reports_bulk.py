@@ -0,0 +1,52 @@
+import os
+import sys
+import uuid
+# ensure backend package is on path for tests
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from fastapi.testclient import TestClient
+from app.main import app
+
+client = TestClient(app)
+
+
+def test_bulk_receipt_per_line_status():
+    suffix = uuid.uuid4().hex[:8]
+    store = f'REWE Bon {suffix}'
+    butter = f'Butter {suffix}'
+    for price in (2.00, 2.10):
+        assert client.post('/api/v1/price_reports', json={
+            'product_identifier': butter, 'store_name': store, 'reported_price': price,
+        }).status_code == 200
+
+    resp = client.post('/api/v1/price_reports:bulk', json={
+        'store_name': store,
+        'purchased_at': '2025-10-20T10:15:00',
+        'photo_url': '/uploads/bon.jpg',
+        'lines': [
+            {'product_identifier': butter, 'reported_price': 2.05},
+            {'product_identifier': butter.upper(), 'reported_price': 9.99},  # same product, far off the average
+            {'product_identifier': f'Pfand {suffix}', 'reported_price': 0.05},
+            {'product_identifier': f'Brot {suffix}', 'reported_price': 2.49},
+        ],
+    })
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body['created'] == 3 and body['rejected'] == 1
+    assert [line['status'] for line in body['lines']] == ['pending', 'pending_review', 'rejected', 'pending']
+    assert body['lines'][2]['id'] is None
+
+    stored = client.get('/api/v1/price_reports', params={'product_identifier': f'Brot {suffix}'}).json()
+    assert [r['id'] for r in stored] == [body['lines'][3]['id']]
+    assert stored[0]['created_at'].startswith('2025-10-20')
+
+
+def test_bulk_purchase_time_with_offset_is_stored_as_utc():
+    product = f'Kaffee {uuid.uuid4().hex[:8]}'
+    resp = client.post('/api/v1/price_reports:bulk', json={
+        'store_name': 'Bon Zeitzone',
+        'purchased_at': '2025-10-20T00:30:00+02:00',
+        'lines': [{'product_identifier': product, 'reported_price': 5.49}],
+    })
+    assert resp.status_code == 200
+    stored = client.get('/api/v1/price_reports', params={'product_identifier': product}).json()
+    assert stored[0]['created_at'].startswith('2025-10-19T22:30:00')
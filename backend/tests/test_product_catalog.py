@@ -0,0 +1,90 @@
+import os
+import sys
+import uuid
+# ensure backend package is on path for tests
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from fastapi.testclient import TestClient
+from app.main import app
+from app.database import SessionLocal
+from app import product_models, rating_models
+from app import product_catalog
+from app.product_catalog import alias_key, backfill_product_ids, normalize_barcode, resolve_product_id
+
+client = TestClient(app)
+
+
+def test_identifier_normalization():
+    assert normalize_barcode('4001234567890') == '4001234567890'
+    assert normalize_barcode('04001234567890') == '4001234567890'
+    assert normalize_barcode('012345678905') == '0012345678905'
+    assert normalize_barcode('Milch 1L') is None
+    assert alias_key('  Weihenstephan   H-MILCH 1,5 % ') == alias_key('weihenstephan h-milch 1,5 %')
+
+
+def test_variants_share_one_product():
+    suffix = uuid.uuid4().hex[:8]
+    store = f'Katalog Markt {suffix}'
+    resp = client.post('/api/v1/product_locations', json={
+        'product_identifier': f'Bio Hafer Drink {suffix} 1l', 'store_name': store, 'current_price': 1.49,
+    })
+    assert resp.status_code == 200
+    resp = client.post('/api/v1/ratings', json={
+        'product_identifier': f'bio  hafer drink {suffix} 1L', 'store_name': store, 'rating': 4,
+    })
+    assert resp.status_code == 200
+
+    db = SessionLocal()
+    try:
+        pl = db.query(product_models.ProductLocation).filter(product_models.ProductLocation.store_name == store).one()
+        rating = db.query(rating_models.ProductRating).filter(rating_models.ProductRating.store_name == store).one()
+        assert pl.product_id is not None and pl.product_id == rating.product_id
+    finally:
+        db.close()
+
+    # any spelling finds the rating and the location
+    stats = client.get('/api/v1/ratings/stats', params={'product_identifier': f'BIO HAFER DRINK {suffix} 1L'}).json()
+    assert stats['total_ratings'] == 1
+    listed = client.get('/api/v1/product_locations', params={'product_identifier': f'bio hafer drink {suffix} 1l'}).json()
+    assert [row['id'] for row in listed] == [pl.id]
+
+
+def test_backfill_links_legacy_rows():
+    suffix = uuid.uuid4().hex[:8]
+    db = SessionLocal()
+    try:
+        # raw insert bypasses the flush hook, like rows written before the column existed
+        db.execute(rating_models.PriceReport.__table__.insert().values(
+            product_identifier=f'Alt Produkt {suffix}', store_name='Altmarkt', reported_price=2.5,
+        ))
+        db.commit()
+        totals = backfill_product_ids(db, batch_size=2, progress=lambda msg: None)
+        assert totals['price_reports'] >= 1
+        report = db.query(rating_models.PriceReport).filter(
+            rating_models.PriceReport.product_identifier == f'Alt Produkt {suffix}'
+        ).one()
+        assert report.product_id is not None
+    finally:
+        db.close()
+
+
+def test_concurrent_first_writes_resolve_to_one_product(monkeypatch):
+    suffix = uuid.uuid4().hex[:8]
+    barcode = '40' + str(uuid.uuid4().int)[:11]
+    first, second = SessionLocal(), SessionLocal()
+    try:
+        by_barcode = resolve_product_id(first, f'Race Senf {suffix}', barcode=barcode)
+        by_name = resolve_product_id(first, f'Race Ketchup {suffix}')
+        first.commit()
+        # the second writer looked before the first committed: neither cache nor alias table had the keys
+        monkeypatch.setattr(product_catalog, '_cached', lambda key: None)
+        monkeypatch.setattr(product_catalog, '_stored_alias', lambda conn, key: None)
+        assert resolve_product_id(second, f'Race Senf {suffix}', barcode=barcode) == by_barcode
+        assert resolve_product_id(second, f'Race Ketchup {suffix}') == by_name
+        second.commit()
+        # the loser's own product row for the name-only identifier was dropped again
+        names = second.query(product_models.Product).filter(
+            product_models.Product.display_name == f'Race Ketchup {suffix}').count()
+        assert names == 1
+    finally:
+        first.close()
+        second.close()
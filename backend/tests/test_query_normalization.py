@@ -0,0 +1,58 @@
+import os
+import sys
+# ensure backend package is on path for tests
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from fastapi.testclient import TestClient
+from app.main import app
+from app import openfoodfacts_routes, query_normalization
+from app.query_normalization import normalize_query
+
+client = TestClient(app)
+
+
+def test_normalize_steps():
+    assert normalize_query('Milch').text == 'milch'
+    assert normalize_query('  MILCH  1,5% ').text == '1,5% milch'
+    assert normalize_query('die Milch').steps == ('casefold', 'stop_words')
+    assert normalize_query('Hafer Milch').text == normalize_query('milch   hafer').text == 'hafer milch'
+    assert normalize_query('ＭＩＬＣＨ').steps == ('nfkc', 'casefold')
+    assert normalize_query('die').text == 'die'
+    assert normalize_query('Käse').text == 'käse'
+    assert normalize_query('Käse', fold_umlauts=True).text == 'kaese'
+    # negations and relations stay in the key (and in the text sent to OFF)
+    assert normalize_query('milch ohne laktose').text != normalize_query('milch mit laktose').text
+    assert normalize_query('Milch für Kinder', fold_umlauts=True).text == 'fuer kinder milch'
+
+
+class _FakeResponse:
+    status_code = 200
+    text = ''
+
+    def json(self):
+        return {'count': 1, 'page': 1, 'page_size': 50, 'products': [
+            {'product_name': 'Normalisierte Milch', 'brands': 'Testhof', 'quantity': '1 l',
+             'nutriscore_grade': 'a', 'ecoscore_grade': 'a'},
+        ]}
+
+
+def test_search_variants_share_one_upstream_request(monkeypatch):
+    calls = []
+
+    async def fake_get(url, params=None, **kwargs):
+        calls.append(params.get('search_terms'))
+        return _FakeResponse()
+    monkeypatch.setattr(openfoodfacts_routes, 'http_get_with_retry', fake_get)
+    client.post('/api/v1/openfoodfacts/cache/clear')
+
+    for variant in ('Normmilch Testhof', 'normmilch testhof ', 'Testhof  NORMMILCH', 'die Normmilch Testhof'):
+        resp = client.get('/api/v1/openfoodfacts/search', params={'query': variant})
+        assert resp.status_code == 200
+        assert resp.json()['products'][0]['product_name'] == 'Normalisierte Milch'
+    assert calls == ['normmilch testhof']
+
+    stats = client.get('/api/v1/openfoodfacts/cache/stats').json()['query_normalization']['search']
+    assert stats['requests'] == 4 and stats['cache_hits'] == 3
+    assert stats['collapsed_by_step']['casefold'] == 2
+    assert stats['collapsed_by_step']['whitespace'] == 2
+    assert stats['collapsed_by_step']['reorder'] == 1
+    assert stats['collapsed_by_step']['stop_words'] == 1
@@ -0,0 +1,74 @@
+import os
+import sys
+import uuid
+# ensure backend package is on path for tests
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from fastapi.testclient import TestClient
+from app.main import app
+from app.database import SessionLocal
+from app import product_models
+from app.receipt_parser import get_receipt_index, parse_lines, parse_receipt
+
+client = TestClient(app)
+
+
+def test_parse_lines_prices_quantities_weights():
+    parsed = parse_lines([
+        'REWE Markt GmbH',
+        'BANANEN                    1,36 A',
+        '  0,456 kg x 2,99 EUR/kg',
+        'JOGHURT                    1,98 B',
+        '  2 Stk x 0,99',
+        'Milbona H-Milch 1,5%      0,99 x 2    1,98 A',
+        'PFAND                      0,25 A',
+        'RABATT                     0,50-',
+        'SUMME EUR                 23,45',
+        'A= 7,0%   37,28     2,61    39,89',
+    ])
+    kinds = [line.kind for line in parsed]
+    assert kinds == ['ignore', 'item', 'weight', 'item', 'quantity', 'item', 'deposit', 'discount', 'total', 'ignore']
+    bananas, yoghurt, milk = parsed[1], parsed[3], parsed[5]
+    assert (bananas.price, bananas.weight_kg, bananas.unit_price) == (1.36, 0.456, 2.99)
+    assert (yoghurt.price, yoghurt.quantity, yoghurt.unit_price) == (1.98, 2, 0.99)
+    assert (milk.name, milk.price, milk.quantity) == ('Milbona H-Milch 1,5%', 1.98, 2)
+    assert parsed[7].price == -0.5
+
+
+def test_parse_endpoint_matches_abbreviations():
+    suffix = uuid.uuid4().hex[:6]
+    store = f'Bon Markt {suffix}'
+    for name in (f'Weihenstephan H-Milch 1,5% 1 l {suffix}', f'Weihenstephan H-Milch 3,5% 1 l {suffix}'):
+        assert client.post('/api/v1/product_locations', json={'product_identifier': name, 'store_name': store}).status_code == 200
+
+    resp = client.post('/api/v1/receipts/parse', json={'lines': [
+        f'WEIH.H-MILCH 1,5% {suffix}   1,19 A',
+        'SUMME EUR                1,19',
+    ]})
+    assert resp.status_code == 200
+    body = resp.json()
+    item = body['lines'][0]
+    assert item['kind'] == 'item' and item['price'] == 1.19
+    assert item['candidates'][0]['product_identifier'] == f'Weihenstephan H-Milch 1,5% 1 l {suffix}'
+    assert item['candidates'][0]['product_id'] is not None
+    assert body['items_total'] == body['receipt_total'] == 1.19
+
+
+def test_receipt_index_updates_incrementally():
+    suffix = uuid.uuid4().hex[:6]
+    name = f'Zwetschgenmus Kleinod {suffix} 450 g'
+    line = f'ZWETSCHG.MUS KLEIN. {suffix}   2,49 A'
+    db = SessionLocal()
+    try:
+        index = get_receipt_index(db)
+        resp = client.post('/api/v1/product_locations', json={'product_identifier': name, 'store_name': f'Bon Laden {suffix}'})
+        assert resp.status_code == 200
+        assert [c['product_identifier'] for c in parse_receipt(db, [line])[0].candidates][:1] == [name]
+        # updated in place, not rebuilt
+        assert get_receipt_index(db) is index
+        assert resp.json()['id'] in index.locations
+        db.delete(db.get(product_models.ProductLocation, resp.json()['id']))
+        db.commit()
+        parse_receipt(db, [line])
+        assert resp.json()['id'] not in index.locations
+    finally:
+        db.close()
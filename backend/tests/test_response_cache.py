@@ -0,0 +1,75 @@
+import os
+import sys
+import uuid
+# ensure backend package is on path for tests
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from app.main import app
+from app.database import engine
+from app.response_cache import normalized_query, response_cache
+
+client = TestClient(app)
+
+
+class CountQueries:
+    def __enter__(self):
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self._count)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(engine, 'before_cursor_execute', self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+def route_stats(path):
+    return client.get('/api/v1/response_cache/stats').json()['routes'].get(path, {'hits': 0, 'misses': 0, 'stale': 0})
+
+
+def test_normalized_query():
+    assert normalized_query(b'skip=0&limit=5') == normalized_query(b'limit=5&skip=0')
+    assert normalized_query(b'a=2&a=1') == normalized_query(b'a=1&a=2')
+
+
+def test_hits_need_no_database_until_a_write():
+    before = route_stats('/api/v1/donations')
+    first = client.get('/api/v1/donations?limit=5&skip=0')
+    assert first.status_code == 200
+    with CountQueries() as queries:
+        again = client.get('/api/v1/donations?skip=0&limit=5')
+    assert queries.count == 0
+    assert again.content == first.content
+
+    donor = f'Cache {uuid.uuid4().hex[:8]}'
+    assert client.post('/api/v1/donations', json={'amount': 3.5, 'donor_name': donor}).status_code == 200
+    fresh = client.get('/api/v1/donations?limit=5&skip=0').json()
+    assert fresh[0]['donor_name'] == donor
+
+    after = route_stats('/api/v1/donations')
+    assert after['hits'] - before['hits'] == 1
+    assert after['misses'] - before['misses'] == 2
+    assert after['stale'] - before['stale'] == 1
+    assert 0 < after['hit_ratio'] <= 1
+
+
+def test_cached_entry_answers_conditional_requests():
+    store = f'Cache Markt {uuid.uuid4().hex[:8]}'
+    client.post('/api/v1/product_locations', json={'product_identifier': 'Cache Senf', 'store_name': store})
+    first = client.get('/api/v1/product_locations', params={'store_name': store})
+    assert first.status_code == 200 and len(first.json()) == 1
+    with CountQueries() as queries:
+        revalidated = client.get('/api/v1/product_locations', params={'store_name': store},
+                                 headers={'If-None-Match': first.headers['etag']})
+    assert revalidated.status_code == 304 and queries.count == 0
+
+
+def test_writes_elsewhere_keep_entries():
+    client.get('/stores', params={'limit': 3})
+    client.post('/api/v1/donations', json={'amount': 1.0})
+    before = route_stats('/stores')
+    client.get('/stores', params={'limit': 3})
+    assert route_stats('/stores')['hits'] == before['hits'] + 1
+    assert response_cache.snapshot()['entries'] >= 1
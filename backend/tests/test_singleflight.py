@@ -0,0 +1,70 @@
+import asyncio
+import os
+import sys
+# ensure backend package is on path for tests
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import pytest
+from app import singleflight
+from app.singleflight import ClientDisconnected, SingleFlight
+
+
+class _Client:
+    """Stands in for starlette's Request: only is_disconnected() is used"""
+
+    def __init__(self):
+        self.gone = False
+
+    async def is_disconnected(self):
+        return self.gone
+
+
+def _upstream(log, seconds=0.3):
+    async def call():
+        log.append('started')
+        try:
+            await asyncio.sleep(seconds)
+        except asyncio.CancelledError:
+            log.append('cancelled')
+            raise
+        return 'result'
+    return call
+
+
+@pytest.fixture(autouse=True)
+def fast_poll(monkeypatch):
+    monkeypatch.setattr(singleflight, 'DISCONNECT_POLL', 0.01)
+
+
+def test_coalesced_waiter_keeps_flight_alive():
+    async def scenario():
+        sf, log = SingleFlight(), []
+        impatient, patient = _Client(), _Client()
+        first = asyncio.ensure_future(sf.run('k', _upstream(log), impatient))
+        second = asyncio.ensure_future(sf.run('k', _upstream(log), patient))
+        await asyncio.sleep(0.05)
+        impatient.gone = True
+        with pytest.raises(ClientDisconnected):
+            await first
+        return await second, log, sf.snapshot()
+
+    result, log, stats = asyncio.run(scenario())
+    assert result == 'result'
+    assert log == ['started']
+    assert stats == {'started': 1, 'coalesced': 1, 'disconnected': 1, 'cancelled': 0, 'in_flight': 0}
+
+
+def test_last_disconnect_cancels_upstream_work():
+    async def scenario():
+        sf, log = SingleFlight(), []
+        client = _Client()
+        waiter = asyncio.ensure_future(sf.run('k', _upstream(log), client))
+        await asyncio.sleep(0.05)
+        client.gone = True
+        with pytest.raises(ClientDisconnected):
+            await waiter
+        await asyncio.sleep(0)
+        return log, sf.snapshot()
+
+    log, stats = asyncio.run(scenario())
+    assert log == ['started', 'cancelled']
+    assert stats['cancelled'] == 1 and stats['in_flight'] == 0
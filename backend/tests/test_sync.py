@@ -0,0 +1,35 @@
+import os
+import sys
+import uuid
+# ensure backend package is on path for tests
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from fastapi.testclient import TestClient
+from app.main import app
+
+client = TestClient(app)
+
+
+def test_delta_sync_returns_only_changes_since_token():
+    token = client.get('/api/v1/sync').json()['next_token']
+    product = f'Sync {uuid.uuid4().hex[:8]}'
+
+    pl = client.post('/api/v1/product_locations', json={
+        'product_identifier': product, 'store_name': 'SyncStore', 'current_price': 1.49,
+    }).json()
+    client.post(f"/api/v1/product_locations/{pl['id']}/feedback", json={'found': True})
+    client.post('/api/v1/ratings', json={'product_identifier': product, 'store_name': 'SyncStore', 'rating': 4})
+
+    delta = client.get('/api/v1/sync', params={'since': token}).json()
+    assert delta['reset'] is False
+    # created and then updated: sent once, in its latest state
+    upserts = delta['product_locations']['upserts']
+    assert [u['id'] for u in upserts] == [pl['id']]
+    assert upserts[0]['upvotes'] == 1
+    assert {'product_identifier': product, 'store_name': 'SyncStore', 'price': 1.49} in delta['prices']
+    summaries = {s['store_name']: s for s in delta['rating_summaries']}
+    assert summaries[None]['total_ratings'] == 1
+    assert summaries['SyncStore']['average_rating'] == 4.0
+
+    again = client.get('/api/v1/sync', params={'since': delta['next_token']}).json()
+    assert again['product_locations']['upserts'] == []
+    assert again['prices'] == [] and again['rating_summaries'] == []
@@ -0,0 +1,105 @@
+import asyncio
+import os
+import sys
+# ensure backend package is on path for tests
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from fastapi.testclient import TestClient
+from app import main
+from app.uploads import sniff_image_type
+
+client = TestClient(main.app)
+
+PNG = b'\x89PNG\r\n\x1a\n' + b'\x00' * 64
+
+
+def test_sniff_image_type():
+    assert sniff_image_type(b'\xff\xd8\xff\xe0rest') == '.jpg'
+    assert sniff_image_type(PNG) == '.png'
+    assert sniff_image_type(b'RIFF\x00\x00\x00\x00WEBPVP8 ') == '.webp'
+    assert sniff_image_type(b'<html>') is None
+
+
+def test_upload_is_content_addressed_and_deduplicated(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, 'UPLOAD_DIR', tmp_path)
+    # client header and filename are ignored: the bytes decide
+    first = client.post('/api/v1/uploads', files={'file': ('bon.jpg', PNG, 'application/octet-stream')}).json()
+    second = client.post('/api/v1/uploads', files={'file': ('other.png', PNG, 'image/png')}).json()
+    assert first['url'] == second['url'] and first['url'].endswith('.png')
+    assert first['deduplicated'] is False and second['deduplicated'] is True
+    assert [p.name for p in tmp_path.iterdir()] == [first['url'].rsplit('/', 1)[1]]
+
+
+def test_upload_rejects_non_images_and_oversized(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, 'UPLOAD_DIR', tmp_path)
+    monkeypatch.setattr(main, 'MAX_UPLOAD_BYTES', 1024)
+    resp = client.post('/api/v1/uploads', files={'file': ('x.jpg', b'<script>', 'image/jpeg')})
+    assert resp.status_code == 400
+    resp = client.post('/api/v1/uploads', files={'file': ('big.png', PNG + b'\x00' * 2048, 'image/png')})
+    assert resp.status_code == 413
+    # no temp files left behind
+    assert list(tmp_path.iterdir()) == []
+
+
+def _post_chunks(headers, chunks):
+    """Drive the ASGI app directly, so the test sees how much of the body the endpoint pulled"""
+    consumed = []
+    status = []
+
+    async def receive():
+        if len(consumed) < len(chunks):
+            consumed.append(chunks[len(consumed)])
+            return {'type': 'http.request', 'body': consumed[-1], 'more_body': len(consumed) < len(chunks)}
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+
+    scope = {'type': 'http', 'method': 'POST', 'path': '/api/v1/uploads', 'raw_path': b'/api/v1/uploads',
+             'query_string': b'', 'root_path': '', 'scheme': 'http', 'server': ('test', 80), 'client': ('test', 1),
+             'http_version': '1.1', 'headers': [(k.encode(), v.encode()) for k, v in headers.items()]}
+    asyncio.run(main.app(scope, receive, send))
+    return status[0], len(consumed)
+
+
+def test_oversized_uploads_are_rejected_before_the_body_is_read(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, 'UPLOAD_DIR', tmp_path)
+    monkeypatch.setattr(main, 'MAX_UPLOAD_BYTES', 1024)
+    multipart = {'content-type': 'multipart/form-data; boundary=xyz'}
+    head = b'--xyz\r\nContent-Disposition: form-data; name="file"; filename="big.png"\r\n\r\n' + PNG
+    chunks = [head] + [b'\x00' * 64 * 1024] * 100
+
+    # declared too large: answered from the headers alone
+    assert _post_chunks({**multipart, 'content-length': str(100 * 64 * 1024)}, chunks) == (413, 0)
+    # chunked: stops reading once the file part crosses the limit
+    status, consumed = _post_chunks(multipart, chunks)
+    assert status == 413 and consumed <= 2
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_webp_derivatives_and_immutable_headers(tmp_path, monkeypatch):
+    import io
+    import pytest
+    from starlette.applications import Starlette
+    from app import image_derivatives
+    from app.http_cache import ImmutableStaticFiles
+    if not image_derivatives.available():
+        pytest.skip('Pillow not installed')
+    from PIL import Image
+
+    buf = io.BytesIO()
+    Image.new('RGB', (1200, 800), (200, 30, 30)).save(buf, 'JPEG')
+    monkeypatch.setattr(main, 'UPLOAD_DIR', tmp_path)
+    # render inline instead of in the process pool
+    monkeypatch.setattr(image_derivatives, 'schedule_derivatives', lambda p: image_derivatives.render_derivatives(str(p)))
+    body = client.post('/api/v1/uploads', files={'file': ('shelf.jpg', buf.getvalue(), 'image/jpeg')}).json()
+    assert set(body['derivatives']) == {'160', '640'}
+    for width, url in body['derivatives'].items():
+        with Image.open(tmp_path / url.rsplit('/', 1)[1]) as im:
+            assert im.format == 'WEBP' and im.size[0] == int(width)
+
+    static = Starlette()
+    static.mount('/uploads', ImmutableStaticFiles(directory=str(tmp_path)))
+    resp = TestClient(static).get(body['derivatives']['160'])
+    assert resp.status_code == 200
+    assert 'immutable' in resp.headers['cache-control']
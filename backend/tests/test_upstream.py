@@ -0,0 +1,114 @@
+import asyncio
+import os
+import sys
+# ensure backend package is on path for tests
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import pytest
+from app import upstream
+from app.upstream import BATCH, INTERACTIVE, PREFETCH, LaneConfig, Scheduler, UpstreamDeadlineExceeded
+
+URL = 'https://api.example.org/search?q=milch'
+
+
+def _scheduler(per_minute=6000, burst=1, concurrency=1):
+    return Scheduler({'example': LaneConfig('api.example.org', ('/',), per_minute, burst)}, {'api.example.org': concurrency})
+
+
+def test_priority_order_under_host_cap():
+    async def scenario():
+        sched = _scheduler(per_minute=60000, burst=100, concurrency=1)
+        order = []
+
+        async def call(name, prio):
+            async with sched.slot(URL, prio=prio):
+                order.append(name)
+                await asyncio.sleep(0.01)
+
+        blocker = asyncio.ensure_future(call('first', BATCH))
+        await asyncio.sleep(0)
+        waiting = [asyncio.ensure_future(call(n, p)) for n, p in
+                   (('batch', BATCH), ('prefetch', PREFETCH), ('keystroke', INTERACTIVE))]
+        await asyncio.gather(blocker, *waiting)
+        return order, sched.snapshot()
+
+    order, snapshot = asyncio.run(scenario())
+    assert order == ['first', 'keystroke', 'prefetch', 'batch']
+    assert snapshot['lanes']['example']['granted'] == 4
+    assert snapshot['wait']['interactive']['samples'] == 1
+
+
+def test_token_bucket_deadline_and_cancel():
+    async def scenario():
+        sched = _scheduler(per_minute=60, burst=1, concurrency=5)  # one token, then one per second
+        async with sched.slot(URL):
+            pass
+        with pytest.raises(UpstreamDeadlineExceeded):
+            await sched.acquire(URL, deadline=0.05)
+        waiter = asyncio.ensure_future(sched.acquire(URL, deadline=5))
+        await asyncio.sleep(0.01)
+        depth = sched.snapshot()['lanes']['example']['queue_depth']['interactive']
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return depth, sched.snapshot()
+
+    depth, snapshot = asyncio.run(scenario())
+    assert depth == 1
+    lane = snapshot['lanes']['example']
+    assert lane['expired'] == 1 and lane['cancelled'] == 1
+    assert lane['queue_depth']['interactive'] == 0
+    assert snapshot['inflight'] == {'api.example.org': 0}
+
+
+def test_low_priorities_leave_a_reserve():
+    bucket = upstream.TokenBucket(rate=0.001, capacity=4)
+    assert bucket.try_take(upstream.RESERVE[PREFETCH])
+    assert bucket.try_take(upstream.RESERVE[PREFETCH])
+    assert not bucket.try_take(upstream.RESERVE[PREFETCH])
+    assert bucket.try_take(upstream.RESERVE[INTERACTIVE])
+
+
+def test_priority_concurrency_cap():
+    async def scenario():
+        sched = Scheduler({'example': LaneConfig('api.example.org', ('/',), 60000, 100)}, {'api.example.org': 4},
+                          {PREFETCH: 1})
+        order = []
+
+        async def call(name, prio):
+            async with sched.slot(URL, prio=prio):
+                order.append(name)
+                await asyncio.sleep(0.02)
+
+        first = asyncio.ensure_future(call('prefetch 1', PREFETCH))
+        await asyncio.sleep(0)
+        # the second prefetch waits for the first although the host has connections left
+        rest = [asyncio.ensure_future(call(n, p)) for n, p in (('prefetch 2', PREFETCH), ('keystroke', INTERACTIVE))]
+        await asyncio.sleep(0.01)
+        running = list(order)
+        await asyncio.gather(first, *rest)
+        return running, order, sched.snapshot()
+
+    running, order, snapshot = asyncio.run(scenario())
+    assert running == ['prefetch 1', 'keystroke']
+    assert order == ['prefetch 1', 'keystroke', 'prefetch 2']
+    assert snapshot['inflight'] == {'api.example.org': 0}
+
+
+def test_off_lanes():
+    assert upstream.lane_for('https://world.openfoodfacts.org/api/v2/search') == 'off-search'
+    assert upstream.lane_for('https://world.openfoodfacts.org/cgi/search.pl') == 'off-search'
+    assert upstream.lane_for('https://world.openfoodfacts.org/api/v0/product/4001.json') == 'off-product'
+    assert upstream.lane_for('https://nominatim.example/search') == 'host:nominatim.example'
+
+
+def test_waiters_resume_when_tokens_refill():
+    async def scenario():
+        sched = _scheduler(per_minute=1200, burst=1, concurrency=5)  # a token every 50 ms
+        async def call():
+            async with sched.slot(URL, deadline=2):
+                pass
+        await asyncio.gather(*(call() for _ in range(4)))
+        return sched.snapshot()['lanes']['example']
+
+    lane = asyncio.run(scenario())
+    assert lane['granted'] == 4 and lane['throttled'] == 3
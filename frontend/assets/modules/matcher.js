@@ -425,3 +425,22 @@ export async function findSuggestions(query, { allProducts = [], selectedStore =
     }
     return sorted;
 }
+
+// Server-side matching (POST /api/v1/match): same rules, but against the server's
+// product index, so no product lists have to be downloaded first.
+// Returns [{ query, matches: [{ product_identifier, product_id, score, category, stores }] }]
+export async function matchOnServer(items, { limit = 5, storeName = null } = {}) {
+    try {
+        const res = await fetch('/api/v1/match', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ items, limit, store_name: storeName })
+        });
+        if (!res.ok) return null;
+        const data = await res.json();
+        return data.results;
+    } catch (e) {
+        console.warn('matcher.matchOnServer failed, falling back to local matching', e);
+        return null;
+    }
+}
@@ -41,3 +41,56 @@ export function saveLocationBannerState(hidden) {
         localStorage.setItem('wkf-location-banner', hidden ? 'hidden' : 'visible');
     } catch { }
 }
+
+// Delta-Sync: lädt nur Änderungen seit dem letzten Abruf (GET /api/v1/sync)
+const SYNC_STORAGE_KEY = 'wkf-sync';
+
+export function loadSyncState() {
+    try {
+        const raw = localStorage.getItem(SYNC_STORAGE_KEY);
+        if (raw) return JSON.parse(raw);
+    } catch (e) {
+        console.warn('Sync state load error:', e);
+    }
+    return { token: null, productLocations: {}, prices: {}, ratingSummaries: {} };
+}
+
+function priceKey(productIdentifier, storeName) {
+    return `${productIdentifier}\u001f${storeName || ''}`;
+}
+
+function applySyncDelta(state, delta) {
+    if (delta.reset) {
+        state.productLocations = {};
+        state.prices = {};
+        state.ratingSummaries = {};
+    }
+    delta.product_locations.upserts.forEach(pl => { state.productLocations[pl.id] = pl; });
+    delta.product_locations.deletes.forEach(id => { delete state.productLocations[id]; });
+    delta.prices.forEach(p => {
+        const key = priceKey(p.product_identifier, p.store_name);
+        if (p.price === null) delete state.prices[key];
+        else state.prices[key] = p;
+    });
+    delta.rating_summaries.forEach(r => { state.ratingSummaries[priceKey(r.product_identifier, r.store_name)] = r; });
+    state.token = delta.next_token;
+}
+
+export async function syncDelta() {
+    const state = loadSyncState();
+    let hasMore = true;
+    while (hasMore) {
+        const url = state.token ? `/api/v1/sync?since=${encodeURIComponent(state.token)}` : '/api/v1/sync';
+        const res = await fetch(url);
+        if (!res.ok) throw new Error(`Sync fehlgeschlagen: ${res.status}`);
+        const delta = await res.json();
+        applySyncDelta(state, delta);
+        hasMore = delta.has_more;
+    }
+    try {
+        localStorage.setItem(SYNC_STORAGE_KEY, JSON.stringify(state));
+    } catch (e) {
+        console.warn('Sync state save error:', e);
+    }
+    return state;
+}